@@ -6,30 +6,43 @@
 
 from __future__ import annotations
 from dataclasses import dataclass
+from datetime import datetime
 from typing import TYPE_CHECKING, Optional
 from pathlib import Path
 import shutil
 import os
+import time
 import logging
 
 import ansible_runner
 import yaml
+from ClusterShell.NodeSet import NodeSet
 
 from .templates import Templater
 from .users import UsersDirectory
 from .containers import ContainersManager
+from .ssh import SSHClient
 from .errors import FireHPCRuntimeError
 from .settings import ClusterSettings
-from .state import ClusterState, UserState
+from .state import ClusterState, UserState, SnapshotState
 from .environments import DeploymentEnvironment
+from .incremental import ConfDigests
+from .timings import AnsibleTimings
+from .profiler import profiler
+from .images import ImageCache
+from .snapshots import Snapshot, golden_sources, nodes_goldens
+from .nodes import ClusterNodes, nodes_diff, TAGS as NODES_TAGS
 
 if TYPE_CHECKING:
     from racksdb import RacksDB
     from .settings import RuntimeSettings
-    from .containers import Container
+    from .containers import Container, BaseImage
 
 logger = logging.getLogger(__name__)
 
+# Interval in seconds between checks of jobs running on drained nodes
+DRAIN_POLL_INTERVAL = 5
+
 
 def clusters_list(state: Path):
     """Return list of cluster names present in state directory."""
@@ -83,47 +96,158 @@ class EmulatedCluster:
         url: str,
         update_os_image: bool,
         db: RacksDB,
+        checksum: Optional[str] = None,
     ) -> None:
         infrastructure = db.infrastructures[self.name]
 
         manager = ContainersManager(self.name)
 
+        base_image = self._base_image(manager, url, update_os_image, checksum)
+
+        with profiler.span("deploy clone images"):
+            manager.clone_base_nodes(
+                base_image,
+                [name for name, _ in self._nodes(infrastructure)],
+                self.runtime_settings.containers.clone_workers,
+            )
+
+        self._start_nodes(manager, infrastructure)
+
+    def _base_image(
+        self,
+        manager: ContainersManager,
+        url: str,
+        update_os_image: bool,
+        checksum: Optional[str],
+    ) -> BaseImage:
+        """Return base image of cluster nodes, downloaded from URL if missing or if
+        update_os_image is True."""
         base_image_name = os.path.basename(url).split(".")[0]
 
-        # Check if base image is already present. If not or update_os_image is
-        # True, download it. Otherwise, just use it in place.
-        if not manager.image_exists(base_image_name):
-            logger.info("Base image %s must be imported", base_image_name)
-            base_image = manager.download(
+        # Images are imported through local cache when enabled in settings
+        cache = None
+        if self.runtime_settings.images.cache:
+            cache = ImageCache(
+                self.state.user_state.images, self.runtime_settings.images.mirror
+            )
+            # Remote images are cached only with a verified checksum, from OS
+            # database or from signed checksums file. Otherwise, image is
+            # downloaded by systemd-importd with signature verification.
+            if checksum is None and cache.remote(url):
+                checksum = cache.signed_checksum(url)
+                if checksum is None:
+                    logger.warning(
+                        "Unable to get verified checksum of image %s, downloading "
+                        "image without cache with signature verification",
+                        url,
+                    )
+                    cache = None
+
+        def download() -> BaseImage:
+            return manager.download(
                 url,
                 base_image_name,
+                cache,
+                checksum,
+                self.runtime_settings.images.decompress_threads,
             )
-        else:
-            logger.info("Base image %s is already imported", base_image_name)
-            base_image = manager.base_image(base_image_name)
-            if update_os_image:
-                logger.info(
-                    "Base image %s must be updated, removing it", base_image_name
+
+        # Check if base image is already present. If not or update_os_image is
+        # True, download it. Otherwise, just use it in place.
+        with profiler.span("deploy import image", image=base_image_name):
+            if not manager.image_exists(base_image_name):
+                logger.info("Base image %s must be imported", base_image_name)
+                # The image may have been removed outside of FireHPC
+                if cache is not None:
+                    cache.forget_imported(base_image_name)
+                base_image = download()
+            else:
+                logger.info("Base image %s is already imported", base_image_name)
+                base_image = manager.base_image(base_image_name)
+                if (
+                    update_os_image
+                    and cache is not None
+                    and cache.fetch(url, checksum).digest
+                    == cache.imported(base_image_name)
+                ):
+                    logger.info(
+                        "Base image %s is unchanged, skipping update", base_image_name
+                    )
+                elif update_os_image:
+                    logger.info(
+                        "Base image %s must be updated, removing it", base_image_name
+                    )
+                    # Forget imported image before its removal, so it is not
+                    # considered unchanged if the download fails.
+                    if cache is not None:
+                        cache.forget_imported(base_image_name)
+                    base_image.remove()
+                    base_image = download()
+            if cache is not None:
+                cache.report()
+        return base_image
+
+    def deploy_snapshot(self, snapshot: Snapshot, db: RacksDB) -> None:
+        """Deploy cluster nodes with clones of golden images of their role and node
+        type captured in snapshot."""
+        infrastructure = db.infrastructures[self.name]
+
+        manager = ContainersManager(self.name)
+
+        if snapshot.namespace != manager.namespace:
+            raise FireHPCRuntimeError(
+                f"Unable to deploy snapshot of cluster {self.name} captured in "
+                f"namespace {snapshot.namespace}"
+            )
+
+        for key, nodes in nodes_goldens(self._golden_nodes(infrastructure)).items():
+            if key not in snapshot.images:
+                raise FireHPCRuntimeError(
+                    f"Unable to find golden image of {key} nodes in snapshot of "
+                    f"cluster {self.name}"
                 )
-                base_image.remove()
-                base_image = manager.download(
-                    url,
-                    base_image_name,
+            with profiler.span("deploy clone golden images", key=key):
+                manager.clone_base_nodes(
+                    manager.golden_image(key),
+                    nodes,
+                    self.runtime_settings.containers.clone_workers,
                 )
 
-        for node in infrastructure.nodes:
-            if "admin" in node.tags or not self.cluster_settings.slurm_emulator:
-                logger.info("Cloning base image for %s.%s", node.name, self.name)
-                manager.clone_base(base_image, node.name)
-
+        self._start_nodes(manager, infrastructure)
+
+    def _nodes(self, infrastructure) -> list[tuple[str, list[str]]]:
+        """Return (name, tags) 2-tuples of nodes with a container, ie. all nodes or
+        only admin node in Slurm emulator mode."""
+        return [
+            (node.name, node.tags)
+            for node in infrastructure.nodes
+            if "admin" in node.tags or not self.cluster_settings.slurm_emulator
+        ]
+
+    def _golden_nodes(self, infrastructure) -> list[tuple[str, list[str], str]]:
+        """Return (name, tags, node type) 3-tuples of nodes with a container."""
+        return [
+            (node.name, node.tags, node.type.id)
+            for node in infrastructure.nodes
+            if "admin" in node.tags or not self.cluster_settings.slurm_emulator
+        ]
+
+    def _start_nodes(self, manager: ContainersManager, infrastructure) -> None:
         logger.info("Starting cluster storage service %s", self.name)
-        manager.storage().start()
-
-        if self.cluster_settings.slurm_emulator:
-            admin_node = infrastructure.nodes.filter(tags=["admin"]).first()
-            manager.start([admin_node.name])
-        else:
-            manager.start([node.name for node in infrastructure.nodes])
+        with profiler.span("deploy start storage"):
+            manager.storage().start()
+
+        with profiler.span("deploy start containers"):
+            if self.cluster_settings.slurm_emulator:
+                admin_node = infrastructure.nodes.filter(tags=["admin"]).first()
+                manager.start(
+                    [admin_node.name], self.runtime_settings.containers.start_workers
+                )
+            else:
+                manager.start(
+                    [node.name for node in infrastructure.nodes],
+                    self.runtime_settings.containers.start_workers,
+                )
 
     def conf(
         self,
@@ -134,6 +258,8 @@ class EmulatedCluster:
         skip_tags: Optional[list[str]] = None,
         users_directory: Optional[UsersDirectory] = None,
         ansible_opts: Optional[list[str]] = None,
+        connection: Optional[str] = None,
+        incremental: bool = False,
     ) -> conf:
         if reinit:
             self.state.conf_clean()
@@ -164,66 +290,65 @@ class EmulatedCluster:
         manager = ContainersManager(self.name)
 
         infrastructure = db.infrastructures[self.name]
+        # Group nodes by tag and by node type in a single traversal of RacksDB
+        # nodes, with nodes names folded in nodesets.
+        with profiler.span("conf group nodes"):
+            cluster_nodes = ClusterNodes.group(infrastructure.nodes)
+        # Only the admin node is deployed in Slurm emulator mode, the other nodes
+        # are emulated.
+        inventory_tags = (
+            ["admin"] if self.cluster_settings.slurm_emulator else NODES_TAGS
+        )
+        # Ansible execution profile, with forks sized with the number of nodes
+        # configured by Ansible.
+        nb_nodes = 1 if self.cluster_settings.slurm_emulator else cluster_nodes.count
+        ansible = {
+            "forks": self.runtime_settings.ansible.forks_for(nb_nodes),
+            "strategy": self.runtime_settings.ansible.strategy,
+            "gathering": self.runtime_settings.ansible.gathering,
+            "fact_caching_timeout": self.runtime_settings.ansible.fact_caching_timeout,
+        }
+        logger.debug("Ansible execution profile: %s", ansible)
+        # Templates are loaded by shared environment rooted at Ansible path, with
+        # compiled templates cached in user state directory.
+        templater = Templater(
+            self.runtime_settings.ansible.path, self.state.user_state.templates
+        )
+        inventory = cluster_nodes.inventory(f".{self.name}", inventory_tags)
         for template in ["ansible.cfg", "hosts"]:
             logger.debug(
                 "Generating configuration file %s from template",
                 self.state.conf / template,
             )
-            with open(self.state.conf / template, "w+") as fh:
-                fh.write(
-                    Templater().frender(
-                        self.runtime_settings.ansible.path / f"{template}.j2",
-                        state=self.state.path,
-                        cluster=self.name,
-                        namespace=manager.namespace,
-                        infrastructure=infrastructure,
-                        emulator_mode=self.cluster_settings.slurm_emulator,
-                    )
+            with profiler.span("conf render template", template=template):
+                templater.fstream(
+                    f"{template}.j2",
+                    self.state.conf / template,
+                    state=self.state.path,
+                    cluster=self.name,
+                    namespace=manager.namespace,
+                    infrastructure=infrastructure,
+                    inventory=inventory,
+                    emulator_mode=self.cluster_settings.slurm_emulator,
+                    facts=self.state.facts,
+                    ansible=ansible,
                 )
 
         # variable fhpc_addresses
-        containers_addresses = {}
-        for container in manager.running():
-            containers_addresses[container.name] = [
-                str(address) for address in container.addresses()
-            ]
+        with profiler.span("conf containers addresses"):
+            containers_addresses = {
+                name: [str(address) for address in addresses]
+                for name, addresses in manager.addresses(manager.running()).items()
+            }
 
         # variable fhpc_nodes, a dict where nodes are first grouped by tag,
-        # then grouped by node type.
-        nodes = {}
-
-        def node_type_gpus(node_type):
-            result = {}
-            if not hasattr(node_type, "gpu"):
-                return result
-            for gpu in node_type.gpu:
-                if gpu.model not in result:
-                    result[gpu.model] = 0
-                result[gpu.model] += 1
-            return result
-
-        def insert_in_node_type():
-            for node_type in nodes[tag]:
-                if node_type["type"] == node.type.id:
-                    node_type["nodes"].append(node.name)
-                    return
-            nodes[tag].append(
-                {
-                    "type": node.type.id,
-                    "sockets": node.type.cpu.sockets,
-                    "cores": node.type.cpu.cores,
-                    "memory": node.type.ram.dimm * (node.type.ram.size // 1024**2),
-                    "gpus": node_type_gpus(node.type),
-                    "nodes": [node.name],
-                }
+        # then grouped by node type. The lists of nodes names are omitted in Slurm
+        # emulator mode, only the folded nodesets are used.
+        with profiler.span("conf fold nodesets"):
+            nodes = cluster_nodes.generic(
+                with_names=not self.cluster_settings.slurm_emulator
             )
 
-        for tag in ["admin", "login", "compute"]:
-            if tag not in nodes:
-                nodes[tag] = []
-            for node in infrastructure.nodes.filter(tags=[tag]):
-                insert_in_node_type()
-
         # Unless already existing, generate custom.yml file with variables and
         # add option to ansible-playbook command line to load this file as a
         # source of extra variables. The file should not be regenerated every
@@ -242,13 +367,21 @@ class EmulatedCluster:
                 "fhpc_users": users_directory._users_generic(),
                 "fhpc_groups": users_directory._groups_generic(),
             }
-            with open(self.state.extravars, "w+") as fh:
-                fh.write(yaml.dump(extravars))
+            with profiler.span("conf generate extravars"):
+                with open(self.state.extravars, "w+") as fh:
+                    fh.write(yaml.dump(extravars))
 
         cmdline = (
             f"{self.runtime_settings.ansible.args} --extra-vars @{self.state.extravars}"
         )
 
+        # Select Ansible connection plugin, runtime settings are used by default.
+        # Plays that define their own connection (eg. bootstrap) are not affected.
+        if connection is None:
+            connection = self.runtime_settings.ansible.connection
+        if connection != "ssh":
+            cmdline += f" --connection {connection}"
+
         if ansible_opts is not None and len(ansible_opts):
             cmdline += f" {' '.join(ansible_opts)}"
 
@@ -269,43 +402,307 @@ class EmulatedCluster:
                 f"Unable to find environment {environment.name}, bootstrap first?"
             )
 
+        extravars = {
+            "fhpc_addresses": containers_addresses,
+            "fhpc_db": str(Path.cwd() / db._loader.path),
+            "fhpc_emulator_mode": self.cluster_settings.slurm_emulator,
+            "fhpc_nodes": nodes,
+            "fhpc_pinned_strategy": self.runtime_settings.ansible.pinned_strategy,
+        }
+
+        # Digests of site playbook inputs are computed when it is run entirely,
+        # and saved after successful runs to limit subsequent incremental runs to
+        # the roles and hosts whose inputs changed.
+        digests = None
+        if (
+            "site" in playbooks
+            and not tags
+            and not skip_tags
+            and not (ansible_opts is not None and len(ansible_opts))
+        ):
+            groups = {
+                tag: [f"{name}.{self.name}" for name in cluster_nodes.groups[tag]]
+                for tag in inventory_tags
+            }
+            with profiler.span("conf compute digests"):
+                digests = ConfDigests.compute(
+                    self.runtime_settings.ansible.path,
+                    "site",
+                    self.state.conf,
+                    groups,
+                    extravars,
+                    [Path(extravars["fhpc_db"])],
+                )
+
+        runs = []
         for playbook in playbooks:
-            # Prepend deployment environment bin folder in $PATH so that
-            # ansible-runnner will execute ansible-playbook in that folder instead of
-            # the one in system paths.
-            logger.debug("Adding %s in PATH", environment.bin)
-            old_path = os.environ["PATH"]
-            os.environ["PATH"] = f"{environment.bin}:{old_path}"
-
-            # Run ansible-playbook
-            runner = ansible_runner.run(
-                private_data_dir=self.state.conf,
-                playbook=f"{self.runtime_settings.ansible.path}/{playbook}.yml",
-                cmdline=cmdline,
-                extravars={
-                    "fhpc_addresses": containers_addresses,
-                    "fhpc_db": str(Path.cwd() / db._loader.path),
-                    "fhpc_emulator_mode": self.cluster_settings.slurm_emulator,
-                    "fhpc_nodes": nodes,
-                },
-            )
-            # Raise exception on playbook failure
-            if runner.rc:
-                raise FireHPCRuntimeError(
-                    f"Error while running ansible playbook {playbook}"
+            if playbook != "site" or not incremental or digests is None:
+                runs.append((playbook, cmdline))
+                continue
+            changes = digests.changes(ConfDigests.load(self.state.digests))
+            if changes is None:
+                logger.info("Running all roles on all hosts")
+                runs.append((playbook, cmdline))
+                continue
+            changed_tags, changed_hosts = changes
+            if not changed_tags and not changed_hosts:
+                logger.info("Configuration inputs are unchanged, skipping playbook")
+                continue
+            if changed_tags:
+                logger.info("Running roles with changed inputs: %s", changed_tags)
+                runs.append((playbook, f"{cmdline} --tags {','.join(changed_tags)}"))
+            if changed_hosts:
+                logger.info(
+                    "Running all roles on hosts with changed inputs: %s", changed_hosts
                 )
+                runs.append((playbook, f"{cmdline} --limit {','.join(changed_hosts)}"))
 
-            # Restore $PATH
-            os.environ["PATH"] = old_path
+        # Collect tasks durations from runner events, the timing profile is saved
+        # and summarized even when a playbook fails.
+        timings = AnsibleTimings()
+        try:
+            for playbook, _cmdline in runs:
+                # Prepend deployment environment bin folder in $PATH so that
+                # ansible-runnner will execute ansible-playbook in that folder instead
+                # of the one in system paths.
+                logger.debug("Adding %s in PATH", environment.bin)
+                old_path = os.environ["PATH"]
+                os.environ["PATH"] = f"{environment.bin}:{old_path}"
+
+                # Run ansible-playbook
+                with profiler.span(
+                    "conf ansible playbook", playbook=playbook, cmdline=_cmdline
+                ):
+                    runner = ansible_runner.run(
+                        private_data_dir=self.state.conf,
+                        playbook=f"{self.runtime_settings.ansible.path}/{playbook}.yml",
+                        cmdline=_cmdline,
+                        extravars=extravars,
+                        event_handler=timings.handler(playbook),
+                    )
+                # Raise exception on playbook failure
+                if runner.rc:
+                    raise FireHPCRuntimeError(
+                        f"Error while running ansible playbook {playbook}"
+                    )
+
+                # Restore $PATH
+                os.environ["PATH"] = old_path
+        finally:
+            if timings.tasks:
+                timings.save(self.state.timings)
+                timings.summary()
+
+        if digests is not None:
+            digests.save(self.state.digests)
 
         for generated_dir in ["artifacts", "env"]:
             generated_path = self.state.conf / generated_dir
             logger.debug("Removing ansible generated directory %s", generated_path)
             shutil.rmtree(generated_path)
 
+    def snapshot(self, db: RacksDB, snapshot_state: SnapshotState) -> Snapshot:
+        """Capture images of the first node of every role and node type in golden
+        images and save cluster state in snapshot. Nodes are stopped during the
+        capture to get consistent images, they are started again afterwards."""
+        infrastructure = db.infrastructures[self.name]
+
+        manager = ContainersManager(self.name)
+
+        sources = golden_sources(self._golden_nodes(infrastructure))
+        running = [
+            container
+            for container in manager.running()
+            if container.name in sources.values()
+        ]
+        manager.stop(running)
+        try:
+            images = {}
+            for key, node in sources.items():
+                images[key] = manager.capture(node, key).name
+            snapshot_state.save(self.state)
+        finally:
+            logger.info("Starting nodes captured in snapshot")
+            manager.start(
+                [container.name for container in running],
+                self.runtime_settings.containers.start_workers,
+            )
+        snapshot = Snapshot(
+            self.name,
+            manager.namespace,
+            self.cluster_settings.os,
+            datetime.now(),
+            images,
+            sources,
+        )
+        snapshot.save(snapshot_state.manifest)
+        return snapshot
+
+    def remove_snapshot(self, snapshot_state: SnapshotState) -> None:
+        """Remove golden images and saved state of cluster snapshot."""
+        manager = ContainersManager(self.name)
+        snapshot = Snapshot.load(snapshot_state.manifest)
+        for key in snapshot.images:
+            if manager.image_exists(manager.golden_image_name(key)):
+                logger.info("Removing golden image of %s nodes", key)
+                manager.golden_image(key).remove()
+        snapshot_state.clean()
+
+    def scale(
+        self,
+        url: str,
+        db: RacksDB,
+        checksum: Optional[str] = None,
+        drain_timeout: int = 600,
+    ) -> None:
+        """Resize deployed cluster to the nodes defined in RacksDB. Containers are
+        created only for the new nodes and the configuration is fully applied only
+        on these nodes and on the admin node with Slurm controller. On the other
+        nodes, only the files that list cluster nodes are updated. Removed nodes are
+        drained in Slurm, their running jobs are given drain_timeout seconds to
+        finish, then their containers are stopped and removed."""
+        infrastructure = db.infrastructures[self.name]
+
+        manager = ContainersManager(self.name)
+
+        nodes = [name for name, _ in self._nodes(infrastructure)]
+        existing = [image.name.split(".", 1)[0] for image in manager.cluster_images()]
+        admin = infrastructure.nodes.filter(tags=["admin"]).first().name
+        if admin not in existing:
+            raise FireHPCRuntimeError(
+                f"Unable to find admin node of cluster {self.name}, deploy it first"
+            )
+        added, removed = nodes_diff(nodes, existing)
+
+        # In Slurm emulator mode, nodes are emulated on the admin node and the
+        # cluster is resized by Slurm configuration only.
+        if not added and not removed and not self.cluster_settings.slurm_emulator:
+            logger.info("Cluster %s nodes are unchanged, nothing to do", self.name)
+            return
+        logger.info(
+            "Scaling cluster %s with %d new node(s) and %d removed node(s)",
+            self.name,
+            len(added),
+            len(removed),
+        )
+
+        if removed:
+            self._drain(admin, removed, drain_timeout)
+            with profiler.span("scale remove nodes"):
+                manager.stop(
+                    [
+                        container
+                        for container in manager.running()
+                        if container.name in removed
+                    ]
+                )
+                for image in manager.cluster_images():
+                    if image.name.split(".", 1)[0] in removed:
+                        logger.info("Removing image %s", image.name)
+                        image.remove()
+
+        if added:
+            base_image = self._base_image(manager, url, False, checksum)
+            with profiler.span("scale clone images"):
+                manager.clone_base_nodes(
+                    base_image, added, self.runtime_settings.containers.clone_workers
+                )
+            with profiler.span("scale start containers"):
+                manager.start(added, self.runtime_settings.containers.start_workers)
+
+        # Nodes names can be reused, cached facts of added and removed nodes are
+        # removed to avoid applying stale facts to new containers.
+        self.state.forget_facts([f"{name}.{self.name}" for name in added + removed])
+
+        def hosts(names: list[str]) -> str:
+            return ",".join(f"{name}.{self.name}" for name in names)
+
+        # Bootstrap generates SSH host keys of new nodes on localhost, then the
+        # configuration is applied on new nodes and on the admin node.
+        self.conf(
+            db,
+            playbooks=["bootstrap", "site"],
+            reinit=False,
+            ansible_opts=["--limit", f"localhost,{hosts([admin] + added)}"],
+        )
+        others = [node for node in nodes if node != admin and node not in added]
+        if others:
+            self.conf(
+                db,
+                playbooks=["scale"],
+                reinit=False,
+                ansible_opts=["--limit", hosts(others)],
+            )
+
+    def _drain(self, admin: str, nodes: list[str], timeout: int) -> None:
+        """Drain nodes in Slurm before their removal and wait for their jobs to
+        finish. Jobs still running after timeout are killed with the removal of the
+        nodes."""
+        nodeset = str(NodeSet.fromlist(nodes))
+        logger.info("Draining nodes %s in Slurm", nodeset)
+        ssh = SSHClient(self, asbin=False)
+        try:
+            status, _, stderr = ssh.exec_status(
+                [
+                    f"{admin}.{self.name}",
+                    "scontrol",
+                    "update",
+                    f"nodename={nodeset}",
+                    "state=drain",
+                    "reason=Removed by FireHPC scale",
+                ]
+            )
+            if status:
+                logger.warning(
+                    "Unable to drain nodes %s: %s", nodeset, stderr.decode().strip()
+                )
+                return
+            deadline = time.monotonic() + timeout
+            with profiler.span("scale drain nodes"):
+                while True:
+                    status, stdout, stderr = ssh.exec_status(
+                        [
+                            f"{admin}.{self.name}",
+                            "squeue",
+                            "--noheader",
+                            f"--nodelist={nodeset}",
+                            "--format=%i",
+                        ]
+                    )
+                    if status:
+                        logger.warning(
+                            "Unable to retrieve jobs running on nodes %s: %s",
+                            nodeset,
+                            stderr.decode().strip(),
+                        )
+                        return
+                    jobs = len(stdout.split())
+                    if not jobs:
+                        logger.info("Nodes %s are drained", nodeset)
+                        return
+                    if time.monotonic() >= deadline:
+                        logger.warning(
+                            "Timeout while waiting for %d job(s) to finish on nodes "
+                            "%s, these jobs are killed with the removal of the nodes",
+                            jobs,
+                            nodeset,
+                        )
+                        return
+                    logger.info(
+                        "Waiting for %d job(s) to finish on nodes %s", jobs, nodeset
+                    )
+                    time.sleep(DRAIN_POLL_INTERVAL)
+        finally:
+            ssh.pool.close()
+
+    def deployed(self) -> bool:
+        """Return True if images of cluster nodes exist."""
+        return len(ContainersManager(self.name).cluster_images()) > 0
+
     def clean(self) -> None:
         manager = ContainersManager(self.name)
 
+        SSHClient(self).close_masters()
         manager.stop()
 
         for image in manager.cluster_images():
@@ -324,20 +721,18 @@ class EmulatedCluster:
         logger.info("Starting cluster storage service %s", self.name)
         manager.storage().start()
 
-        # Search for the list of available images.
-        containers = [image.name for image in manager.cluster_images()]
+        # Search for the list of available images, .<cluster>.<namespace> suffix
+        # must be removed from images names to get containers names.
+        containers = [image.name.split(".", 1)[0] for image in manager.cluster_images()]
         # Look for the running container and start the other.
         running = [container.name for container in manager.running()]
         manager.start(
-            [
-                # .<cluster>.<namespace> suffix must be removed from container name.
-                container.split(".", 1)[0]
-                for container in containers
-                if container not in running
-            ]
+            [container for container in containers if container not in running],
+            self.runtime_settings.containers.start_workers,
         )
 
     def stop(self) -> None:
+        SSHClient(self).close_masters()
         ContainersManager(self.name).stop()
 
     def status(self) -> ClusterStatus:
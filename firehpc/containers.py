@@ -5,23 +5,91 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from __future__ import annotations
+from typing import Callable, Optional
+from pathlib import Path
 import os
 from datetime import datetime
 import signal
 import threading
+import concurrent.futures
 import time
 import socket
 import ipaddress
 import logging
+import shlex
+import subprocess
 
 from dasbus.connection import SystemMessageBus
 from dasbus.loop import EventLoop
 from dasbus.error import DBusError
+from dasbus.unix import GLibClientUnix
 
 from .errors import FireHPCRuntimeError
+from .profiler import profiler
+from .images import ImageCache, decompressor
 
 logger = logging.getLogger(__name__)
 
+MACHINES_PATH = "/var/lib/machines"
+# Filesystems on which machined clones images with copy-on-write snapshots or
+# reflinks, making clones almost instantaneous regardless of images size.
+COW_FILESYSTEMS = ["btrfs", "bcachefs"]
+# Filesystems on which reflinks are an optional feature, enabled at filesystem
+# creation.
+REFLINK_FILESYSTEMS = ["xfs"]
+# Bounds of exponential backoff delay in seconds between successive polls of
+# containers network addresses.
+ADDRESSES_POLL_MIN_DELAY = 0.1
+ADDRESSES_POLL_MAX_DELAY = 2
+
+
+def machines_filesystem(mounts: str = "/proc/self/mounts") -> Optional[str]:
+    """Return the type of filesystem that hosts machined images directory, or None
+    if it cannot be determined."""
+    result = None
+    longest = ""
+    try:
+        with open(mounts) as fh:
+            for line in fh:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                # Octal escaped spaces in mount points are not expected in the
+                # path of machines directory, they can be safely ignored.
+                mountpoint = fields[1]
+                if (
+                    MACHINES_PATH == mountpoint
+                    or MACHINES_PATH.startswith(mountpoint.rstrip("/") + "/")
+                ) and len(mountpoint) >= len(longest):
+                    longest = mountpoint
+                    result = fields[2]
+    except OSError as err:
+        logger.debug("Unable to read mounts file %s: %s", mounts, err)
+    return result
+
+
+def xfs_reflink(path: str = MACHINES_PATH) -> bool:
+    """Return True if reflink feature is enabled on XFS filesystem of the given
+    path, as reported by xfs_info."""
+    try:
+        result = subprocess.run(
+            ["xfs_info", path], capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError) as err:
+        logger.debug("Unable to probe reflink support on %s: %s", path, err)
+        return False
+    return "reflink=1" in result.stdout
+
+
+def machines_cow(filesystem: Optional[str]) -> bool:
+    """Return True if clones of images are copy-on-write on the given filesystem of
+    machined images directory."""
+    if filesystem in COW_FILESYSTEMS:
+        return True
+    if filesystem in REFLINK_FILESYSTEMS:
+        return xfs_reflink()
+    return False
+
 
 class Singleton(type):
     __instances = {}
@@ -36,7 +104,11 @@ class DBus(metaclass=Singleton):
     def __init__(self) -> DBus:
         self.bus = SystemMessageBus()
 
-    def proxy(self, interface, path):
+    def proxy(self, interface, path, unix_fd: bool = False):
+        # Client with support of Unix file descriptors passing is required by
+        # methods with file descriptors arguments.
+        if unix_fd:
+            return self.bus.get_proxy(interface, path, client=GLibClientUnix)
         return self.bus.get_proxy(interface, path)
 
 
@@ -100,6 +172,15 @@ class ImageImporter(DBusObject):
         self.proxy.TransferRemoved.connect(self._transfer_removed_handler)
         self.loop.run()
 
+    def _wait_transfer(self) -> None:
+        logger.debug("Waiting for transfer to terminate…")
+        self.terminated_transfer.wait()
+        self.loop.quit()
+        if self.error is not None:
+            raise FireHPCRuntimeError(
+                f"Transfer of image {self.name} has failed: {self.error}"
+            )
+
     def transfer(self) -> None:
         logger.debug("Starting waiter thread")
         waiter = threading.Thread(target=self._waiter)
@@ -108,12 +189,46 @@ class ImageImporter(DBusObject):
         self.transfer_id = self.proxy.PullRaw(self.url, self.name, "signature", False)[
             0
         ]
-        logger.debug("Waiting for transfer to terminate…")
-        self.terminated_transfer.wait()
-        self.loop.quit()
-        if self.error is not None:
+        self._wait_transfer()
+
+    def import_file(self, path: Path, threads: int = 0) -> None:
+        """Import image from local file. Compressed images are decompressed by
+        external command with multiple threads when supported and streamed to
+        importd through a pipe."""
+        command = decompressor(path, threads)
+        logger.debug("Starting waiter thread")
+        waiter = threading.Thread(target=self._waiter)
+        waiter.start()
+        logger.info("Importing image %s from file %s", self.name, path)
+        process = None
+        try:
+            if command is None:
+                fh = open(path, "rb")
+            else:
+                logger.debug("Decompressing image with: %s", shlex.join(command))
+                process = subprocess.Popen(command, stdout=subprocess.PIPE)
+                fh = process.stdout
+            try:
+                self.transfer_id = (
+                    DBus()
+                    .proxy(self.INTERFACE, "/org/freedesktop/import1", unix_fd=True)
+                    .ImportRaw(fh.fileno(), self.name, False, False)[0]
+                )
+            finally:
+                # importd has its own copy of the file descriptor
+                fh.close()
+        except (OSError, DBusError) as err:
+            self.loop.quit()
+            if process is not None:
+                process.kill()
             raise FireHPCRuntimeError(
-                f"Transfer of image {self.name} has failed: {self.error}"
+                f"Unable to import image {self.name} from file {path}: {err}"
+            ) from err
+        self._wait_transfer()
+        if process is not None and process.wait():
+            raise FireHPCRuntimeError(
+                f"Decompression of image {path} has failed with exit code "
+                f"{process.returncode}"
             )
 
 
@@ -154,6 +269,7 @@ class Image(DBusObject):
                         f"Unable to remove image {self.name}: {err}"
                     ) from err
             else:
+                InventorySnapshot().image_removed(self.name)
                 return
         raise FireHPCRuntimeError(
             f"Unable to remove image {self.name} after {retries} tries"
@@ -161,6 +277,7 @@ class Image(DBusObject):
 
     def clone(self, target: str) -> None:
         self.proxy.Clone(target, False)
+        InventorySnapshot().image_added(target)
 
     @classmethod
     def from_machine_image(cls, image) -> Image:
@@ -188,8 +305,19 @@ class BaseImage(Image):
     """Cluster base image"""
 
 
+class GoldenImage(Image):
+    """Image of configured cluster node captured in snapshot, cloned for all
+    nodes with the same role."""
+
+
 class ClusterStateModifier(DBusObject):
     INTERFACE = "org.freedesktop.machine1"
+    # Maximum time in seconds to wait for the first container to start before
+    # starting the other containers.
+    FIRST_START_TIMEOUT = 60
+    # Maximum time in seconds to wait for all containers to start after their
+    # start requests.
+    START_TIMEOUT = 600
 
     def __init__(self, cluster: str, namespace: str) -> ClusterStateModifier:
         super().__init__("/org/freedesktop/machine1")
@@ -198,20 +326,30 @@ class ClusterStateModifier(DBusObject):
         self.loop = EventLoop()
         self.terminated_start = threading.Event()
         self.terminated_stop = threading.Event()
+        self.first_started = threading.Event()
         self.must_start = []
         self.must_stop = []
+        # Start request timestamps and start latencies of containers, indexed by
+        # machine name.
+        self.start_requests = {}
+        self.start_latencies = {}
         self.locker = threading.Lock()
 
-    def _machine_new_handler(self, machine: str, path: str) -> None:
+    def _machine_new_handler(self, machine: str) -> None:
         logger.debug("machine started: %s", machine)
         self.locker.acquire()
         if machine in self.must_start:
             self.must_start.remove(machine)
+            if machine in self.start_requests:
+                self.start_latencies[machine] = (
+                    time.monotonic() - self.start_requests[machine]
+                )
+            self.first_started.set()
         if not len(self.must_start):
             self.terminated_start.set()
         self.locker.release()
 
-    def _machine_removed_handler(self, machine: str, path: str) -> None:
+    def _machine_removed_handler(self, machine: str) -> None:
         logger.debug("machine stopped: %s", machine)
         self.locker.acquire()
         if machine in self.must_stop:
@@ -220,12 +358,70 @@ class ClusterStateModifier(DBusObject):
             self.terminated_stop.set()
         self.locker.release()
 
-    def _waiter(self) -> None:
-        self.proxy.MachineNew.connect(self._machine_new_handler)
-        self.proxy.MachineRemoved.connect(self._machine_removed_handler)
-        self.loop.run()
+    def _watch(self) -> None:
+        """Subscribe to machines signals and start waiter thread running the event
+        loop. Machines signals are received by the inventory snapshot, which is
+        updated before notifying this object so it is up-to-date when start() and
+        stop() return."""
+        InventorySnapshot().subscribe(
+            self._machine_new_handler, self._machine_removed_handler
+        )
+        waiter = threading.Thread(target=self.loop.run)
+        waiter.start()
 
-    def start(self, containers: list) -> None:
+    def _unwatch(self) -> None:
+        """Stop waiter thread event loop and unsubscribe from machines signals."""
+        self.loop.quit()
+        InventorySnapshot().unsubscribe(
+            self._machine_new_handler, self._machine_removed_handler
+        )
+
+    def _start_container(self, container: str) -> None:
+        """Record start request timestamp and start the container."""
+        self.locker.acquire()
+        self.start_requests[f"{container}.{self.cluster}.{self.namespace}"] = (
+            time.monotonic()
+        )
+        self.locker.release()
+        logger.info("Starting container %s", container)
+        try:
+            with profiler.span("container start request", container=container):
+                Container.start(container, self.cluster, self.namespace)
+        except DBusError as err:
+            raise FireHPCRuntimeError(
+                f"Unable to start container {container}: {err}"
+            ) from err
+
+    def _report_latencies(self) -> None:
+        """Log start latency of all containers and a summary of latencies."""
+        if not len(self.start_latencies):
+            return
+        for machine, latency in sorted(
+            self.start_latencies.items(), key=lambda item: item[1]
+        ):
+            logger.debug("Container %s started in %.2fs", machine, latency)
+        latencies = self.start_latencies.values()
+        logger.info(
+            "Containers start latency: min %.2fs, avg %.2fs, max %.2fs",
+            min(latencies),
+            sum(latencies) / len(latencies),
+            max(latencies),
+        )
+
+    def start(self, containers: list, workers: int = 1) -> None:
+        # Containers already registered in machined do not emit new machine
+        # signal, they are not started again.
+        registered = [
+            machine[0]
+            for machine in InventorySnapshot().running(self.cluster, self.namespace)
+        ]
+        stopped = []
+        for container in containers:
+            if f"{container}.{self.cluster}.{self.namespace}" in registered:
+                logger.info("Container %s is already started", container)
+            else:
+                stopped.append(container)
+        containers = stopped
         self.must_start = [
             f"{container}.{self.cluster}.{self.namespace}" for container in containers
         ]
@@ -235,23 +431,43 @@ class ClusterStateModifier(DBusObject):
         logger.debug(
             "Starting waiter thread for containers to start: %s", self.must_start
         )
-        waiter = threading.Thread(target=self._waiter)
-        waiter.start()
-        wait_first = True
-        for container in containers:
-            logger.info("Starting container %s", container)
-            Container.start(container, self.cluster, self.namespace)
-            # Wait some time before starting the second container to let systemd-nspawn
-            # and systemd-networkd setup cluster private network properly and avoid
-            # the following container from erasing everything before completion.
-            if wait_first and len(containers) > 1:
+        self._watch()
+        try:
+            # Start the first container alone and wait for its registration in
+            # machined before starting the following containers. This lets
+            # systemd-nspawn and systemd-networkd setup cluster private network
+            # properly and avoid the following containers from erasing everything
+            # before completion.
+            self._start_container(containers[0])
+            if len(containers) > 1:
                 logger.debug("Waiting for network to setup for first container")
-                time.sleep(3)
-                wait_first = False
-        logger.info("Waiting for containers to start…")
-        self.terminated_start.wait()
+                if not self.first_started.wait(self.FIRST_START_TIMEOUT):
+                    raise FireHPCRuntimeError(
+                        f"Timeout while waiting for container {containers[0]} to start"
+                    )
+                # Start the remaining containers in parallel with a pool of
+                # workers.
+                with concurrent.futures.ThreadPoolExecutor(
+                    max_workers=max(1, workers)
+                ) as executor:
+                    for future in concurrent.futures.as_completed(
+                        [
+                            executor.submit(self._start_container, container)
+                            for container in containers[1:]
+                        ]
+                    ):
+                        future.result()
+            logger.info("Waiting for containers to start…")
+            with profiler.span("containers registration wait"):
+                if not self.terminated_start.wait(self.START_TIMEOUT):
+                    raise FireHPCRuntimeError(
+                        "Timeout while waiting for containers to start: "
+                        f"{', '.join(list(self.must_start))}"
+                    )
+        finally:
+            self._unwatch()
         logger.info("All containers are successfully started")
-        self.loop.quit()
+        self._report_latencies()
 
     def stop(self, containers: list) -> None:
         self.must_stop = [container.fqdn for container in containers]
@@ -262,15 +478,16 @@ class ClusterStateModifier(DBusObject):
             "Starting waiter thread for containers for containers to stop: %s",
             self.must_stop,
         )
-        waiter = threading.Thread(target=self._waiter)
-        waiter.start()
-        for container in containers:
-            logger.info("Powering off container %s", container.name)
-            container.poweroff()
-        logger.info("Waiting for containers to stop…")
-        self.terminated_stop.wait()
+        self._watch()
+        try:
+            for container in containers:
+                logger.info("Powering off container %s", container.name)
+                container.poweroff()
+            logger.info("Waiting for containers to stop…")
+            self.terminated_stop.wait()
+        finally:
+            self._unwatch()
         logger.info("All containers are successfully stopped")
-        self.loop.quit()
 
 
 class Container(DBusObject):
@@ -291,57 +508,59 @@ class Container(DBusObject):
         # manager (1st process) in container to trigger clean poweroff.
         self.proxy.Kill("leader", signal.SIGRTMIN + 4)
 
-    def addresses(self, wait: bool = True) -> list[str]:
-        """Return the list of network addresses (ipv4 and ipv6) assigned to the
-        container. When wait is True, the method waits until the list of IP addresses is
-        not empty."""
+    def _get_addresses(self) -> tuple[list[str], bool]:
+        """Query once the list of network addresses assigned to the container. Return
+        a 2-tuple with the list of addresses and a boolean which is True when both
+        ipv4 and ipv6 addresses are assigned."""
         found_v4 = False
         found_v6 = False
         result = []
         # machine1 DBus interface returns a sequence of pairs: the 1st element is the
         # address type and the 2nd element is a tuple with address all bytes as separate
         # integers.
-        while True:
-            try:
-                for address in self.proxy.GetAddresses():
-                    if address[0] == int(socket.AF_INET):
-                        found_v4 = True
-                        # Join all bytes with . to build an IPv4 address
-                        result.append(
-                            ipaddress.IPv4Address(".".join(map(str, address[1])))
-                        )
-                    elif address[0] == int(socket.AF_INET6):
-                        found_v6 = True
-                        # Join with : all 2 bytes converted a string of hex values
-                        result.append(
-                            ipaddress.IPv6Address(
-                                ":".join(
-                                    [
-                                        f"{a:x}{b:x}"
-                                        for a, b in zip(*[iter(address[1])] * 2)
-                                    ]
-                                )
+        try:
+            for address in self.proxy.GetAddresses():
+                if address[0] == int(socket.AF_INET):
+                    found_v4 = True
+                    # Join all bytes with . to build an IPv4 address
+                    result.append(ipaddress.IPv4Address(".".join(map(str, address[1]))))
+                elif address[0] == int(socket.AF_INET6):
+                    found_v6 = True
+                    # Join with : all 2 bytes converted a string of hex values
+                    result.append(
+                        ipaddress.IPv6Address(
+                            ":".join(
+                                [f"{a:x}{b:x}" for a, b in zip(*[iter(address[1])] * 2)]
                             )
                         )
-                    else:
-                        logger.error(
-                            "Unsupported socket type %d for address of container %s",
-                            address[0],
-                            self.name,
-                        )
-            except DBusError as err:
-                raise FireHPCRuntimeError(
-                    f"DBus error while getting IP addresses of {self.name}: {err}"
-                ) from err
-            if (found_v4 and found_v6) or not wait:
-                break  # stop main while loop
-            else:
-                logger.debug(
-                    "IP addresses of containers %s are not yet available, retrying…",
-                    self.name,
-                )
-                time.sleep(1)
-        return result
+                    )
+                else:
+                    logger.error(
+                        "Unsupported socket type %d for address of container %s",
+                        address[0],
+                        self.name,
+                    )
+        except DBusError as err:
+            raise FireHPCRuntimeError(
+                f"DBus error while getting IP addresses of {self.name}: {err}"
+            ) from err
+        return result, found_v4 and found_v6
+
+    def addresses(self, wait: bool = True) -> list[str]:
+        """Return the list of network addresses (ipv4 and ipv6) assigned to the
+        container. When wait is True, the method waits until the list of IP addresses is
+        not empty."""
+        delay = ADDRESSES_POLL_MIN_DELAY
+        while True:
+            result, complete = self._get_addresses()
+            if complete or not wait:
+                return result
+            logger.debug(
+                "IP addresses of containers %s are not yet available, retrying…",
+                self.name,
+            )
+            time.sleep(delay)
+            delay = min(delay * 2, ADDRESSES_POLL_MAX_DELAY)
 
     @staticmethod
     def start(name, cluster, namespace) -> None:
@@ -408,6 +627,179 @@ class ContainerImage(Image):
         )
 
 
+def inventory_key(name: str) -> Optional[tuple[str, str]]:
+    """Return (cluster, namespace) 2-tuple of machine or image name, or None if the
+    name does not follow FireHPC <name>.<cluster>.<namespace> format."""
+    parts = name.rsplit(".", 2)
+    if len(parts) < 3:
+        return None
+    return (parts[1], parts[2])
+
+
+class InventorySnapshot(DBusObject, metaclass=Singleton):
+    """Snapshot of machines and images registered in machined, shared by all
+    callers in the process. Machines and images are listed once and indexed by
+    cluster and namespace. The snapshot is then kept up-to-date with machined
+    signals for machines and with images modifications performed by FireHPC, as
+    machined does not emit signals for images."""
+
+    INTERFACE = "org.freedesktop.machine1"
+
+    def __init__(self) -> InventorySnapshot:
+        super().__init__("/org/freedesktop/machine1")
+        self.locker = threading.Lock()
+        self.loop = None
+        # Dicts of machines and images indexed by (cluster, namespace), with dicts
+        # of machines and images tuples indexed by name as values.
+        self.machines = {}
+        self.images = {}
+        # Set of all images names, including images not managed by FireHPC (ie.
+        # base images).
+        self.images_names = set()
+        # Counters indexed by (cluster, namespace), incremented on every machines
+        # and images modification of the cluster, so that callers can detect
+        # changes in the inventory of their cluster.
+        self.generations = {}
+        # List of (new machine, removed machine) handlers notified of machines
+        # signals after snapshot update.
+        self.subscribers = []
+        logger.debug("Listing machines and images to build inventory snapshot")
+        for machine in self.proxy.ListMachines():
+            self._add_machine(machine)
+        for image in self.proxy.ListImages():
+            self._add_image(image)
+        self.proxy.MachineNew.connect(self._machine_new_handler)
+        self.proxy.MachineRemoved.connect(self._machine_removed_handler)
+
+    def _add_machine(self, machine: tuple) -> None:
+        if machine[1] != "container":
+            return
+        key = inventory_key(machine[0])
+        if key is None:
+            return
+        self.machines.setdefault(key, {})[machine[0]] = machine
+
+    def _add_image(self, image: tuple) -> None:
+        self.images_names.add(image[0])
+        key = inventory_key(image[0])
+        if key is None:
+            return
+        self.images.setdefault(key, {})[image[0]] = image
+
+    def _changed(self, key: Optional[tuple[str, str]]) -> None:
+        """Increment generation of the given (cluster, namespace) key. Lock must be
+        acquired by the caller."""
+        if key is None:
+            return
+        self.generations[key] = self.generations.get(key, 0) + 1
+
+    def _machine_new_handler(self, machine: str, path: str) -> None:
+        obj = DBus().proxy(self.INTERFACE, path)
+        try:
+            machine_class = obj.Class
+            service = obj.Service
+        except DBusError as err:
+            logger.debug("Unable to get properties of new machine %s: %s", machine, err)
+        else:
+            self.locker.acquire()
+            self._add_machine((machine, machine_class, service, path))
+            self._changed(inventory_key(machine))
+            self.locker.release()
+        for new_handler, _ in self._subscribers():
+            new_handler(machine)
+
+    def _machine_removed_handler(self, machine: str, path: str) -> None:
+        key = inventory_key(machine)
+        self.locker.acquire()
+        if key in self.machines:
+            self.machines[key].pop(machine, None)
+        self._changed(key)
+        self.locker.release()
+        for _, removed_handler in self._subscribers():
+            removed_handler(machine)
+
+    def _subscribers(self) -> list[tuple[Callable, Callable]]:
+        self.locker.acquire()
+        result = list(self.subscribers)
+        self.locker.release()
+        return result
+
+    def subscribe(self, new_handler: Callable, removed_handler: Callable) -> None:
+        """Register handlers called with machine name when a machine is
+        registered or removed in machined, after the snapshot is updated. This
+        lets callers wait for machines without subscribing to machined signals
+        themselves, so that every signal is processed once by the snapshot."""
+        self.locker.acquire()
+        self.subscribers.append((new_handler, removed_handler))
+        self.locker.release()
+
+    def unsubscribe(self, new_handler: Callable, removed_handler: Callable) -> None:
+        """Unregister handlers of machines signals."""
+        self.locker.acquire()
+        self.subscribers.remove((new_handler, removed_handler))
+        self.locker.release()
+
+    def watch(self) -> None:
+        """Run event loop in background thread to keep the snapshot up-to-date with
+        machined signals in long running processes."""
+        if self.loop is not None:
+            return
+        self.loop = EventLoop()
+        threading.Thread(target=self.loop.run, daemon=True).start()
+
+    def image_added(self, name: str) -> None:
+        """Register in the snapshot an image created by FireHPC."""
+        path = self.proxy.GetImage(name)
+        obj = DBus().proxy(self.INTERFACE, path)
+        self.locker.acquire()
+        self._add_image(
+            (
+                name,
+                obj.Type,
+                obj.ReadOnly,
+                obj.CreationTimestamp,
+                obj.ModificationTimestamp,
+                obj.Usage,
+                path,
+            )
+        )
+        self._changed(inventory_key(name))
+        self.locker.release()
+
+    def image_removed(self, name: str) -> None:
+        """Unregister from the snapshot an image removed by FireHPC."""
+        key = inventory_key(name)
+        self.locker.acquire()
+        self.images_names.discard(name)
+        if key in self.images:
+            self.images[key].pop(name, None)
+        self._changed(key)
+        self.locker.release()
+
+    def generation(self, cluster: str, namespace: str) -> int:
+        """Return generation of machines and images inventory of the given cluster
+        in namespace."""
+        self.locker.acquire()
+        result = self.generations.get((cluster, namespace), 0)
+        self.locker.release()
+        return result
+
+    def running(self, cluster: str, namespace: str) -> list[tuple]:
+        self.locker.acquire()
+        result = list(self.machines.get((cluster, namespace), {}).values())
+        self.locker.release()
+        return result
+
+    def cluster_images(self, cluster: str, namespace: str) -> list[tuple]:
+        self.locker.acquire()
+        result = list(self.images.get((cluster, namespace), {}).values())
+        self.locker.release()
+        return result
+
+    def image_exists(self, name: str) -> bool:
+        return name in self.images_names
+
+
 class ContainersManager(DBusObject):
     INTERFACE = "org.freedesktop.machine1"
 
@@ -419,11 +811,56 @@ class ContainersManager(DBusObject):
     def running(self) -> list:
         return [
             Container.from_machine(machine, self.cluster)
-            for machine in self.proxy.ListMachines()
-            if machine[0].endswith(f".{self.cluster}.{self.namespace}")
-            and machine[1] == "container"
+            for machine in InventorySnapshot().running(self.cluster, self.namespace)
         ]
 
+    def addresses(self, containers: list[Container], timeout: int = 120) -> dict:
+        """Return a dict with the list of network addresses (ipv4 and ipv6) of all
+        containers, indexed by container name. Addresses of all containers are polled
+        in batch with an exponential backoff delay until all containers have both
+        ipv4 and ipv6 addresses or the timeout is reached."""
+        result = {}
+        pending = list(containers)
+        start = time.monotonic()
+        deadline = start + timeout
+        latencies = {}
+        delay = ADDRESSES_POLL_MIN_DELAY
+        while True:
+            with profiler.span("containers addresses poll", pending=len(pending)):
+                polled = [
+                    (container, *container._get_addresses())
+                    for container in list(pending)
+                ]
+            for container, addresses, complete in polled:
+                if complete:
+                    result[container.name] = addresses
+                    latencies[container.name] = time.monotonic() - start
+                    pending.remove(container)
+            if not len(pending):
+                break
+            if time.monotonic() + delay > deadline:
+                raise FireHPCRuntimeError(
+                    f"Timeout while waiting for IP addresses of containers "
+                    f"{', '.join([container.name for container in pending])}"
+                )
+            logger.debug(
+                "IP addresses of %d containers are not yet available, retrying in "
+                "%.1fs…",
+                len(pending),
+                delay,
+            )
+            time.sleep(delay)
+            delay = min(delay * 2, ADDRESSES_POLL_MAX_DELAY)
+        for name, latency in sorted(latencies.items(), key=lambda item: item[1]):
+            logger.debug("IP addresses of container %s found in %.2fs", name, latency)
+        if len(latencies):
+            logger.info(
+                "IP addresses of %d containers found in %.2fs",
+                len(latencies),
+                max(latencies.values()),
+            )
+        return result
+
     def container(self, name) -> Container:
         return Container.from_machine_path(
             self.proxy.GetMachine(f"{name}.{self.cluster}.{self.namespace}")
@@ -432,29 +869,154 @@ class ContainersManager(DBusObject):
     def cluster_images(self) -> list:
         return [
             ContainerImage.from_machine_image(image)
-            for image in self.proxy.ListImages()
-            if image[0].endswith(f".{self.cluster}.{self.namespace}")
+            for image in InventorySnapshot().cluster_images(
+                self.cluster, self.namespace
+            )
         ]
 
     def base_image(self, name) -> BaseImage:
         return BaseImage.from_machine_image_path(self.proxy.GetImage(name))
 
     def image_exists(self, name) -> bool:
-        return name in [image[0] for image in self.proxy.ListImages()]
+        return InventorySnapshot().image_exists(name)
 
-    def download(self, url: str, name: str) -> BaseImage:
-        """Download cluster base image"""
-        ImageImporter(url, name).transfer()
+    def download(
+        self,
+        url: str,
+        name: str,
+        cache: Optional[ImageCache] = None,
+        checksum: Optional[str] = None,
+        threads: int = 0,
+    ) -> BaseImage:
+        """Download cluster base image, through local images cache if defined."""
+        if cache is None:
+            with profiler.span("image download", url=url):
+                ImageImporter(url, name).transfer()
+        else:
+            with profiler.span("image fetch", url=url):
+                cached = cache.fetch(url, checksum)
+            start = time.monotonic()
+            with profiler.span("image import", path=str(cached.path)):
+                ImageImporter(url, name).import_file(cached.path, threads)
+            elapsed = time.monotonic() - start
+            logger.info(
+                "Imported image %s in %.2fs (%.2f MiB/s of image file)",
+                name,
+                elapsed,
+                cached.path.stat().st_size / 1024**2 / elapsed,
+            )
+            cache.mark_imported(name, cached.digest)
+        InventorySnapshot().image_added(name)
         return BaseImage.from_machine_image_path(self.proxy.GetImage(name))
 
-    def clone_base(self, base: BaseImage, node: str) -> None:
-        base.clone(f"{node}.{self.cluster}.{self.namespace}")
+    def clone_base(self, base: Image, node: str) -> None:
+        try:
+            with profiler.span("image clone", node=node):
+                base.clone(f"{node}.{self.cluster}.{self.namespace}")
+        except DBusError as err:
+            raise FireHPCRuntimeError(
+                f"Unable to clone base image {base.name} for {node}: {err}"
+            ) from err
+
+    def clone_base_nodes(self, base: Image, nodes: list[str], workers: int = 1):
+        """Clone base image (or golden image) for all nodes in parallel with a pool
+        of workers."""
+        if not len(nodes):
+            return
+        filesystem = machines_filesystem()
+        if machines_cow(filesystem):
+            logger.info(
+                "Images directory %s is on %s filesystem, clones are copy-on-write",
+                MACHINES_PATH,
+                filesystem,
+            )
+        else:
+            logger.warning(
+                "Images directory %s is on %s filesystem, clones are full copies of "
+                "base image",
+                MACHINES_PATH,
+                filesystem or "unknown",
+            )
+
+        def clone(node: str) -> str:
+            logger.debug("Cloning base image for %s.%s", node, self.cluster)
+            self.clone_base(base, node)
+            return node
+
+        start = time.monotonic()
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, workers)
+        ) as executor:
+            futures = [executor.submit(clone, node) for node in nodes]
+            for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+                logger.info(
+                    "Cloned base image for %s.%s (%d/%d)",
+                    future.result(),
+                    self.cluster,
+                    done,
+                    len(nodes),
+                )
+        elapsed = time.monotonic() - start
+        logger.info(
+            "Cloned %d images in %.2fs (%.2f images/s)",
+            len(nodes),
+            elapsed,
+            len(nodes) / elapsed,
+        )
+        # machined reports UINT64_MAX when image usage is unknown.
+        if base.volume < 2**64 - 1:
+            logger.info(
+                "Clones throughput: %.2f MiB/s",
+                len(nodes) * base.volume / 1024**2 / elapsed,
+            )
 
     def storage(self) -> StorageService:
         return StorageService(self.cluster, self.namespace)
 
-    def start(self, containers: list):
-        ClusterStateModifier(self.cluster, self.namespace).start(containers)
+    def start(self, containers: list, workers: int = 1):
+        ClusterStateModifier(self.cluster, self.namespace).start(containers, workers)
 
-    def stop(self):
-        ClusterStateModifier(self.cluster, self.namespace).stop(self.running())
+    def golden_image_name(self, key: str) -> str:
+        # Golden images names do not follow <name>.<cluster>.<namespace> format so
+        # they are not considered as cluster images, and they are kept when the
+        # cluster is cleaned.
+        return f"firehpc-golden_{key}_{self.cluster}_{self.namespace}"
+
+    def golden_image(self, key: str) -> GoldenImage:
+        name = self.golden_image_name(key)
+        if not self.image_exists(name):
+            raise FireHPCRuntimeError(
+                f"Unable to find golden image {name} of {key} nodes"
+            )
+        return GoldenImage.from_machine_image_path(self.proxy.GetImage(name))
+
+    def capture(self, node: str, key: str) -> GoldenImage:
+        """Clone image of node into golden image of the given key (role and node
+        type), replacing existing golden image."""
+        name = self.golden_image_name(key)
+        if self.image_exists(name):
+            logger.info("Removing existing golden image %s", name)
+            self.golden_image(key).remove()
+        source = f"{node}.{self.cluster}.{self.namespace}"
+        if not self.image_exists(source):
+            raise FireHPCRuntimeError(
+                f"Unable to find image {source} of node {node}, deploy cluster first?"
+            )
+        logger.info("Capturing image of node %s in golden image %s", node, name)
+        try:
+            with profiler.span("image capture", node=node, key=key):
+                ContainerImage.from_machine_image_path(
+                    self.proxy.GetImage(source)
+                ).clone(name)
+        except DBusError as err:
+            raise FireHPCRuntimeError(
+                f"Unable to clone image of node {node} in golden image {name}: {err}"
+            ) from err
+        return self.golden_image(key)
+
+    def stop(self, containers: Optional[list[Container]] = None):
+        """Stop the given containers, or all running containers of the cluster by
+        default."""
+        if containers is None:
+            containers = self.running()
+        ClusterStateModifier(self.cluster, self.namespace).stop(containers)
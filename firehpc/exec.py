@@ -11,22 +11,38 @@ from pathlib import Path
 
 from racksdb import RacksDB
 from racksdb.errors import RacksDBFormatError, RacksDBSchemaError
+from ClusterShell.NodeSet import NodeSet, NodeSetParseError
 
 from .version import get_version
-from .settings import RuntimeSettings, ClusterSettings
-from .state import default_state_dir, UserState, ClusterState
+from .settings import RuntimeSettings, ClusterSettings, optional_absolute_path
+from .state import default_state_dir, UserState, ClusterState, SnapshotState
 from .cluster import EmulatedCluster, clusters_list
 from .environments import bootstrap
 from .ssh import SSHClient
+from .fanout import fanout, gather, statuses
 from .errors import FireHPCRuntimeError
 from .os import OSDatabase
 from .load import load_clusters
+from .workload import Distribution, WorkloadSettings
 from .log import TTYFormatter
 from .dumpers import DumperFactory
+from .profiler import profiler
+from .snapshots import Snapshot
 
 logger = logging.getLogger(__name__)
 
 
+def positive_int(value: str) -> int:
+    """Argument type of strictly positive integers."""
+    try:
+        result = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+    if result < 1:
+        raise argparse.ArgumentTypeError(f"value must be positive: '{value}'")
+    return result
+
+
 class FireHPCExec:
     @classmethod
     def run(cls):
@@ -58,6 +74,13 @@ class FireHPCExec:
             type=Path,
             default=default_state_dir(),
         )
+        parser.add_argument(
+            "--profile",
+            help="Record operations spans and save them in PREFIX.json file and in "
+            "PREFIX.trace.json file in Chrome trace event format",
+            metavar="PREFIX",
+            type=Path,
+        )
         subparsers = parser.add_subparsers(
             help="Action to perform",
             dest="action",
@@ -82,10 +105,15 @@ class FireHPCExec:
             help="Path to RacksDB schema",
             type=Path,
         )
-        parser_deploy.add_argument(
+        deploy_source = parser_deploy.add_mutually_exclusive_group(required=True)
+        deploy_source.add_argument(
             "--os",
             help="Operating system to deploy",
-            required=True,
+        )
+        deploy_source.add_argument(
+            "--from-snapshot",
+            help="Deploy cluster with golden images of its snapshot",
+            action="store_true",
         )
         parser_deploy.add_argument(
             "--update-os-image",
@@ -154,6 +182,11 @@ class FireHPCExec:
             action="store_true",
             help="Run configuration bootstrap",
         )
+        parser_conf.add_argument(
+            "--full",
+            action="store_true",
+            help="Run all roles on all hosts, even when their inputs are unchanged",
+        )
         parser_conf.add_argument(
             "--slurm-emulator",
             help="Enable Slurm emulator mode",
@@ -198,6 +231,52 @@ class FireHPCExec:
         )
         parser_restore.set_defaults(func=self._execute_restore)
 
+        # scale command
+        parser_scale = subparsers.add_parser(
+            "scale", help="Resize cluster to the nodes defined in RacksDB"
+        )
+        parser_scale.add_argument(
+            "--db",
+            help="Path to RacksDB database",
+            type=Path,
+        )
+        parser_scale.add_argument(
+            "--schema",
+            help="Path to RacksDB schema",
+            type=Path,
+        )
+        parser_scale.add_argument(
+            "--cluster",
+            help="Name of the cluster to resize",
+            required=True,
+        )
+        parser_scale.add_argument(
+            "--drain-timeout",
+            help=(
+                "Maximum time in seconds to wait for jobs running on removed nodes "
+                "to finish (default: %(default)s)"
+            ),
+            type=int,
+            default=600,
+        )
+        parser_scale.set_defaults(func=self._execute_scale)
+
+        # snapshot command
+        parser_snapshot = subparsers.add_parser(
+            "snapshot", help="Capture golden images of configured cluster"
+        )
+        parser_snapshot.add_argument(
+            "--cluster",
+            help="Name of the cluster to snapshot",
+            required=True,
+        )
+        parser_snapshot.add_argument(
+            "--remove",
+            help="Remove existing snapshot of cluster",
+            action="store_true",
+        )
+        parser_snapshot.set_defaults(func=self._execute_snapshot)
+
         # ssh command
         parser_ssh = subparsers.add_parser("ssh", help="Connect to cluster by SSH")
         parser_ssh.add_argument(
@@ -207,6 +286,35 @@ class FireHPCExec:
         )
         parser_ssh.set_defaults(func=self._execute_ssh)
 
+        # exec command
+        parser_exec = subparsers.add_parser(
+            "exec", help="Run command in parallel on cluster nodes"
+        )
+        parser_exec.add_argument(
+            "--cluster",
+            help="Name of the cluster",
+            required=True,
+        )
+        parser_exec.add_argument(
+            "-n",
+            "--nodes",
+            help="Set of nodes on which the command is run (ex: cn[1-4],login)",
+            required=True,
+        )
+        parser_exec.add_argument(
+            "--fanout",
+            help="Maximum number of nodes on which the command is run concurrently "
+            "(default: %(default)s)",
+            type=positive_int,
+            default=64,
+        )
+        parser_exec.add_argument(
+            "cmd",
+            help="Command to run with its arguments",
+            nargs="+",
+        )
+        parser_exec.set_defaults(func=self._execute_exec)
+
         # clean command
         parser_clean = subparsers.add_parser("clean", help="Clean emulated cluster")
         parser_clean.add_argument(
@@ -275,6 +383,64 @@ class FireHPCExec:
             type=int,
             default=5,
         )
+        parser_load.add_argument(
+            "--batch",
+            help="Submit jobs in batch with one remote shell per user",
+            action="store_true",
+        )
+        parser_load.add_argument(
+            "--rate",
+            help="Submit jobs in open-loop at this target rate in jobs per minute",
+            type=float,
+        )
+        parser_load.add_argument(
+            "--arrival",
+            help="Distribution of jobs arrivals in open-loop (default: %(default)s)",
+            choices=["poisson", "constant"],
+            default="poisson",
+        )
+        parser_load.add_argument(
+            "--warmup",
+            help=(
+                "Duration in seconds of open-loop rate linear increase (default: "
+                "%(default)s)"
+            ),
+            type=int,
+            default=0,
+        )
+        parser_load.add_argument(
+            "--inflight",
+            help=(
+                "Maximum number of concurrent jobs submissions in open-loop "
+                "and trace replay (default: %(default)s)"
+            ),
+            type=positive_int,
+            default=10,
+        )
+        parser_load.add_argument(
+            "--replay",
+            help="Replay jobs of workload trace in SWF or sacct parsable format",
+            metavar="TRACE",
+            type=Path,
+        )
+        parser_load.add_argument(
+            "--speedup",
+            help="Speedup factor of workload trace replay (default: %(default)s)",
+            type=float,
+            default=1,
+        )
+        parser_load.add_argument(
+            "--durations",
+            help="Distribution of jobs durations in seconds",
+            metavar="DURATION[:WEIGHT]",
+            nargs="+",
+        )
+        parser_load.add_argument(
+            "--sizes",
+            help="Distribution of jobs sizes",
+            metavar="SIZE[:WEIGHT]",
+            nargs="+",
+        )
         parser_load.set_defaults(func=self._execute_load)
 
         # update command
@@ -311,11 +477,17 @@ class FireHPCExec:
         self._setup_logger()
         self.runtime_settings = RuntimeSettings()
         self.user_state = UserState(self.args.state)
+        if self.args.profile:
+            profiler.enable(get_version())
         try:
-            self.args.func()
+            with profiler.span(f"firehpc {self.args.action}"):
+                self.args.func()
         except FireHPCRuntimeError as e:
             logger.critical(str(e))
             sys.exit(1)
+        finally:
+            if self.args.profile:
+                profiler.save(self.args.profile)
 
     def _setup_logger(self):
         if self.args.debug:
@@ -336,7 +508,10 @@ class FireHPCExec:
 
     def _load_racksdb(self, settings: ClusterSettings):
         try:
-            return RacksDB.load(db=settings.racksdb.db, schema=settings.racksdb.schema)
+            with profiler.span("load racksdb"):
+                return RacksDB.load(
+                    db=settings.racksdb.db, schema=settings.racksdb.schema
+                )
         except (RacksDBSchemaError, RacksDBFormatError) as err:
             logger.critical("Unable to load RacksDB database: %s", err)
             sys.exit(1)
@@ -345,6 +520,21 @@ class FireHPCExec:
         bootstrap(self.user_state, self.runtime_settings)
 
     def _execute_deploy(self):
+        if self.args.from_snapshot:
+            # Slurm emulator mode and users directory are restored from snapshot
+            # and nodes are cloned from golden images instead of OS image.
+            for option, value in (
+                ("--slurm-emulator", self.args.slurm_emulator),
+                ("--users", self.args.users),
+                ("--update-os-image", self.args.update_os_image),
+            ):
+                if value:
+                    raise FireHPCRuntimeError(
+                        f"Option {option} cannot be used with --from-snapshot"
+                    )
+            self._deploy_snapshot()
+            return
+
         # Load images sources
         os_db = OSDatabase(self.runtime_settings)
         if not os_db.supported(self.args.os):
@@ -387,7 +577,12 @@ class FireHPCExec:
             ).users_directory
 
         # Deploy cluster
-        cluster.deploy(os_db.url(self.args.os), self.args.update_os_image, db)
+        cluster.deploy(
+            os_db.url(self.args.os),
+            self.args.update_os_image,
+            db,
+            os_db.checksum(self.args.os),
+        )
         cluster.conf(
             db,
             playbooks=["bootstrap", "site"],
@@ -395,6 +590,48 @@ class FireHPCExec:
             ansible_opts=self.args.ansible_opts,
         )
 
+    def _deploy_snapshot(self):
+        # Load snapshot manifest
+        snapshot_state = SnapshotState(self.user_state, self.args.cluster)
+        snapshot = Snapshot.load(snapshot_state.manifest)
+        logger.info(
+            "Deploying cluster %s from snapshot captured on %s",
+            self.args.cluster,
+            snapshot.created.strftime("%Y-%m-%d %H:%M:%S"),
+        )
+
+        # Restore cluster state saved in snapshot, with its generated secrets and
+        # users directory, then update settings with provided args. The state of
+        # a deployed cluster must not be overwritten.
+        state = ClusterState(self.user_state, self.args.cluster)
+        if EmulatedCluster(self.runtime_settings, self.args.cluster, state).deployed():
+            raise FireHPCRuntimeError(
+                f"Cluster {self.args.cluster} is already deployed, clean it first"
+            )
+        snapshot_state.restore(state)
+        cluster_settings = state.load()
+        cluster_settings.racksdb.update_from_args(self.args)
+        if self.args.custom:
+            cluster_settings.custom = optional_absolute_path(self.args.custom)
+        state.save(cluster_settings)
+
+        # Load RacksDB
+        db = self._load_racksdb(cluster_settings)
+
+        cluster = EmulatedCluster(
+            self.runtime_settings, self.args.cluster, state, cluster_settings
+        )
+        cluster.deploy_snapshot(snapshot, db)
+        # Give nodes their own identity and restore cluster with new network
+        # addresses instead of running full configuration.
+        cluster.conf(
+            db,
+            playbooks=["reidentity"],
+            reinit=False,
+            skip_tags=["dependencies"],  # skip slurm->mariadb dependency
+            ansible_opts=self.args.ansible_opts,
+        )
+
     def _execute_conf(self):
         # Load cluster settings
         state = ClusterState(self.user_state, self.args.cluster)
@@ -415,6 +652,7 @@ class FireHPCExec:
             reinit=False,
             tags=self.args.tags,
             ansible_opts=self.args.ansible_opts,
+            incremental=not self.args.full and not self.args.with_bootstrap,
         )
 
     def _execute_restore(self):
@@ -434,6 +672,55 @@ class FireHPCExec:
             skip_tags=["dependencies"],  # skip slurm->mariadb dependency
         )
 
+    def _execute_scale(self):
+        # Load cluster settings, update RacksDB paths with provided args and save
+        # them for subsequent commands.
+        state = ClusterState(self.user_state, self.args.cluster)
+        cluster_settings = state.load()
+        cluster_settings.racksdb.update_from_args(self.args)
+        state.save(cluster_settings)
+
+        os_db = OSDatabase(self.runtime_settings)
+        cluster = EmulatedCluster(
+            self.runtime_settings, self.args.cluster, state, cluster_settings
+        )
+        cluster.scale(
+            os_db.url(cluster_settings.os),
+            self._load_racksdb(cluster_settings),
+            os_db.checksum(cluster_settings.os),
+            self.args.drain_timeout,
+        )
+
+    def _execute_snapshot(self):
+        # Load cluster settings
+        state = ClusterState(self.user_state, self.args.cluster)
+        snapshot_state = SnapshotState(self.user_state, self.args.cluster)
+
+        if self.args.remove:
+            if not snapshot_state.exists():
+                raise FireHPCRuntimeError(
+                    f"Unable to find snapshot of cluster {self.args.cluster}"
+                )
+            EmulatedCluster(
+                self.runtime_settings, self.args.cluster, state
+            ).remove_snapshot(snapshot_state)
+            return
+
+        cluster_settings = state.load()
+        cluster = EmulatedCluster(
+            self.runtime_settings, self.args.cluster, state, cluster_settings
+        )
+        db = self._load_racksdb(cluster_settings)
+        cluster.snapshot(db, snapshot_state)
+        # Restore cluster as nodes captured in snapshot have been restarted and
+        # their network addresses may have changed.
+        cluster.conf(
+            db,
+            playbooks=["restore"],
+            reinit=False,
+            skip_tags=["dependencies"],  # skip slurm->mariadb dependency
+        )
+
     def _execute_start(self):
         # Load cluster settings
         state = ClusterState(self.user_state, self.args.cluster)
@@ -470,6 +757,43 @@ class FireHPCExec:
         ssh = SSHClient(cluster)
         ssh.exec(self.args.args)
 
+    def _execute_exec(self):
+        # Load cluster settings
+        state = ClusterState(self.user_state, self.args.cluster)
+        cluster_settings = state.load()
+
+        cluster = EmulatedCluster(
+            self.runtime_settings, self.args.cluster, state, cluster_settings
+        )
+        try:
+            nodes = NodeSet(self.args.nodes)
+        except NodeSetParseError as err:
+            raise FireHPCRuntimeError(
+                f"Invalid nodeset {self.args.nodes}: {err}"
+            ) from err
+        if not len(nodes):
+            raise FireHPCRuntimeError("At least one node must be selected")
+        ssh = SSHClient(cluster, asbin=False)
+        try:
+            results = fanout(
+                ssh, self.args.cluster, nodes, self.args.cmd, self.args.fanout
+            )
+        finally:
+            ssh.pool.close()
+
+        for output, stream in (("stdout", sys.stdout), ("stderr", sys.stderr)):
+            for nodeset, content in gather(results, output):
+                print("-" * 15, file=stream)
+                print(f"{nodeset} ({len(nodeset)})", file=stream)
+                print("-" * 15, file=stream)
+                print(content.decode(errors="replace"), file=stream, end="", flush=True)
+        for status, nodeset in statuses(results).items():
+            print(f"{nodeset}: exit status {status}")
+        # Exit with the highest exit status of the command on all nodes, as pdsh does.
+        status = max(result.status for result in results.values())
+        if status:
+            sys.exit(status)
+
     def _execute_clean(self):
         # Load cluster settings
         state = ClusterState(self.user_state, self.args.cluster)
@@ -499,11 +823,25 @@ class FireHPCExec:
         print("\n".join(clusters_list(self.args.state)))
 
     def _execute_load(self):
+        workload = WorkloadSettings(
+            durations=(
+                Distribution.parse(self.args.durations) if self.args.durations else None
+            ),
+            sizes=Distribution.parse(self.args.sizes) if self.args.sizes else None,
+            rate=self.args.rate,
+            poisson=self.args.arrival == "poisson",
+            warmup=self.args.warmup,
+            inflight=self.args.inflight,
+            replay=self.args.replay,
+            speedup=self.args.speedup,
+        )
         load_clusters(
             self.runtime_settings,
             self.args.clusters,
             self.user_state,
             self.args.time_off_factor,
+            self.args.batch,
+            workload,
         )
 
     def _execute_update(self):
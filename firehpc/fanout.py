@@ -0,0 +1,85 @@
+# Copyright (c) 2025 Rackslab
+#
+# This file is part of FireHPC.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Run commands in parallel on sets of nodes of emulated clusters."""
+
+from __future__ import annotations
+from collections import namedtuple
+from typing import TYPE_CHECKING
+import concurrent.futures
+import logging
+import time
+
+from ClusterShell.NodeSet import NodeSet
+
+if TYPE_CHECKING:
+    from .ssh import SSHClient
+
+from .errors import FireHPCRuntimeError
+
+logger = logging.getLogger(__name__)
+
+# Exit status reported for nodes on which the command could not be run, as ssh does.
+EXIT_STATUS_UNREACHABLE = 255
+
+NodeResult = namedtuple("NodeResult", ["status", "stdout", "stderr"])
+
+
+def _run_node(ssh: SSHClient, cluster: str, node: str, cmd: list[str]) -> NodeResult:
+    try:
+        return NodeResult(*ssh.exec_status([f"{node}.{cluster}"] + cmd))
+    except FireHPCRuntimeError as err:
+        return NodeResult(EXIT_STATUS_UNREACHABLE, b"", f"{err}\n".encode())
+
+
+def fanout(
+    ssh: SSHClient, cluster: str, nodes: NodeSet, cmd: list[str], workers: int
+) -> dict[str, NodeResult]:
+    """Run command on all nodes with at most workers concurrent executions and
+    return the results indexed by node name."""
+    results = {}
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_run_node, ssh, cluster, node, cmd): node for node in nodes
+        }
+        for future in concurrent.futures.as_completed(futures):
+            node = futures[future]
+            results[node] = future.result()
+            logger.debug(
+                "Command completed on node %s with exit status %d",
+                node,
+                results[node].status,
+            )
+    logger.debug(
+        "Command run on %d nodes in %.2f seconds",
+        len(results),
+        time.perf_counter() - start,
+    )
+    return results
+
+
+def gather(results: dict[str, NodeResult], field: str) -> list[tuple[NodeSet, bytes]]:
+    """Return list of distinct non-empty outputs in field of results with the set of
+    nodes that produced them, sorted by nodeset."""
+    outputs = {}
+    for node, result in results.items():
+        output = getattr(result, field)
+        if not output:
+            continue
+        outputs.setdefault(output, NodeSet()).update(node)
+    return sorted(
+        ((nodeset, output) for output, nodeset in outputs.items()),
+        key=lambda item: str(item[0]),
+    )
+
+
+def statuses(results: dict[str, NodeResult]) -> dict[int, NodeSet]:
+    """Return the sets of nodes indexed by command exit status."""
+    _statuses = {}
+    for node, result in results.items():
+        _statuses.setdefault(result.status, NodeSet()).update(node)
+    return dict(sorted(_statuses.items()))
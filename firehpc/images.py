@@ -0,0 +1,373 @@
+# Copyright (c) 2025 Rackslab
+#
+# This file is part of FireHPC.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Cache OS images locally in user state directory."""
+
+from __future__ import annotations
+from collections import namedtuple
+from pathlib import Path
+import typing as t
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from .errors import FireHPCRuntimeError
+
+logger = logging.getLogger(__name__)
+
+CachedImage = namedtuple("CachedImage", ["path", "digest", "hit"])
+
+# Decompression commands of compressed images indexed by file extension, with
+# multithreaded decompression when supported by the tool.
+DECOMPRESSORS = {
+    ".xz": lambda threads: ["xz", "--decompress", "--stdout", f"--threads={threads}"],
+    ".zst": lambda threads: ["zstd", "--decompress", "--stdout", "--quiet"],
+    ".gz": lambda threads: ["gzip", "--decompress", "--stdout"],
+}
+
+
+# GPG keyrings used by systemd-importd to verify signatures of images checksums
+# files, in order of precedence.
+IMPORT_KEYRINGS = [
+    "/etc/systemd/import-pubring.gpg",
+    "/usr/lib/systemd/import-pubring.gpg",
+]
+# Names of images checksums file and its detached signature, published alongside
+# images as expected by systemd-importd.
+CHECKSUMS_FILE = "SHA256SUMS"
+CHECKSUMS_SIGNATURE_FILE = "SHA256SUMS.gpg"
+
+
+def parse_checksums(content: str, name: str) -> t.Optional[str]:
+    """Return SHA256 digest of file name in content of SHA256SUMS file, or None if
+    the file is not listed."""
+    for line in content.splitlines():
+        fields = line.split(maxsplit=1)
+        if len(fields) != 2:
+            continue
+        # Binary mode files names are prefixed by asterisk
+        if fields[1].strip().lstrip("*") == name:
+            return fields[0].lower()
+    return None
+
+
+def decompressor(path: Path, threads: int = 0) -> t.Optional[list[str]]:
+    """Return command to decompress image on standard output, or None if the image
+    is not compressed. With 0 threads, xz uses as many threads as CPU cores."""
+    command = DECOMPRESSORS.get(path.suffix)
+    if command is None:
+        return None
+    return command(threads) + [str(path)]
+
+
+def _suffixes(name: str) -> str:
+    """Return image file name extensions (eg. .raw.xz)."""
+    return "".join(Path(name).suffixes)
+
+
+class ImageCache:
+    """Content-addressed cache of OS images. Images downloaded from remote URL are
+    stored in files named by their SHA256 digest. Images available locally (file://
+    URL or local mirror) are used in place without copy. An index records the
+    metadata and the digests of images sources, so that unchanged images are detected
+    without downloading or hashing their content again."""
+
+    CHUNK_SIZE = 1024**2
+    # Timeout in seconds of HTTP requests
+    TIMEOUT = 30
+
+    def __init__(self, path: Path, mirror: t.Optional[str] = None):
+        self.path = path
+        self.mirror = mirror
+        self.hits = 0
+        self.misses = 0
+        self.index = {"sources": {}, "imported": {}}
+        if self.index_path.exists():
+            try:
+                with open(self.index_path) as fh:
+                    self.index = json.load(fh)
+            except (OSError, json.decoder.JSONDecodeError) as err:
+                logger.warning(
+                    "Unable to load images cache index %s, ignoring: %s",
+                    self.index_path,
+                    err,
+                )
+
+    @property
+    def index_path(self) -> Path:
+        return self.path / "index.json"
+
+    @property
+    def blobs(self) -> Path:
+        return self.path / "sha256"
+
+    def _save_index(self) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_suffix(".tmp")
+        with open(tmp, "w+") as fh:
+            json.dump(self.index, fh, indent=2)
+        tmp.replace(self.index_path)
+
+    def _source(self, url: str) -> str:
+        """Return URL of image on mirror if defined, or the original URL."""
+        if not self.mirror:
+            return url
+        name = os.path.basename(urllib.parse.urlparse(url).path)
+        return f"{self.mirror.rstrip('/')}/{name}"
+
+    def _record(self, url: str, metadata: dict, digest: str, path: Path) -> None:
+        previous = self.index["sources"].get(url)
+        self.index["sources"][url] = {
+            "metadata": metadata,
+            "digest": digest,
+            "path": str(path),
+        }
+        # Remove previous blob unless still referenced by another source
+        if previous is not None and Path(previous["path"]).parent == self.blobs:
+            if not any(
+                source["path"] == previous["path"]
+                for source in self.index["sources"].values()
+            ):
+                logger.debug("Removing unreferenced cached image %s", previous["path"])
+                Path(previous["path"]).unlink(missing_ok=True)
+        self._save_index()
+
+    def _hit(self, url: str, metadata: dict, checksum: t.Optional[str]):
+        """Return cached image if source metadata are unchanged and cached file is
+        present, or None otherwise."""
+        entry = self.index["sources"].get(url)
+        if entry is None or entry["metadata"] != metadata:
+            return None
+        if checksum is not None and entry["digest"] != checksum:
+            return None
+        path = Path(entry["path"])
+        if not path.exists():
+            return None
+        if "size" in metadata and metadata["size"] is not None:
+            if path.stat().st_size != metadata["size"]:
+                return None
+        self.hits += 1
+        logger.info("Image cache hit for %s", url)
+        return CachedImage(path, entry["digest"], True)
+
+    def _verify(self, url: str, digest: str, checksum: t.Optional[str]) -> None:
+        if checksum is not None and digest != checksum:
+            raise FireHPCRuntimeError(
+                f"Checksum mismatch for image {url}: expected sha256 {checksum}, got "
+                f"{digest}"
+            )
+
+    def _report(self, url: str, size: int, elapsed: float, action: str) -> None:
+        logger.info(
+            "Image %s %s: %.1f MiB in %.2fs (%.2f MiB/s)",
+            url,
+            action,
+            size / 1024**2,
+            elapsed,
+            size / 1024**2 / max(elapsed, 1e-6),
+        )
+
+    def remote(self, url: str) -> bool:
+        """Return True if image of URL is retrieved from a remote source."""
+        return urllib.parse.urlparse(self._source(url)).scheme not in ("", "file")
+
+    def _keyring(self) -> t.Optional[str]:
+        for keyring in IMPORT_KEYRINGS:
+            if os.path.exists(keyring):
+                return keyring
+        return None
+
+    def signed_checksum(self, url: str) -> t.Optional[str]:
+        """Return SHA256 digest of remote image listed in SHA256SUMS file published
+        alongside the image, after verification of its GPG signature with
+        systemd-importd keyring. Return None if the digest cannot be verified."""
+        source = self._source(url)
+        base, _, name = source.rpartition("/")
+        keyring = self._keyring()
+        if keyring is None:
+            logger.warning(
+                "Unable to find systemd-importd keyring to verify image %s", source
+            )
+            return None
+        with tempfile.TemporaryDirectory() as tmp:
+            files = {}
+            for filename in (CHECKSUMS_FILE, CHECKSUMS_SIGNATURE_FILE):
+                files[filename] = Path(tmp) / filename
+                try:
+                    with urllib.request.urlopen(
+                        f"{base}/{filename}", timeout=self.TIMEOUT
+                    ) as response:
+                        files[filename].write_bytes(response.read())
+                except (urllib.error.URLError, OSError) as err:
+                    logger.warning(
+                        "Unable to retrieve %s of image %s: %s", filename, source, err
+                    )
+                    return None
+            # GPG home directory is created in the temporary directory to avoid
+            # modification of user keyrings.
+            home = Path(tmp) / "gnupg"
+            home.mkdir(mode=0o700)
+            cmd = [
+                "gpg",
+                "--no-options",
+                "--no-default-keyring",
+                "--no-auto-key-locate",
+                "--no-auto-check-trustdb",
+                "--batch",
+                "--trust-model=always",
+                f"--homedir={home}",
+                f"--keyring={keyring}",
+                "--verify",
+                str(files[CHECKSUMS_SIGNATURE_FILE]),
+                str(files[CHECKSUMS_FILE]),
+            ]
+            try:
+                subprocess.run(cmd, capture_output=True, check=True)
+            except (OSError, subprocess.CalledProcessError) as err:
+                logger.warning(
+                    "Unable to verify signature of %s of image %s: %s",
+                    CHECKSUMS_FILE,
+                    source,
+                    getattr(err, "stderr", None) or err,
+                )
+                return None
+            digest = parse_checksums(files[CHECKSUMS_FILE].read_text(), name)
+        if digest is None:
+            logger.warning("Image %s is not listed in %s", source, CHECKSUMS_FILE)
+        return digest
+
+    def fetch(self, url: str, checksum: t.Optional[str] = None) -> CachedImage:
+        """Return cached image of URL, downloading it when missing or changed. When
+        checksum is given, the SHA256 digest of the image is verified. Checksum is
+        required for images from remote sources, FireHPCRuntimeError is raised
+        otherwise."""
+        source = self._source(url)
+        parsed = urllib.parse.urlparse(source)
+        if parsed.scheme in ("", "file"):
+            return self._fetch_local(url, Path(parsed.path), checksum)
+        if checksum is None:
+            raise FireHPCRuntimeError(
+                f"Unable to cache image {source} without verified checksum"
+            )
+        return self._fetch_remote(url, source, checksum)
+
+    def _fetch_local(
+        self, url: str, path: Path, checksum: t.Optional[str]
+    ) -> CachedImage:
+        try:
+            stat = path.stat()
+        except OSError as err:
+            raise FireHPCRuntimeError(f"Unable to access image {path}: {err}") from err
+        metadata = {
+            "source": str(path),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+        }
+        cached = self._hit(url, metadata, checksum)
+        if cached is not None:
+            return cached
+        self.misses += 1
+        logger.info("Image cache miss for %s, computing checksum of %s", url, path)
+        digest = hashlib.sha256()
+        start = time.monotonic()
+        with open(path, "rb") as fh:
+            while chunk := fh.read(self.CHUNK_SIZE):
+                digest.update(chunk)
+        self._report(str(path), stat.st_size, time.monotonic() - start, "hashed")
+        self._verify(url, digest.hexdigest(), checksum)
+        self._record(url, metadata, digest.hexdigest(), path)
+        return CachedImage(path, digest.hexdigest(), False)
+
+    def _fetch_remote(
+        self, url: str, source: str, checksum: t.Optional[str]
+    ) -> CachedImage:
+        try:
+            with urllib.request.urlopen(
+                urllib.request.Request(source, method="HEAD"), timeout=self.TIMEOUT
+            ) as response:
+                length = response.headers.get("Content-Length")
+                metadata = {
+                    "source": source,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "size": int(length) if length is not None else None,
+                }
+        except (urllib.error.URLError, OSError) as err:
+            # Use cached image when source is not reachable
+            entry = self.index["sources"].get(url)
+            if entry is not None and Path(entry["path"]).exists():
+                logger.warning(
+                    "Unable to check image %s, using cached image: %s", source, err
+                )
+                self._verify(url, entry["digest"], checksum)
+                self.hits += 1
+                return CachedImage(Path(entry["path"]), entry["digest"], True)
+            raise FireHPCRuntimeError(f"Unable to retrieve image {source}: {err}")
+        cached = self._hit(url, metadata, checksum)
+        if cached is not None:
+            return cached
+        self.misses += 1
+        logger.info("Image cache miss for %s, downloading %s", url, source)
+        self.blobs.mkdir(parents=True, exist_ok=True)
+        # Download in a temporary file with a unique name, so that concurrent
+        # downloads of the same image do not overwrite each other.
+        fh = tempfile.NamedTemporaryFile(
+            dir=self.blobs,
+            prefix=".download",
+            suffix=_suffixes(source),
+            delete=False,
+        )
+        tmp = Path(fh.name)
+        digest = hashlib.sha256()
+        size = 0
+        start = time.monotonic()
+        try:
+            with fh:
+                with urllib.request.urlopen(source, timeout=self.TIMEOUT) as response:
+                    while chunk := response.read(self.CHUNK_SIZE):
+                        digest.update(chunk)
+                        fh.write(chunk)
+                        size += len(chunk)
+        except (urllib.error.URLError, OSError) as err:
+            tmp.unlink(missing_ok=True)
+            raise FireHPCRuntimeError(
+                f"Unable to download image {source}: {err}"
+            ) from err
+        self._report(source, size, time.monotonic() - start, "downloaded")
+        try:
+            self._verify(url, digest.hexdigest(), checksum)
+        except FireHPCRuntimeError:
+            tmp.unlink(missing_ok=True)
+            raise
+        path = self.blobs / f"{digest.hexdigest()}{_suffixes(source)}"
+        os.replace(tmp, path)
+        self._record(url, metadata, digest.hexdigest(), path)
+        return CachedImage(path, digest.hexdigest(), False)
+
+    def imported(self, name: str) -> t.Optional[str]:
+        """Return digest of the image imported with the given name."""
+        return self.index["imported"].get(name)
+
+    def mark_imported(self, name: str, digest: str) -> None:
+        """Record digest of the image imported with the given name."""
+        self.index["imported"][name] = digest
+        self._save_index()
+
+    def forget_imported(self, name: str) -> None:
+        """Remove record of the image imported with the given name, when the image
+        is removed."""
+        if self.index["imported"].pop(name, None) is not None:
+            self._save_index()
+
+    def report(self) -> None:
+        logger.info("Images cache: %d hit(s), %d miss(es)", self.hits, self.misses)
@@ -0,0 +1,202 @@
+# Copyright (c) 2025 Rackslab
+#
+# This file is part of FireHPC.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Compute digests of cluster configuration inputs to limit Ansible runs to the
+roles and hosts whose inputs changed since the last successful run."""
+
+from __future__ import annotations
+import dataclasses
+import hashlib
+import json
+from pathlib import Path
+import typing as t
+import logging
+
+import yaml
+
+from .errors import FireHPCRuntimeError
+
+logger = logging.getLogger(__name__)
+
+# Version of digests file format, digests saved with another version are ignored.
+DIGESTS_VERSION = 1
+
+
+def _update_path(digest, path: Path, root: Path) -> None:
+    if path.is_dir():
+        for child in sorted(path.iterdir()):
+            _update_path(digest, child, root)
+    elif path.exists():
+        digest.update(str(path.relative_to(root)).encode())
+        digest.update(b"\0")
+        with open(path, "rb") as fh:
+            digest.update(hashlib.sha256(fh.read()).digest())
+
+
+def paths_digest(paths: t.Iterable[Path]) -> str:
+    """Return digest of files content and relative names, recursively in
+    directories. Missing paths are ignored."""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(str(path).encode())
+        digest.update(b"\0")
+        _update_path(digest, path, path.parent)
+    return digest.hexdigest()
+
+
+def data_digest(data: t.Any) -> str:
+    """Return digest of JSON serializable data."""
+    return hashlib.sha256(
+        json.dumps(data, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def _vars_paths(path: Path, name: str) -> list[Path]:
+    """Return group_vars or host_vars files and directories that define variables of
+    the given group or host name."""
+    if not path.exists():
+        return []
+    return sorted(
+        child
+        for child in path.iterdir()
+        if child.name == name
+        or (child.is_file() and child.name.rsplit(".", 1)[0] == name)
+    )
+
+
+def role_dependencies(roles: Path, role: str) -> list[str]:
+    """Return role with all its dependencies recursively."""
+    result = [role]
+    meta = roles / role / "meta" / "main.yml"
+    if not meta.exists():
+        return result
+    with open(meta) as fh:
+        content = yaml.safe_load(fh) or {}
+    for dependency in content.get("dependencies", []):
+        if isinstance(dependency, dict):
+            dependency = dependency.get("role", dependency.get("name"))
+        for _role in role_dependencies(roles, dependency):
+            if _role not in result:
+                result.append(_role)
+    return result
+
+
+def playbook_tags(playbook: Path, roles: Path) -> dict[str, list[str]]:
+    """Return roles of playbook with their dependencies, indexed by role tags. Roles
+    dependencies are included as they inherit the tags of the role in Ansible."""
+    with open(playbook) as fh:
+        plays = yaml.safe_load(fh)
+    result = {}
+    for play in plays:
+        for role in play.get("roles", []):
+            if isinstance(role, str):
+                role = {"role": role}
+            role_tags = role.get("tags", [])
+            if isinstance(role_tags, str):
+                role_tags = [role_tags]
+            for tag in role_tags:
+                for _role in role_dependencies(roles, role["role"]):
+                    if _role not in result.setdefault(tag, []):
+                        result[tag].append(_role)
+    return result
+
+
+@dataclasses.dataclass
+class ConfDigests:
+    """Digests of inputs shared by all roles and hosts, digests of inputs of every
+    role tag and digests of inputs specific to every host."""
+
+    common: str
+    tags: dict[str, str]
+    hosts: dict[str, str]
+
+    @classmethod
+    def compute(
+        cls,
+        ansible: Path,
+        playbook: str,
+        conf: Path,
+        groups: dict[str, list[str]],
+        variables: dict[str, t.Any],
+        inputs: t.Optional[list[Path]] = None,
+    ) -> ConfDigests:
+        """Compute digests with Ansible configuration path, playbook name, cluster
+        configuration directory, groups of inventory hosts, extra variables and
+        additional input files."""
+        custom_group_vars = conf / "group_vars"
+        custom_host_vars = conf / "host_vars"
+        common = paths_digest(
+            [
+                ansible / f"{playbook}.yml",
+                ansible / "group_vars",
+                conf / "ansible.cfg",
+                conf / "hosts",
+                conf / "custom.yml",
+            ]
+            + _vars_paths(custom_group_vars, "all")
+            + (inputs or [])
+        )
+        common = data_digest([common, variables])
+        roles = ansible / "roles"
+        tags = {
+            tag: paths_digest([roles / role for role in _roles])
+            for tag, _roles in playbook_tags(ansible / f"{playbook}.yml", roles).items()
+        }
+        hosts = {}
+        for group, members in groups.items():
+            for host in members:
+                hosts.setdefault(host, []).extend(_vars_paths(custom_group_vars, group))
+        hosts = {
+            host: paths_digest(paths + _vars_paths(custom_host_vars, host))
+            for host, paths in hosts.items()
+        }
+        return cls(common, tags, hosts)
+
+    def changes(
+        self, previous: t.Optional[ConfDigests]
+    ) -> t.Optional[tuple[list[str], list[str]]]:
+        """Return the tags and the hosts whose digests changed since previous
+        digests, or None if all roles must be run on all hosts."""
+        if previous is None:
+            logger.debug("Previous configuration digests are not available")
+            return None
+        if previous.common != self.common:
+            logger.debug("Configuration inputs shared by all roles have changed")
+            return None
+        tags = [
+            tag for tag, digest in self.tags.items() if previous.tags.get(tag) != digest
+        ]
+        hosts = [
+            host
+            for host, digest in self.hosts.items()
+            if previous.hosts.get(host) != digest
+        ]
+        return tags, hosts
+
+    def save(self, path: Path) -> None:
+        logger.debug("Saving configuration digests in file %s", path)
+        with open(path, "w+") as fh:
+            json.dump(
+                {"version": DIGESTS_VERSION} | dataclasses.asdict(self), fh, indent=2
+            )
+
+    @classmethod
+    def load(cls, path: Path) -> t.Optional[ConfDigests]:
+        """Return digests saved in file, or None if the file is missing or if its
+        format is not supported."""
+        if not path.exists():
+            return None
+        try:
+            with open(path) as fh:
+                content = json.load(fh)
+        except (OSError, json.decoder.JSONDecodeError) as err:
+            raise FireHPCRuntimeError(
+                f"Unable to load configuration digests from file {path}: {err}"
+            ) from err
+        if content.get("version") != DIGESTS_VERSION:
+            logger.debug("Ignoring configuration digests with unsupported version")
+            return None
+        return cls(content["common"], content["tags"], content["hosts"])
@@ -5,13 +5,17 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from __future__ import annotations
-from typing import TYPE_CHECKING, List, Optional
+from typing import TYPE_CHECKING, Callable, Iterator, List, Optional
 import logging
+import os
 import sys
 import json
 import random
+import shlex
 import time
-import threading
+import asyncio
+import concurrent.futures
+import contextlib
 from collections import namedtuple
 from datetime import datetime
 
@@ -19,10 +23,15 @@ from .settings import RuntimeSettings
 from .cluster import EmulatedCluster
 from .state import UserState, ClusterState
 from .ssh import SSHClient
+from .containers import InventorySnapshot
+from .workload import Distribution, WorkloadSettings, ArrivalProcess, Dispatches
+from .traces import TraceJob, TraceMapper, processors_allocation, read_trace
+from .streams import lines, json_items
 from .errors import FireHPCRuntimeError
 
 if TYPE_CHECKING:
     from .users import UserEntry
+    from .cluster import ClusterStatus
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +40,14 @@ logger = logging.getLogger(__name__)
 JOBS_TIMELIMITS = (["10", "30", "1:0:0", "6:0:0"], [50, 5, 2, 1])
 JOBS_DURATIONS = ([360, 540, 720, 1200], [50, 5, 2, 1])
 
+# Interval in seconds between reports of jobs submission rates
+RATES_REPORT_INTERVAL = 60
+# Interval in seconds between checks of active jobs in closed-loop, also used as
+# back-off delay when all jobs submissions fail.
+ACTIVE_JOBS_POLL_INTERVAL = 5
+# Number of threads in executor reserved to run blocking commands for every cluster
+LOADER_WORKERS_PER_CLUSTER = 2
+
 ClusterPartition = namedtuple(
     "ClusterPartition", ["name", "nodes", "cpus", "gpus", "time"]
 )
@@ -41,50 +58,165 @@ def load_clusters(
     clusters: List[str],
     user_state: UserState,
     time_off_factor: int,
+    batch: bool = False,
+    workload: Optional[WorkloadSettings] = None,
 ):
     loaders = []
-    threads = []
+    # Keep machines inventory up-to-date with machined signals during the whole
+    # life of the loaders.
+    InventorySnapshot().watch()
     try:
         for _cluster in clusters:
             cluster_state = ClusterState(user_state, _cluster)
-            loader = ClusterJobsLoader(
-                EmulatedCluster(
-                    settings, _cluster, cluster_state, cluster_state.load()
-                ),
-                time_off_factor,
+            loaders.append(
+                ClusterJobsLoader(
+                    EmulatedCluster(
+                        settings, _cluster, cluster_state, cluster_state.load()
+                    ),
+                    time_off_factor,
+                    batch,
+                    workload,
+                )
             )
-            thread = threading.Thread(target=loader.run)
-            loaders.append(loader)
-            threads.append(thread)
-            thread.start()
-        # wait for any thread
-        threads[0].join()
+        asyncio.run(_run_loaders(loaders))
     except FireHPCRuntimeError as e:
         logger.critical(str(e))
         sys.exit(1)
     except KeyboardInterrupt:
-        logger.info("Received keyboard interrupt, setting loader stop flag.")
+        logger.info("Received keyboard interrupt, cluster jobs loader is stopped.")
+
+
+async def _run_loaders(loaders: List[ClusterJobsLoader]) -> None:
+    """Run all clusters jobs loaders concurrently in the same event loop and
+    periodically report their submission rates."""
+    # Blocking SSH commands are run in threads of the loop default executor. Size
+    # the executor to let all loaders run their commands concurrently, including
+    # the in-flight jobs submissions in open-loop.
+    asyncio.get_running_loop().set_default_executor(
+        concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(sum(loader.workers for loader in loaders), 4)
+        )
+    )
+    reporter = asyncio.create_task(_report_rates(loaders))
+    try:
+        await asyncio.gather(*[loader.run() for loader in loaders])
+    finally:
+        reporter.cancel()
+
+
+async def _report_rates(loaders: List[ClusterJobsLoader]) -> None:
+    """Report jobs submission rates of all loaders at regular interval."""
+    while True:
+        await asyncio.sleep(RATES_REPORT_INTERVAL)
         for loader in loaders:
-            loader.stop = True
-        logger.info("Waiting for loader threads to stop…")
-        for thread in threads:
-            thread.join()
-        logger.info("Cluster jobs loader is stopped.")
+            logger.info(
+                "cluster %s: %d jobs submitted (%.2f jobs per minute)",
+                loader.cluster.name,
+                loader.submitted,
+                loader.submit_rate,
+            )
+            logger.debug(
+                "cluster %s: SSH connections pool hits: %d, misses: %d",
+                loader.cluster.name,
+                loader.ssh.pool.hits,
+                loader.ssh.pool.misses,
+            )
+            if loader.arrivals is not None:
+                logger.info(
+                    "cluster %s: achieved submission rate after warm-up: %.2f jobs "
+                    "per minute (requested: %.2f)",
+                    loader.cluster.name,
+                    loader.arrivals.achieved_rate(time.monotonic()),
+                    loader.arrivals.rate,
+                )
+            if loader.dispatches is not None:
+                logger.info(
+                    "cluster %s: %d late and %d failed submissions",
+                    loader.cluster.name,
+                    loader.dispatches.late,
+                    loader.dispatches.failed,
+                )
 
 
 class ClusterJobsLoader:
-    def __init__(self, cluster: EmulatedCluster, time_off_factor: int):
+    # Maximum age in seconds of cached cluster status
+    STATUS_REFRESH_INTERVAL = 300
+
+    def __init__(
+        self,
+        cluster: EmulatedCluster,
+        time_off_factor: int,
+        batch: bool = False,
+        workload: Optional[WorkloadSettings] = None,
+    ):
         self.cluster = cluster
+        # Namespace of cluster machines and images in inventory snapshot
+        self.namespace = os.getlogin()
         self.time_off_factor = time_off_factor
+        self.batch = batch
+        self.workload = workload if workload is not None else WorkloadSettings()
+        self.durations = self.workload.durations or Distribution(*JOBS_DURATIONS)
+        # Initialized in open-loop mode
+        self.arrivals = None
+        # Initialized in open-loop and trace replay modes
+        self.dispatches = None
         self.ssh = SSHClient(self.cluster, asbin=False)
-        self.stop = False
         # Initialized in run()
         self.select_type = None
         self.accounting = False
+        self.slurm_conf = "/etc/slurm/slurm.conf"
+        # Cached cluster status with the time and the inventory generation of its
+        # last refresh.
+        self._status = None
+        self._status_time = None
+        self._status_generation = None
+        self.status_refreshes = 0
+        self.submitted = 0
+        self.started = time.monotonic()
+
+    def _get_status(self) -> ClusterStatus:
+        """Return cluster status, refreshed when it is older than refresh interval
+        or when machines and images inventory of the cluster has changed. As
+        refresh loads files and performs D-Bus requests, this method must be called
+        in a worker thread to avoid blocking the event loop."""
+        now = time.monotonic()
+        generation = InventorySnapshot().generation(self.cluster.name, self.namespace)
+        if (
+            self._status is None
+            or now - self._status_time > self.STATUS_REFRESH_INTERVAL
+            or generation != self._status_generation
+        ):
+            logger.debug("cluster %s: refreshing cluster status", self.cluster.name)
+            self._status = self.cluster.status()
+            self._status_time = now
+            self._status_generation = generation
+            self.status_refreshes += 1
+        return self._status
+
+    async def _refresh_status(self) -> ClusterStatus:
+        """Return cluster status, refreshed in a worker thread when required."""
+        return await asyncio.to_thread(self._get_status)
 
-    def run(self) -> None:
+    @property
+    def workers(self) -> int:
+        """Return the number of threads required to run blocking commands."""
+        if self.workload.open_loop or self.workload.replay is not None:
+            return LOADER_WORKERS_PER_CLUSTER + self.workload.inflight
+        return LOADER_WORKERS_PER_CLUSTER
+
+    @property
+    def status_refreshes_rate(self) -> float:
+        """Return the average number of cluster status refreshes per minute."""
+        return self.status_refreshes / max(time.monotonic() - self.started, 1) * 60
+
+    @property
+    def submit_rate(self) -> float:
+        """Return the average number of submitted jobs per minute."""
+        return self.submitted / max(time.monotonic() - self.started, 1) * 60
+
+    async def run(self) -> None:
         logger.info("cluster %s: started running jobs loader", self.cluster.name)
-        status = self.cluster.status()
+        self.started = time.monotonic()
 
         def random_partition():
             """Select randomly one partition weighted by their number of nodes."""
@@ -93,98 +225,367 @@ class ClusterJobsLoader:
             )[0]
 
         try:
-            self._get_cluster_config()
-            partitions = self._get_partitions()
+            await asyncio.to_thread(self._get_cluster_config)
+            partitions = await asyncio.to_thread(self._get_partitions)
             logger.info(
                 "cluster %s: partitions found: %s", self.cluster.name, partitions
             )
-            qos = self._get_qos()
+            qos = await asyncio.to_thread(self._get_qos)
             logger.info("cluster %s: QOS found: %s", self.cluster.name, qos)
 
-            while not self.stop:
-                active_jobs = self._get_nb_active_jobs()
-                active_jobs_limit = self._get_nb_active_jobs_limit(partitions)
-                if active_jobs >= active_jobs_limit:
-                    logger.debug(
-                        "cluster %s: Waiting for jobs to run…",
-                        self.cluster.name,
-                    )
-                    time.sleep(5)
-                else:
-                    nb_submit = active_jobs_limit - active_jobs
-                    logger.info(
-                        "cluster %s: %s new jobs to submit",
-                        self.cluster.name,
-                        nb_submit,
-                    )
-                    while nb_submit:
-                        user = random.choice(status.directory.users)
-                        self._launch_job(user, random.choice(qos), random_partition())
-                        nb_submit -= 1
+            if self.workload.replay is not None:
+                await self._run_replay(partitions, qos)
+            elif self.workload.open_loop:
+                await self._run_open_loop(qos, random_partition)
+            else:
+                await self._run_closed_loop(partitions, qos, random_partition)
         except FireHPCRuntimeError as err:
             logger.critical(
-                "cluster %s: emulator thread failed with error: %s",
+                "cluster %s: jobs loader failed with error: %s",
                 self.cluster.name,
                 str(err),
             )
-        logger.info("cluster %s: jobs loader is stopping", self.cluster.name)
+        except asyncio.CancelledError:
+            logger.info("cluster %s: jobs loader is cancelled", self.cluster.name)
+            raise
+        finally:
+            logger.info(
+                "cluster %s: jobs loader is stopping after %d jobs submitted "
+                "(%.2f jobs per minute)",
+                self.cluster.name,
+                self.submitted,
+                self.submit_rate,
+            )
+            self.ssh.pool.close()
 
-    def _get_cluster_config(self) -> None:
-        stdout, stderr = self.ssh.exec(
-            [f"admin.{self.cluster.name}", "scontrol", "show", "config"]
+    async def _run_closed_loop(
+        self,
+        partitions: list[ClusterPartition],
+        qos: list[str],
+        random_partition: Callable,
+    ) -> None:
+        """Keep submitting jobs up to the limit of active jobs."""
+        # The number of active jobs is retrieved from the cluster when waiting
+        # for jobs to run and it is incremented with the number of jobs
+        # submitted in between.
+        active_jobs = await asyncio.to_thread(self._get_nb_active_jobs)
+        while True:
+            active_jobs_limit = self._get_nb_active_jobs_limit(partitions)
+            if active_jobs >= active_jobs_limit:
+                logger.debug(
+                    "cluster %s: Waiting for jobs to run…",
+                    self.cluster.name,
+                )
+                await asyncio.sleep(ACTIVE_JOBS_POLL_INTERVAL)
+                active_jobs = await asyncio.to_thread(self._get_nb_active_jobs)
+            else:
+                nb_submit = active_jobs_limit - active_jobs
+                logger.info(
+                    "cluster %s: %s new jobs to submit (status refreshes per "
+                    "minute: %.2f)",
+                    self.cluster.name,
+                    nb_submit,
+                    self.status_refreshes_rate,
+                )
+                status = await self._refresh_status()
+                host = self._submission_host(status)
+                if self.batch:
+                    jobs_ids = await asyncio.to_thread(
+                        self._launch_jobs,
+                        [
+                            (
+                                random.choice(status.directory.users),
+                                random.choice(qos),
+                                random_partition(),
+                            )
+                            for _ in range(nb_submit)
+                        ],
+                        host,
+                    )
+                    submitted = len(jobs_ids)
+                else:
+                    submitted = 0
+                    while nb_submit:
+                        if await asyncio.to_thread(
+                            self._launch_job,
+                            random.choice(status.directory.users),
+                            host,
+                            random.choice(qos),
+                            random_partition(),
+                        ):
+                            submitted += 1
+                        nb_submit -= 1
+                self.submitted += submitted
+                active_jobs += submitted
+                # Back off when all submissions failed to avoid hammering the
+                # cluster with failing submissions.
+                if not submitted:
+                    logger.warning(
+                        "cluster %s: all jobs submissions failed, retrying in %ds",
+                        self.cluster.name,
+                        ACTIVE_JOBS_POLL_INTERVAL,
+                    )
+                    await asyncio.sleep(ACTIVE_JOBS_POLL_INTERVAL)
+
+    async def _run_open_loop(self, qos: list[str], random_partition: Callable) -> None:
+        """Submit jobs at target arrival rate, regardless of the number of active
+        jobs. Every arrival is dispatched in its own task, so that arrivals are not
+        delayed by submissions latency, with a bounded number of in-flight
+        submissions."""
+        self.arrivals = ArrivalProcess(
+            self.workload.rate, self.workload.poisson, self.workload.warmup
+        )
+        logger.info(
+            "cluster %s: submitting jobs in open-loop at %.2f jobs per minute with "
+            "%s arrivals, %ds warm-up and at most %d in-flight submissions",
+            self.cluster.name,
+            self.workload.rate,
+            "poisson" if self.workload.poisson else "constant",
+            self.workload.warmup,
+            self.workload.inflight,
         )
-        for line in stdout.decode().split("\n"):
-            if line.startswith("SelectType "):
-                self.select_type = line.split(" = ")[1]
-            if (
-                line.startswith("AccountingStorageType ")
-                and line.split(" = ")[1] == "accounting_storage/slurmdbd"
-            ):
-                self.accounting = True
-
-    def _get_partition_gpus(self, partition):
-        """Return the total number of GPU GRES in a partition."""
-        result = 0
+        self.dispatches = self.arrivals
+        inflight = asyncio.Semaphore(self.workload.inflight)
+        # Keep references of running tasks to prevent their garbage collection.
+        tasks = set()
+
+        self.arrivals.begin(time.monotonic())
+        try:
+            while True:
+                scheduled = self.arrivals.next_arrival()
+                delay = scheduled - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                # When the maximum number of in-flight submissions is reached,
+                # the arrival is dispatched late.
+                await inflight.acquire()
+                status = await self._refresh_status()
+                self._dispatch(
+                    inflight,
+                    tasks,
+                    scheduled,
+                    random.choice(status.directory.users),
+                    self._submission_host(status),
+                    random.choice(qos),
+                    random_partition(),
+                )
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _dispatch(
+        self,
+        inflight: asyncio.Semaphore,
+        tasks: set[asyncio.Task],
+        scheduled: float,
+        *args,
+    ) -> None:
+        """Record dispatch of job submission scheduled at the given time and run it
+        in a new task. The in-flight submissions semaphore must be acquired by the
+        caller, it is released when the submission is over."""
+
+        async def submit() -> None:
+            try:
+                if await asyncio.to_thread(self._launch_job, *args):
+                    self.submitted += 1
+                else:
+                    self.dispatches.record_failure()
+            except Exception as err:
+                # Catch all errors, including SSH library and network errors, so
+                # that they are counted and not lost in unretrieved task
+                # exceptions.
+                logger.warning(
+                    "cluster %s: job submission failed: %s", self.cluster.name, err
+                )
+                self.dispatches.record_failure()
+            finally:
+                inflight.release()
+
+        self.dispatches.record(time.monotonic(), scheduled)
+        task = asyncio.create_task(submit())
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    async def _run_replay(
+        self, partitions: list[ClusterPartition], qos: list[str]
+    ) -> None:
+        """Submit jobs of workload trace at their recorded submission times,
+        accelerated by speedup factor. As in open-loop, submissions are dispatched
+        in tasks with a bounded number of in-flight submissions, late and failed
+        submissions are counted."""
+        if self.workload.speedup <= 0:
+            raise FireHPCRuntimeError(
+                f"Invalid trace replay speedup factor {self.workload.speedup}"
+            )
+        status = await self._refresh_status()
+        mapper = TraceMapper(status.directory.users, partitions)
+        logger.info(
+            "cluster %s: replaying jobs trace %s with speedup factor %.2f",
+            self.cluster.name,
+            self.workload.replay,
+            self.workload.speedup,
+        )
+        self.dispatches = Dispatches()
+        inflight = asyncio.Semaphore(self.workload.inflight)
+        # Keep references of running tasks to prevent their garbage collection.
+        tasks = set()
+        # Trace is read job by job in worker thread, to avoid blocking the event
+        # loop with file reads and decompression.
+        jobs = read_trace(self.workload.replay)
+        start = None
+        first = None
+        try:
+            while True:
+                job = await asyncio.to_thread(next, jobs, None)
+                if job is None:
+                    break
+                if first is None:
+                    start = time.monotonic()
+                    first = job.submit
+                scheduled = start + (job.submit - first) / self.workload.speedup
+                delay = scheduled - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await inflight.acquire()
+                status = await self._refresh_status()
+                self._dispatch(
+                    inflight,
+                    tasks,
+                    scheduled,
+                    mapper.user(job.user),
+                    self._submission_host(status),
+                    random.choice(qos),
+                    mapper.partition(job.partition),
+                    job,
+                )
+            # Wait for the last submissions to complete
+            if tasks:
+                await asyncio.wait(tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+        logger.info(
+            "cluster %s: all jobs of trace %s are submitted",
+            self.cluster.name,
+            self.workload.replay,
+        )
+
+    def _stream(self, *cmd: str) -> contextlib.closing[Iterator[str]]:
+        """Return context manager of streamed output chunks of command run on
+        cluster admin node, closing the stream and releasing its SSH session when
+        output is not entirely consumed."""
+        return contextlib.closing(self.ssh.stream([f"admin.{self.cluster.name}", *cmd]))
+
+    def _get_cluster_config(self) -> None:
+        with self._stream("scontrol", "show", "config") as chunks:
+            for line in lines(chunks):
+                if line.startswith("SelectType "):
+                    self.select_type = line.split(" = ")[1]
+                if (
+                    line.startswith("AccountingStorageType ")
+                    and line.split(" = ")[1] == "accounting_storage/slurmdbd"
+                ):
+                    self.accounting = True
+                if line.startswith("SLURM_CONF "):
+                    self.slurm_conf = line.split(" = ")[1]
+
+    def _get_slurm_conf_digest(self) -> str:
+        """Return the checksum of Slurm configuration file on admin node."""
         stdout, stderr = self.ssh.exec(
-            [f"admin.{self.cluster.name}", "scontrol", "show", "nodes", "--json"]
+            [f"admin.{self.cluster.name}", "sha256sum", self.slurm_conf]
         )
+        if not len(stdout):
+            raise FireHPCRuntimeError(
+                f"Unable to compute checksum of {self.slurm_conf} on cluster "
+                f"{self.cluster.name}: {stderr.decode().strip()}"
+            )
+        return stdout.decode().split(" ")[0]
+
+    def _get_partitions_gpus(self) -> dict[str, int]:
+        """Return the total number of GPU GRES of all partitions, indexed by
+        partition name, with a single retrieval of all nodes."""
+        result = {}
         try:
-            for node in json.loads(stdout)["nodes"]:
-                if partition not in node["partitions"]:
-                    continue
-                if not len(node["gres"]):
-                    continue
-                for gres in node["gres"].split(","):
-                    gres = gres.split(":")
-                    if gres[0] != "gpu":
+            with self._stream("scontrol", "show", "nodes", "--json") as chunks:
+                for node in json_items(chunks, "nodes"):
+                    if not len(node["gres"]):
                         continue
-                    result += int(gres[-1])
+                    gpus = 0
+                    for gres in node["gres"].split(","):
+                        gres = gres.split(":")
+                        if gres[0] != "gpu":
+                            continue
+                        gpus += int(gres[-1])
+                    for partition in node["partitions"]:
+                        result[partition] = result.get(partition, 0) + gpus
         except json.decoder.JSONDecodeError as err:
             raise FireHPCRuntimeError(
                 f"Unable to retrieve nodes from cluster {self.cluster.name}: {str(err)}"
             ) from err
         return result
 
-    def _get_partitions(self) -> list[str]:
-        stdout, stderr = self.ssh.exec(
-            [f"admin.{self.cluster.name}", "scontrol", "show", "partitions", "--json"]
-        )
+    def _load_partitions(self, digest: str) -> Optional[list[ClusterPartition]]:
+        """Return partitions cached in cluster state directory if they have been
+        retrieved with the same Slurm configuration file checksum, or None."""
+        path = self.cluster.state.partitions
+        if not path.exists():
+            return None
         try:
-            return [
-                ClusterPartition(
-                    partition["name"],
-                    partition["nodes"]["total"],
-                    partition["cpus"]["total"],
-                    self._get_partition_gpus(partition["name"]),
-                    partition["maximums"]["time"],
-                )
-                for partition in json.loads(stdout)["partitions"]
-            ]
+            with open(path) as fh:
+                content = json.load(fh)
+            if content["digest"] != digest:
+                return None
+            return [ClusterPartition(*partition) for partition in content["partitions"]]
+        except (OSError, json.decoder.JSONDecodeError, KeyError, TypeError) as err:
+            logger.debug(
+                "cluster %s: ignoring invalid partitions cache %s: %s",
+                self.cluster.name,
+                path,
+                err,
+            )
+            return None
+
+    def _save_partitions(self, digest: str, partitions: list[ClusterPartition]) -> None:
+        """Save partitions with Slurm configuration file checksum in cluster state
+        directory. The file is replaced atomically as it can be read by loaders
+        running in other processes."""
+        path = self.cluster.state.partitions
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w+") as fh:
+            json.dump({"digest": digest, "partitions": partitions}, fh, indent=2)
+        tmp.replace(path)
+
+    def _get_partitions(self) -> list[ClusterPartition]:
+        # Return partitions from cache in cluster state directory, shared by all
+        # loaders of the cluster, unless Slurm configuration has changed.
+        digest = self._get_slurm_conf_digest()
+        partitions = self._load_partitions(digest)
+        if partitions is not None:
+            logger.debug(
+                "cluster %s: Slurm configuration is unchanged, using cached partitions",
+                self.cluster.name,
+            )
+            return partitions
+        gpus = self._get_partitions_gpus()
+        try:
+            with self._stream("scontrol", "show", "partitions", "--json") as chunks:
+                partitions = [
+                    ClusterPartition(
+                        partition["name"],
+                        partition["nodes"]["total"],
+                        partition["cpus"]["total"],
+                        gpus.get(partition["name"], 0),
+                        partition["maximums"]["time"],
+                    )
+                    for partition in json_items(chunks, "partitions")
+                ]
         except json.decoder.JSONDecodeError as err:
             raise FireHPCRuntimeError(
                 f"Unable to retrieve partitions from cluster {self.cluster.name}: "
                 f"{str(err)}"
             ) from err
+        self._save_partitions(digest, partitions)
+        return partitions
 
     def _get_qos(self) -> list[str]:
         if not self.accounting:
@@ -193,14 +594,10 @@ class ClusterJobsLoader:
                 self.cluster.name,
             )
             return [None]
-        stdout, stderr = self.ssh.exec(
-            [f"admin.{self.cluster.name}", "sacctmgr", "show", "qos", "--json"]
-        )
         try:
-            qos_output = json.loads(stdout)
             # QOS key has changed to lower case in Slurm 24.05
-            qos_key = "qos" if "qos" in qos_output else "QOS"
-            return [qos["name"] for qos in json.loads(stdout)[qos_key]]
+            with self._stream("sacctmgr", "show", "qos", "--json") as chunks:
+                return [qos["name"] for qos in json_items(chunks, "qos", "QOS")]
         except json.decoder.JSONDecodeError as err:
             raise FireHPCRuntimeError(
                 f"Unable to retrieve qos from cluster {self.cluster.name}: {str(err)}"
@@ -234,55 +631,62 @@ class ClusterJobsLoader:
     def _get_nb_active_jobs(self):
         """Return the current number of active jobs (ie. pending or running) on the
         given partitions."""
+        # Count jobs IDs on remote side to retrieve a single integer, whatever the
+        # number of active jobs.
         stdout, stderr = self.ssh.exec(
             [
                 f"admin.{self.cluster.name}",
-                "squeue",
-                "--state",
-                "pending,running",
-                "--json",
+                "/bin/sh",
+                "-c",
+                "squeue --noheader --state pending,running --format %i | wc -l",
             ]
         )
         try:
-            return len(json.loads(stdout)["jobs"])
-        except json.decoder.JSONDecodeError as err:
+            return int(stdout)
+        except ValueError as err:
             raise FireHPCRuntimeError(
                 f"Unable to retrieve active jobs from cluster {self.cluster.name}: "
-                f"{str(err)}"
+                f"{stderr.decode().strip() or str(err)}"
             ) from err
 
-    def _launch_job(
-        self, user: UserEntry, qos: Optional[str], partition: ClusterPartition
-    ) -> None:
-        logger.info(
-            "cluster %s: submitting job for user %s on partition %s with QOS %s",
-            self.cluster.name,
-            user.login,
-            partition.name,
-            qos,
-        )
+    def _submission_host(self, status: ClusterStatus) -> str:
+        """Return the name of the host on which jobs are submitted, in the given
+        cluster status."""
         # If there is only one container, consider the cluster is using emulator mode
         # and submit job on admin node. Otherwise, submit job on login node.
-        if len(self.cluster.status().containers) == 1:
-            dest = "admin"
-        else:
-            dest = "login"
+        if len(status.containers) == 1:
+            return f"admin.{self.cluster.name}"
+        return f"login.{self.cluster.name}"
+
+    def _job_cmd(
+        self,
+        qos: Optional[str],
+        partition: ClusterPartition,
+        job: Optional[TraceJob] = None,
+    ) -> list[str]:
+        """Return sbatch command to submit a job in the given QOS and partition. The
+        job is random unless a job from trace is given."""
         if partition.time["set"]:
             timelimit = str(partition.time["number"])
+        elif job is not None and job.timelimit:
+            # Convert trace timelimit in minutes, rounded up.
+            timelimit = str(-(-job.timelimit // 60))
         else:
             timelimit = random.choices(JOBS_TIMELIMITS[0], weights=JOBS_TIMELIMITS[1])[
                 0
             ]
 
-        # Make 1/10th of job radomly fail.
-        script = "/usr/bin/sleep " + str(
-            random.choices(JOBS_DURATIONS[0], weights=JOBS_DURATIONS[1])[0]
-        )
-        if not random.choices([True, False], weights=[10, 1])[0]:
+        if job is not None:
+            script = f"/usr/bin/sleep {job.duration}"
+            failed = job.failed
+        else:
+            script = "/usr/bin/sleep " + str(self.durations.pick())
+            # Make 1/10th of job radomly fail.
+            failed = not random.choices([True, False], weights=[10, 1])[0]
+        if failed:
             script += " && /bin/false"
 
         cmd = [
-            f"{user.login}@{dest}.{self.cluster.name}",
             "sbatch",
             "--partition",
             partition.name,
@@ -295,7 +699,7 @@ class ClusterJobsLoader:
         ]
         # Insert QOS argument if defined.
         if qos:
-            cmd[2:2] = ["--qos", qos]
+            cmd[1:1] = ["--qos", qos]
 
         def random_power_two(limit: int) -> int:
             """Select randomly one power of two below the limit."""
@@ -310,13 +714,105 @@ class ClusterJobsLoader:
             ]
             return random.choices(possible_values, weights)[0]
 
+        def random_size(limit: int) -> int:
+            """Select randomly job size in workload sizes distribution, bounded by
+            the limit, or one power of two below the limit if distribution is not
+            defined."""
+            if self.workload.sizes is None:
+                return random_power_two(limit)
+            return min(self.workload.sizes.pick(), limit)
+
+        # Size of trace job is a number of processors, converted in allocation of
+        # nodes, GPUs or tasks.
+        if job is not None:
+            option, value = processors_allocation(
+                job.size, partition, self.select_type == "select/linear"
+            )
+            cmd.extend([option, str(value)])
         # If select/linear, allocate a number of nodes, else allocates a number
         # of tasks.
-        if self.select_type == "select/linear":
-            cmd.extend(["--nodes", str(random_power_two(partition.nodes))])
+        elif self.select_type == "select/linear":
+            cmd.extend(["--nodes", str(random_size(partition.nodes))])
         elif partition.gpus:
-            cmd.extend(["--gpus", str(random_power_two(partition.gpus))])
+            cmd.extend(["--gpus", str(random_size(partition.gpus))])
         else:
-            cmd.extend(["--ntasks", str(random_power_two(partition.cpus))])
+            cmd.extend(["--ntasks", str(random_size(partition.cpus))])
+        return cmd
 
-        self.ssh.exec(cmd)
+    def _launch_job(
+        self,
+        user: UserEntry,
+        host: str,
+        qos: Optional[str],
+        partition: ClusterPartition,
+        job: Optional[TraceJob] = None,
+    ) -> bool:
+        """Submit job on the given host, return True if submission succeeded."""
+        logger.info(
+            "cluster %s: submitting job for user %s on partition %s with QOS %s",
+            self.cluster.name,
+            user.login,
+            partition.name,
+            qos,
+        )
+        status, _, stderr = self.ssh.exec_status(
+            [f"{user.login}@{host}"] + self._job_cmd(qos, partition, job)
+        )
+        if status:
+            logger.warning(
+                "cluster %s: job submission failed for user %s: %s",
+                self.cluster.name,
+                user.login,
+                stderr.decode().strip(),
+            )
+            return False
+        return True
+
+    def _launch_jobs(
+        self,
+        jobs: list[tuple[UserEntry, Optional[str], ClusterPartition]],
+        host: str,
+    ) -> list[str]:
+        """Submit jobs in batch on the given host with one remote shell invocation
+        per user. Return the list of submitted jobs IDs."""
+        # Group sbatch commands by user
+        commands = {}
+        for user, qos, partition in jobs:
+            logger.debug(
+                "cluster %s: preparing job for user %s on partition %s with QOS %s",
+                self.cluster.name,
+                user.login,
+                partition.name,
+                qos,
+            )
+            cmd = self._job_cmd(qos, partition)
+            # Insert parsable argument to get job ID alone in output
+            cmd.insert(1, "--parsable")
+            commands.setdefault(user.login, []).append(shlex.join(cmd))
+
+        result = []
+        for login, user_commands in commands.items():
+            stdout, stderr = self.ssh.exec(
+                [f"{login}@{host}", "/bin/sh", "-c", "\n".join(user_commands)]
+            )
+            # With --parsable, sbatch prints job ID optionally followed by cluster
+            # name separated by semicolon.
+            jobs_ids = [
+                line.split(";")[0] for line in stdout.decode().splitlines() if line
+            ]
+            logger.info(
+                "cluster %s: submitted %d jobs in batch for user %s",
+                self.cluster.name,
+                len(jobs_ids),
+                login,
+            )
+            if len(jobs_ids) < len(user_commands):
+                logger.warning(
+                    "cluster %s: %d jobs submissions failed for user %s: %s",
+                    self.cluster.name,
+                    len(user_commands) - len(jobs_ids),
+                    login,
+                    stderr.decode().strip(),
+                )
+            result.extend(jobs_ids)
+        return result
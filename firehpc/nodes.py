@@ -0,0 +1,200 @@
+# Copyright (c) 2025 Rackslab
+#
+# This file is part of FireHPC.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Group cluster nodes by tag and by node type in a single traversal of RacksDB
+nodes, with names of nodes folded in nodesets and in Ansible inventory hosts
+ranges."""
+
+from __future__ import annotations
+import dataclasses
+import typing as t
+import re
+
+# Tags of nodes groups, in order of inventory groups
+TAGS = ["admin", "login", "compute"]
+
+# Node name with a trailing number, possibly followed by a non-numeric suffix
+NODE_NAME_RE = re.compile(r"^(.*?)(\d+)(\D*)$")
+
+
+def _ranges(numbers: t.Iterable[int]) -> list[tuple[int, int]]:
+    """Return list of (first, last) 2-tuples of consecutive numbers."""
+    result = []
+    for number in sorted(set(numbers)):
+        if result and number == result[-1][1] + 1:
+            result[-1] = (result[-1][0], number)
+        else:
+            result.append((number, number))
+    return result
+
+
+def _index(
+    names: t.Iterable[str],
+) -> tuple[dict[tuple[str, str, int], list[int]], list[str]]:
+    """Return numbers of node names indexed by (prefix, suffix, padding width)
+    3-tuples, with the list of names without number. Width is 0 for numbers without
+    padding. Numbers without leading zero are merged with padded numbers with the
+    same number of digits."""
+    padded = {}
+    unpadded = {}
+    others = []
+    for name in names:
+        match = NODE_NAME_RE.match(name)
+        if match is None:
+            others.append(name)
+            continue
+        prefix, digits, suffix = match.groups()
+        if len(digits) > 1 and digits[0] == "0":
+            padded.setdefault((prefix, suffix, len(digits)), []).append(int(digits))
+        else:
+            unpadded.setdefault((prefix, suffix), []).append(digits)
+    result = padded
+    for (prefix, suffix), numbers in unpadded.items():
+        for digits in numbers:
+            key = (prefix, suffix, len(digits))
+            if key not in padded:
+                key = (prefix, suffix, 0)
+            result.setdefault(key, []).append(int(digits))
+    return result, others
+
+
+def fold(names: t.Iterable[str]) -> str:
+    """Return nodeset of node names (ex: cn[001-100,102],login), in linear time with
+    the number of names. Only the trailing number of names is folded."""
+    index, others = _index(names)
+    result = []
+    for (prefix, suffix, width), numbers in sorted(index.items()):
+        ranges = _ranges(numbers)
+        if len(ranges) == 1 and ranges[0][0] == ranges[0][1]:
+            result.append(f"{prefix}{ranges[0][0]:0{width}d}{suffix}")
+            continue
+        result.append(
+            f"{prefix}["
+            + ",".join(
+                f"{first:0{width}d}"
+                if first == last
+                else f"{first:0{width}d}-{last:0{width}d}"
+                for first, last in ranges
+            )
+            + f"]{suffix}"
+        )
+    return ",".join(result + sorted(set(others)))
+
+
+def inventory_patterns(names: t.Iterable[str], domain: str = "") -> list[str]:
+    """Return Ansible inventory hosts patterns of node names with numeric ranges
+    (ex: cn[001:100]), with optional domain appended to all names."""
+    index, others = _index(names)
+    result = []
+    for (prefix, suffix, width), numbers in sorted(index.items()):
+        for first, last in _ranges(numbers):
+            if first == last:
+                result.append(f"{prefix}{first:0{width}d}{suffix}{domain}")
+            else:
+                result.append(
+                    f"{prefix}[{first:0{width}d}:{last:0{width}d}]{suffix}{domain}"
+                )
+    return result + [f"{name}{domain}" for name in sorted(set(others))]
+
+
+def nodes_diff(
+    nodes: t.Iterable[str], existing: t.Iterable[str]
+) -> tuple[list[str], list[str]]:
+    """Return 2-tuple with the list of nodes missing in existing nodes and the list
+    of existing nodes missing in nodes, in their respective orders."""
+    nodes = list(nodes)
+    existing = list(existing)
+    _nodes = set(nodes)
+    _existing = set(existing)
+    return (
+        [node for node in nodes if node not in _existing],
+        [node for node in existing if node not in _nodes],
+    )
+
+
+def _type_gpus(node_type) -> dict[str, int]:
+    result = {}
+    if not hasattr(node_type, "gpu"):
+        return result
+    for gpu in node_type.gpu:
+        result[gpu.model] = result.get(gpu.model, 0) + 1
+    return result
+
+
+@dataclasses.dataclass
+class NodeTypeGroup:
+    """Nodes of the same type with the characteristics of their type."""
+
+    type: str
+    sockets: int
+    cores: int
+    memory: int
+    gpus: dict[str, int]
+    nodes: list[str] = dataclasses.field(default_factory=list)
+
+    @classmethod
+    def from_type(cls, node_type) -> NodeTypeGroup:
+        return cls(
+            node_type.id,
+            node_type.cpu.sockets,
+            node_type.cpu.cores,
+            node_type.ram.dimm * (node_type.ram.size // 1024**2),
+            _type_gpus(node_type),
+        )
+
+    def generic(self, with_names: bool = True) -> dict[str, t.Any]:
+        """Return dict of node type group with folded nodeset. The list of node
+        names is included only if with_names is True, as it can be very large in
+        Slurm emulator mode."""
+        result = {
+            "type": self.type,
+            "sockets": self.sockets,
+            "cores": self.cores,
+            "memory": self.memory,
+            "gpus": self.gpus,
+            "nodeset": fold(self.nodes),
+        }
+        if with_names:
+            result["nodes"] = self.nodes
+        return result
+
+
+class ClusterNodes:
+    """Names of cluster nodes grouped by tag, and by tag and node type."""
+
+    def __init__(self):
+        self.count = 0
+        self.groups = {tag: [] for tag in TAGS}
+        # Node type groups indexed by tag and node type ID
+        self.types = {tag: {} for tag in TAGS}
+
+    @classmethod
+    def group(cls, nodes: t.Iterable) -> ClusterNodes:
+        """Group RacksDB nodes in a single traversal."""
+        result = cls()
+        for node in nodes:
+            result.count += 1
+            for tag in node.tags:
+                if tag not in result.groups:
+                    continue
+                result.groups[tag].append(node.name)
+                types = result.types[tag]
+                group = types.get(node.type.id)
+                if group is None:
+                    group = types[node.type.id] = NodeTypeGroup.from_type(node.type)
+                group.nodes.append(node.name)
+        return result
+
+    def generic(self, with_names: bool = True) -> dict[str, list[dict[str, t.Any]]]:
+        """Return node type groups indexed by tag."""
+        return {
+            tag: [group.generic(with_names) for group in types.values()]
+            for tag, types in self.types.items()
+        }
+
+    def inventory(self, domain: str, tags: list[str]) -> dict[str, list[str]]:
+        """Return Ansible inventory hosts patterns of the given tags."""
+        return {tag: inventory_patterns(self.groups[tag], domain) for tag in tags}
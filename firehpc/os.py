@@ -7,7 +7,7 @@
 """Manage OS YAML database."""
 
 from __future__ import annotations
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 import logging
 
 import yaml
@@ -30,6 +30,10 @@ class OSDatabase:
     def url(self, os: str) -> str:
         return self.content[os]["url"]
 
+    def checksum(self, os: str) -> Optional[str]:
+        """Return expected SHA256 digest of OS image, if defined."""
+        return self.content[os].get("sha256")
+
     def environment(self, os: str) -> str:
         return self.content[os]["environment"]
 
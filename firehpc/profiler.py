@@ -0,0 +1,138 @@
+# Copyright (c) 2025 Rackslab
+#
+# This file is part of FireHPC.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Record spans of FireHPC operations with their wall-clock and CPU times, exported
+in JSON and in Chrome trace event format (viewable in chrome://tracing or
+Perfetto)."""
+
+from __future__ import annotations
+import contextlib
+import dataclasses
+from pathlib import Path
+import typing as t
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class Span:
+    """Operation with its start time relative to profiler start and its duration
+    in seconds. CPU time is consumed by the thread that ran the operation, it does
+    not include subprocesses and other threads."""
+
+    name: str
+    thread: str
+    start: float
+    duration: float
+    cpu: float
+    args: dict[str, t.Any]
+
+
+class Profiler:
+    """Thread-safe recorder of operations spans. Spans are recorded only when the
+    profiler is enabled, otherwise they have almost no overhead."""
+
+    def __init__(self):
+        self.enabled = False
+        self.locker = threading.Lock()
+        self.spans = []
+        self.origin = None
+        self.epoch = None
+        self.version = None
+
+    def enable(self, version: t.Optional[str] = None) -> None:
+        """Enable recording of spans, with optional FireHPC version saved with
+        spans to compare profiles across releases."""
+        self.enabled = True
+        self.version = version
+        self.origin = time.perf_counter()
+        self.epoch = time.time()
+
+    @contextlib.contextmanager
+    def span(self, name: str, **args: t.Any) -> t.Iterator[None]:
+        """Context manager that records span of the enclosed operation, with
+        optional arguments to describe the operation."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            span = Span(
+                name,
+                threading.current_thread().name,
+                start - self.origin,
+                time.perf_counter() - start,
+                time.thread_time() - cpu,
+                args,
+            )
+            with self.locker:
+                self.spans.append(span)
+
+    def dump(self) -> dict[str, t.Any]:
+        with self.locker:
+            spans = sorted(self.spans, key=lambda span: span.start)
+        return {
+            "version": self.version,
+            "epoch": self.epoch,
+            "spans": [dataclasses.asdict(span) for span in spans],
+        }
+
+    def trace(self) -> dict[str, t.Any]:
+        """Return spans in Chrome trace event format, with complete events whose
+        timestamps and durations are in microseconds."""
+        threads = {}
+        events = []
+        pid = os.getpid()
+        for span in self.dump()["spans"]:
+            tid = threads.setdefault(span["thread"], len(threads))
+            events.append(
+                {
+                    "name": span["name"],
+                    "ph": "X",
+                    "ts": round(span["start"] * 1e6),
+                    "dur": round(span["duration"] * 1e6),
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {"cpu": span["cpu"]} | span["args"],
+                }
+            )
+        for thread, tid in threads.items():
+            events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {"name": thread},
+                }
+            )
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"version": self.version},
+        }
+
+    def save(self, prefix: Path) -> None:
+        """Save spans in JSON file and Chrome trace file with the given prefix."""
+        for path, content in (
+            (prefix.with_name(f"{prefix.name}.json"), self.dump()),
+            (prefix.with_name(f"{prefix.name}.trace.json"), self.trace()),
+        ):
+            logger.info("Saving profile in file %s", path)
+            with open(path, "w+") as fh:
+                json.dump(content, fh, indent=2)
+
+
+# Profiler shared by all FireHPC modules
+profiler = Profiler()
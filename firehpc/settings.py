@@ -5,6 +5,7 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 import configparser
+import os
 import logging
 import dataclasses
 from pathlib import Path
@@ -15,10 +16,26 @@ logger = logging.getLogger(__name__)
 
 class RuntimeSettingsAnsible:
     SECTION = "ansible"
+    # Number of Ansible forks per host CPU when forks are sized automatically, forks
+    # mostly wait for remote commands.
+    FORKS_PER_CPU = 4
 
     def __init__(self, config):
         self.path = Path(config.get(self.SECTION, "path"))
         self.args = config.get(self.SECTION, "args")
+        self.connection = config.get(self.SECTION, "connection")
+        self.forks = config.getint(self.SECTION, "forks")
+        self.strategy = config.get(self.SECTION, "strategy")
+        self.pinned_strategy = config.get(self.SECTION, "pinned_strategy")
+        self.gathering = config.get(self.SECTION, "gathering")
+        self.fact_caching_timeout = config.getint(self.SECTION, "fact_caching_timeout")
+
+    def forks_for(self, nodes: int) -> int:
+        """Return the number of Ansible forks for the given number of nodes, sized
+        from the number of host CPU unless forks are set in settings."""
+        if self.forks:
+            return self.forks
+        return max(1, min(nodes, (os.cpu_count() or 1) * self.FORKS_PER_CPU))
 
 
 class RuntimeSettingsOS:
@@ -29,6 +46,23 @@ class RuntimeSettingsOS:
         self.requirements = Path(config.get(self.SECTION, "requirements"))
 
 
+class RuntimeSettingsContainers:
+    SECTION = "containers"
+
+    def __init__(self, config):
+        self.start_workers = config.getint(self.SECTION, "start_workers")
+        self.clone_workers = config.getint(self.SECTION, "clone_workers")
+
+
+class RuntimeSettingsImages:
+    SECTION = "images"
+
+    def __init__(self, config):
+        self.cache = config.getboolean(self.SECTION, "cache")
+        self.mirror = config.get(self.SECTION, "mirror") or None
+        self.decompress_threads = config.getint(self.SECTION, "decompress_threads")
+
+
 class RuntimeSettings:
     """Settings from configuration files."""
 
@@ -49,6 +83,8 @@ class RuntimeSettings:
 
         self.ansible = RuntimeSettingsAnsible(_config)
         self.os = RuntimeSettingsOS(_config)
+        self.containers = RuntimeSettingsContainers(_config)
+        self.images = RuntimeSettingsImages(_config)
 
 
 def optional_absolute_path(path: t.Optional[t.Union[Path, str]]) -> t.Optional[Path]:
@@ -0,0 +1,116 @@
+# Copyright (c) 2025 Rackslab
+#
+# This file is part of FireHPC.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Describe snapshots of configured clusters with their golden images per role and
+node type."""
+
+from __future__ import annotations
+import dataclasses
+from datetime import datetime
+from pathlib import Path
+import typing as t
+import logging
+
+import yaml
+
+from .errors import FireHPCRuntimeError
+
+logger = logging.getLogger(__name__)
+
+# Roles of nodes captured in golden images, in order of precedence for nodes with
+# multiple roles tags.
+ROLES = ["admin", "login", "compute"]
+
+
+def node_role(tags: t.Iterable[str]) -> t.Optional[str]:
+    """Return role of node with the given tags, or None if the node has no role."""
+    for role in ROLES:
+        if role in tags:
+            return role
+    return None
+
+
+def golden_key(tags: t.Iterable[str], node_type: str) -> t.Optional[str]:
+    """Return key of golden image of nodes with the given tags and node type, or
+    None if the nodes have no role. Nodes with the same role and different node
+    types get different golden images, as their configuration depends on their
+    type (eg. GPU)."""
+    role = node_role(tags)
+    if role is None:
+        return None
+    return f"{role}-{node_type}"
+
+
+def golden_sources(
+    nodes: t.Iterable[tuple[str, t.Iterable[str], str]],
+) -> dict[str, str]:
+    """Return the first node of every role and node type, indexed by golden image
+    key, from (name, tags, node type) 3-tuples of nodes."""
+    result = {}
+    for name, tags, node_type in nodes:
+        key = golden_key(tags, node_type)
+        if key is not None and key not in result:
+            result[key] = name
+    return result
+
+
+def nodes_goldens(
+    nodes: t.Iterable[tuple[str, t.Iterable[str], str]],
+) -> dict[str, list[str]]:
+    """Return names of nodes grouped by golden image key, from (name, tags, node
+    type) 3-tuples of nodes. FireHPCRuntimeError is raised if a node has no
+    role."""
+    result = {}
+    for name, tags, node_type in nodes:
+        key = golden_key(tags, node_type)
+        if key is None:
+            raise FireHPCRuntimeError(
+                f"Unable to determine role of node {name} without tag among "
+                f"{', '.join(ROLES)}"
+            )
+        result.setdefault(key, []).append(name)
+    return result
+
+
+@dataclasses.dataclass
+class Snapshot:
+    """Snapshot of cluster with names of golden images and the names of the nodes
+    they have been captured from, indexed by golden image key (role and node
+    type)."""
+
+    cluster: str
+    namespace: str
+    os: str
+    created: datetime
+    images: dict[str, str]
+    sources: dict[str, str]
+
+    def save(self, path: Path) -> None:
+        logger.info("Saving snapshot manifest into file %s", path)
+        content = dataclasses.asdict(self)
+        content["created"] = self.created.isoformat()
+        with open(path, "w+") as fh:
+            fh.write(yaml.dump(content))
+
+    @classmethod
+    def load(cls, path: Path) -> Snapshot:
+        if not path.exists():
+            raise FireHPCRuntimeError(f"Unable to find snapshot manifest file {path}")
+        try:
+            with open(path) as fh:
+                content = yaml.safe_load(fh)
+            return cls(
+                content["cluster"],
+                content["namespace"],
+                content["os"],
+                datetime.fromisoformat(content["created"]),
+                content["images"],
+                content["sources"],
+            )
+        except (KeyError, TypeError, ValueError) as err:
+            raise FireHPCRuntimeError(
+                f"Unable to load snapshot manifest file {path}: {err}"
+            ) from err
@@ -5,10 +5,14 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from __future__ import annotations
-from typing import TYPE_CHECKING, Union
+from typing import TYPE_CHECKING, Iterator, Union
+import codecs
+import contextlib
 import logging
 import shlex
 import socket
+import threading
+import time
 
 import paramiko
 
@@ -22,38 +26,189 @@ from .errors import FireHPCRuntimeError
 logger = logging.getLogger(__name__)
 
 
+class SSHConnectionPool:
+    """Thread-safe pool of SSH connections to cluster hosts. Connections are
+    authenticated once per host with root user, commands of other users are run
+    with runuser over the shared transport. The number of concurrent sessions per
+    host is capped and connections idle for too long are evicted."""
+
+    # OpenSSH server default MaxSessions value
+    MAX_SESSIONS_PER_HOST = 10
+    # Maximum time in seconds before idle connections are closed
+    IDLE_TIMEOUT = 300
+
+    def __init__(self, known_hosts: str, private_key: str):
+        self.known_hosts = known_hosts
+        self.private_key = private_key
+        self.locker = threading.Lock()
+        # Connections with their last usage time, semaphores limiting concurrent
+        # sessions, number of active sessions and locks serializing connection
+        # establishment, indexed by hostname.
+        self.connections = {}
+        self.sessions = {}
+        self.active = {}
+        self.connecting = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self, hostname: str) -> paramiko.SSHClient:
+        client = paramiko.SSHClient()
+        logger.debug("Loading SSH hosts keys from %s", self.known_hosts)
+        client.load_host_keys(self.known_hosts)
+        logger.debug("Connecting client to root@%s", hostname)
+        client.connect(
+            hostname,
+            username="root",
+            key_filename=self.private_key,
+        )
+        return client
+
+    def _client(self, hostname: str) -> paramiko.SSHClient:
+        """Return connected client to host, connecting a new client if not already
+        connected in pool."""
+        with self.locker:
+            connecting = self.connecting.setdefault(hostname, threading.Lock())
+        with connecting:
+            with self.locker:
+                connection = self.connections.get(hostname)
+            if connection is not None:
+                if self._active(connection[0]):
+                    with self.locker:
+                        self.hits += 1
+                    return connection[0]
+                self.invalidate(hostname, connection[0])
+            client = self._connect(hostname)
+            with self.locker:
+                self.misses += 1
+                self.connections[hostname] = [client, time.monotonic()]
+            return client
+
+    def evict_idle(self) -> None:
+        """Close connections unused for longer than idle timeout and without
+        running session."""
+        now = time.monotonic()
+        with self.locker:
+            for hostname, connection in list(self.connections.items()):
+                if now - connection[1] > self.IDLE_TIMEOUT and not self.active.get(
+                    hostname, 0
+                ):
+                    logger.debug("Closing idle SSH connection to %s", hostname)
+                    connection[0].close()
+                    del self.connections[hostname]
+
+    @staticmethod
+    def _active(client: paramiko.SSHClient) -> bool:
+        transport = client.get_transport()
+        return transport is not None and transport.is_active()
+
+    def invalidate(self, hostname: str, client: paramiko.SSHClient) -> None:
+        """Close and remove connection of client to host from pool, unless its
+        transport is still active. The transport is shared by the sessions of all
+        threads, an error on one channel must not close the others."""
+        if self._active(client):
+            return
+        with self.locker:
+            connection = self.connections.get(hostname)
+            if connection is not None and connection[0] is client:
+                del self.connections[hostname]
+        client.close()
+
+    @contextlib.contextmanager
+    def session(self, hostname: str) -> Iterator[paramiko.SSHClient]:
+        """Context manager that yields connected client to host, when a session
+        slot is available on this host."""
+        self.evict_idle()
+        with self.locker:
+            sessions = self.sessions.setdefault(
+                hostname, threading.BoundedSemaphore(self.MAX_SESSIONS_PER_HOST)
+            )
+        with sessions:
+            with self.locker:
+                self.active[hostname] = self.active.get(hostname, 0) + 1
+            try:
+                yield self._client(hostname)
+            finally:
+                with self.locker:
+                    self.active[hostname] -= 1
+                    if hostname in self.connections:
+                        self.connections[hostname][1] = time.monotonic()
+
+    def close(self) -> None:
+        with self.locker:
+            for connection in self.connections.values():
+                connection[0].close()
+            self.connections = {}
+        logger.debug(
+            "SSH connections pool closed (hits: %d, misses: %d)", self.hits, self.misses
+        )
+
+
 class SSHClient:
+    # Time to keep SSH control masters alive after their last client connection
+    CONTROL_PERSIST = "10m"
+    # Size in bytes of chunks read from the output of streamed commands
+    STREAM_CHUNK_SIZE = 65536
+
     def __init__(self, cluster: EmulatedCluster, asbin: bool = True):
         self.cluster = cluster
         self.asbin = asbin
         self.known_hosts = f"{self.cluster.state.path}/ssh/known_hosts"
         self.private_key = f"{self.cluster.state.path}/ssh/id_rsa"
         if not self.asbin:
-            self.clients = {}
+            self.pool = SSHConnectionPool(self.known_hosts, self.private_key)
 
-    def exec(self, args) -> Union[None, tuple[str, str]]:
-        if "@" in args[0]:
-            (username, hostname) = args[0].split("@")
+    def stream(self, args) -> Iterator[str]:
+        """Run command in library mode and yield chunks of its standard output decoded
+        as text while it is received, without buffering the whole output. The
+        session is held until the generator is exhausted or closed, callers that
+        may stop consuming it early must close it."""
+        username, hostname = self._destination(args[0])
+        return self._stream_lib(username, hostname, args[1:])
+
+    def _destination(self, destination: str) -> tuple[str, str]:
+        """Return username and fully qualified hostname of [user@]host destination."""
+        if "@" in destination:
+            (username, hostname) = destination.split("@")
         else:
             # connect with root user by default
             username = "root"
-            hostname = args[0]
+            hostname = destination
         # When dot is absent from hostname, consider it is the cluster name. In this
         # case, connect to admin host of this cluster by default.
         if "." not in hostname:
             hostname = "admin." + hostname
         # append container namespace to hostname
         hostname += f".{ContainersManager(self.cluster).namespace}"
+        return username, hostname
+
+    def exec(self, args) -> Union[None, tuple[str, str]]:
+        username, hostname = self._destination(args[0])
         if self.asbin:
             return self._exec_bin(username, hostname, args[1:])
         else:
             return self._exec_lib(username, hostname, args[1:])
 
+    def exec_status(self, args) -> tuple[int, bytes, bytes]:
+        """Run command in library mode and return its exit status with its standard
+        output and error."""
+        username, hostname = self._destination(args[0])
+        return self._run_lib(username, hostname, args[1:])
+
     def _exec_bin(self, username, hostname, cmd):
+        # Share connections to the same user@host with persistent control sockets in
+        # cluster state directory, with hashed names to stay below Unix socket path
+        # length limit.
+        self.cluster.state.ssh_control.mkdir(parents=True, exist_ok=True)
         _cmd = [
             "ssh",
             "-o",
             f"UserKnownHostsFile={self.known_hosts}",
+            "-o",
+            "ControlMaster=auto",
+            "-o",
+            f"ControlPath={self.cluster.state.ssh_control}/%C",
+            "-o",
+            f"ControlPersist={self.CONTROL_PERSIST}",
             "-i",
             self.private_key,
         ]
@@ -66,36 +221,88 @@ class SSHClient:
         logger.debug("Running SSH command: %s", shlex.join(_cmd))
         run(_cmd)
 
+    def close_masters(self) -> None:
+        """Terminate SSH control masters of the cluster."""
+        if not self.cluster.state.ssh_control.exists():
+            return
+        for control in self.cluster.state.ssh_control.iterdir():
+            logger.debug("Terminating SSH control master %s", control)
+            # With explicit control path, destination host is not used to select
+            # the socket but it is required by ssh on command line.
+            run(["ssh", "-o", f"ControlPath={control}", "-O", "exit", "firehpc"])
+
+    def _lib_command(self, username, cmd) -> str:
+        if not len(cmd):
+            raise FireHPCRuntimeError(
+                "Command to execute must be provided in SSHClient.exec in library mode"
+            )
+        _cmd = shlex.join(cmd)
+        # Connections in pool are authenticated with root, switch to the user with
+        # runuser in a login shell.
+        if username != "root":
+            _cmd = shlex.join(["runuser", "--login", username, "--command", _cmd])
+        return _cmd
+
+    def _stream_lib(self, username, hostname, cmd):
+        _cmd = self._lib_command(username, cmd)
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        client = None
+        # Command is not retried on SSH errors as a part of its output may already
+        # have been consumed.
+        try:
+            with self.pool.session(hostname) as client:
+                logger.debug("Streaming SSH command with library: %s", _cmd)
+                stdin, stdout, stderr = client.exec_command(_cmd)
+                # Standard error is drained in background thread while standard
+                # output is streamed, as unread data of both streams consume the
+                # same channel window and could block the command.
+                errors = []
+                drainer = threading.Thread(
+                    target=lambda: errors.append(stderr.read()), daemon=True
+                )
+                drainer.start()
+                try:
+                    while chunk := stdout.read(self.STREAM_CHUNK_SIZE):
+                        yield decoder.decode(chunk)
+                    yield decoder.decode(b"", final=True)
+                    status = stdout.channel.recv_exit_status()
+                    drainer.join()
+                    if status:
+                        raise FireHPCRuntimeError(
+                            f"SSH command '{_cmd}' failed with exit status {status}: "
+                            f"{b''.join(errors).decode(errors='replace').strip()}"
+                        )
+                finally:
+                    # Close channel when the generator is closed before the end of
+                    # the output.
+                    stdout.channel.close()
+        except socket.gaierror as err:
+            raise FireHPCRuntimeError(
+                f"Get address information error for host {hostname}: {err}"
+            ) from err
+        except paramiko.ssh_exception.SSHException as err:
+            if client is not None:
+                self.pool.invalidate(hostname, client)
+            raise FireHPCRuntimeError(
+                f"SSH error while streaming command '{_cmd}': {err}"
+            ) from err
+
     def _exec_lib(self, username, hostname, cmd):
+        _, stdout, stderr = self._run_lib(username, hostname, cmd)
+        return stdout, stderr
+
+    def _run_lib(self, username, hostname, cmd):
         retries = 0
         max_retries = 3
-        client_key = f"{username}@{hostname}"
+        _cmd = self._lib_command(username, cmd)
         while retries < max_retries:
+            client = None
             try:
-                if client_key not in self.clients:
-                    client = paramiko.SSHClient()
-                    logger.debug("Loading SSH hosts keys from %s", self.known_hosts)
-                    client.load_host_keys(self.known_hosts)
-                    logger.debug("Connecting client to %s@%s", username, hostname)
-                    client.connect(
-                        hostname,
-                        username=username,
-                        key_filename=self.private_key,
-                    )
-                    self.clients[client_key] = client
-                else:
-                    client = self.clients.get(client_key)
-
-                if not len(cmd):
-                    raise FireHPCRuntimeError(
-                        "Command to execute must be provided in SSHClient.exec in "
-                        "library mode"
-                    )
-
-                _cmd = shlex.join(cmd)
-                logger.debug("Running SSH command with library: %s", _cmd)
-                stdin, stdout, stderr = client.exec_command(_cmd)
-                return stdout.read(), stderr.read()
+                with self.pool.session(hostname) as client:
+                    logger.debug("Running SSH command with library: %s", _cmd)
+                    stdin, stdout, stderr = client.exec_command(_cmd)
+                    output, error = stdout.read(), stderr.read()
+                    return stdout.channel.recv_exit_status(), output, error
             except socket.gaierror as err:
                 raise FireHPCRuntimeError(
                     f"Get address information error for host {hostname}: {err}"
@@ -104,7 +311,8 @@ class SSHClient:
                 logger.error("SSH error while running command '%s': %s", _cmd, err)
                 logger.info("Retries left: %d", max_retries - retries)
                 retries += 1
-                del self.clients[client_key]
+                if client is not None:
+                    self.pool.invalidate(hostname, client)
 
         raise FireHPCRuntimeError(
             f"Unable to run SSH command '{_cmd}' after {max_retries} retries"
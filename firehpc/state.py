@@ -32,6 +32,18 @@ class UserState:
     def clusters(self):
         return self.path / "clusters"
 
+    @property
+    def images(self):
+        return self.path / "images"
+
+    @property
+    def snapshots(self):
+        return self.path / "snapshots"
+
+    @property
+    def templates(self):
+        return self.path / "cache" / "templates"
+
     def create(self):
         if not self.path.exists():
             logger.debug("Creating state directory %s", self.path)
@@ -62,6 +74,26 @@ class ClusterState:
     def extravars(self) -> Path:
         return self.conf / "custom.yml"
 
+    @property
+    def digests(self) -> Path:
+        return self.path / "digests.json"
+
+    @property
+    def facts(self) -> Path:
+        return self.path / "facts"
+
+    @property
+    def timings(self) -> Path:
+        return self.path / "timings.json"
+
+    @property
+    def partitions(self) -> Path:
+        return self.path / "partitions.json"
+
+    @property
+    def ssh_control(self) -> Path:
+        return self.path / "ssh" / "control"
+
     def exists(self):
         return self.path.exists()
 
@@ -87,6 +119,18 @@ class ClusterState:
         if self.conf.exists():
             logger.debug("Removing existing configuration directory %s", self.conf)
             shutil.rmtree(self.conf)
+        if self.facts.exists():
+            logger.debug("Removing existing facts cache directory %s", self.facts)
+            shutil.rmtree(self.facts)
+
+    def forget_facts(self, hosts: list[str]) -> None:
+        """Remove cached facts of the given inventory hosts, so that they are
+        gathered again in the next Ansible run."""
+        for host in hosts:
+            path = self.facts / host
+            if path.exists():
+                logger.debug("Removing cached facts of host %s", host)
+                path.unlink()
 
     def save(self, settings: ClusterSettings) -> None:
         """Save cluster settings."""
@@ -108,3 +152,63 @@ class ClusterState:
             raise FireHPCRuntimeError(
                 f"Unable to load cluster settings: {err}"
             ) from err
+
+
+@dataclasses.dataclass
+class SnapshotState:
+    user_state: UserState
+    cluster: str
+
+    # Files and directories of cluster state not saved in snapshots, as they are
+    # specific to the running containers.
+    EXCLUDED = [Path("ssh") / "control", Path("facts")]
+
+    @property
+    def path(self) -> Path:
+        return self.user_state.snapshots / self.cluster
+
+    @property
+    def state(self) -> Path:
+        return self.path / "state"
+
+    @property
+    def manifest(self) -> Path:
+        return self.path / "snapshot.yml"
+
+    def exists(self):
+        return self.manifest.exists()
+
+    def clean(self):
+        if self.path.exists():
+            logger.info("Removing existing snapshot directory %s", self.path)
+            shutil.rmtree(self.path)
+
+    def save(self, cluster_state: ClusterState) -> None:
+        """Copy cluster state directory in snapshot."""
+
+        def ignore(directory, names):
+            return [
+                name
+                for name in names
+                if Path(directory).relative_to(cluster_state.path) / name
+                in self.EXCLUDED
+            ]
+
+        if self.state.exists():
+            shutil.rmtree(self.state)
+        self.path.mkdir(parents=True, exist_ok=True)
+        logger.info("Saving cluster state directory %s in snapshot", cluster_state.path)
+        shutil.copytree(cluster_state.path, self.state, ignore=ignore)
+
+    def restore(self, cluster_state: ClusterState) -> None:
+        """Replace cluster state directory with the state saved in snapshot."""
+        if not self.state.exists():
+            raise FireHPCRuntimeError(
+                f"Unable to find cluster state in snapshot {self.state}"
+            )
+        cluster_state.clean()
+        cluster_state.user_state.create()
+        logger.info(
+            "Restoring cluster state directory %s from snapshot", cluster_state.path
+        )
+        shutil.copytree(self.state, cluster_state.path)
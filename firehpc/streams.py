@@ -0,0 +1,112 @@
+# Copyright (c) 2025 Rackslab
+#
+# This file is part of FireHPC.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Parse commands outputs incrementally from streams of text chunks, so that memory
+usage depends on the size of one record instead of the size of the whole output."""
+
+from __future__ import annotations
+import json
+import typing as t
+
+_WHITESPACES = " \t\n\r"
+
+
+def lines(chunks: t.Iterable[str]) -> t.Iterator[str]:
+    """Yield lines without line terminators from stream of text chunks."""
+    pending = ""
+    for chunk in chunks:
+        pending += chunk
+        *complete, pending = pending.split("\n")
+        yield from complete
+    if pending:
+        yield pending
+
+
+class _JSONStream:
+    """Buffer of text chunks consumed by the JSON decoder."""
+
+    def __init__(self, chunks: t.Iterable[str]):
+        self.chunks = iter(chunks)
+        self.buffer = ""
+        self.pos = 0
+        self.exhausted = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        """Append next chunk to buffer, dropping already consumed text. Return False
+        when stream is exhausted."""
+        try:
+            chunk = next(self.chunks)
+        except StopIteration:
+            self.exhausted = True
+            return False
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def _error(self, msg: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(msg, self.buffer, self.pos)
+
+    def peek(self) -> str:
+        """Return next non-whitespace character without consuming it, or an empty
+        string at the end of stream."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACES:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._fill():
+                return self.buffer[self.pos : self.pos + 1]
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise self._error(f"Expecting '{char}'")
+        self.pos += 1
+
+    def value(self) -> t.Any:
+        """Decode next JSON value, reading more chunks until the value is complete.
+        The value is considered complete when followed by another character, to avoid
+        decoding truncated numbers or literals."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            if end < len(self.buffer) or self.exhausted:
+                self.pos = end
+                return value
+            if not self._fill():
+                self.pos = end
+                return value
+
+
+def json_items(chunks: t.Iterable[str], *keys: str) -> t.Iterator[t.Any]:
+    """Yield items of the array value of the first of keys found in top-level JSON
+    object from stream of text chunks. Values of other keys are skipped. Raise
+    json.JSONDecodeError if the stream is not a valid JSON object or if none of the
+    keys is found."""
+    stream = _JSONStream(chunks)
+    stream.expect("{")
+    if stream.peek() == "}":
+        raise stream._error(f"Unable to find key {' or '.join(keys)}")
+    while True:
+        key = stream.value()
+        stream.expect(":")
+        if key in keys:
+            break
+        stream.value()
+        if stream.peek() != ",":
+            raise stream._error(f"Unable to find key {' or '.join(keys)}")
+        stream.pos += 1
+    stream.expect("[")
+    if stream.peek() == "]":
+        return
+    while True:
+        yield stream.value()
+        if stream.peek() == "]":
+            return
+        stream.expect(",")
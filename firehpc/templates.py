@@ -4,20 +4,66 @@
 #
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+from __future__ import annotations
+from typing import Optional, Union
+from pathlib import Path
+import functools
+import logging
+
 import jinja2
 
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=None)
+def _environment(root: Optional[Path], cache: Optional[Path]) -> jinja2.Environment:
+    """Return Jinja2 environment shared by all templaters with the same templates
+    root directory and bytecode cache directory, so that templates are parsed and
+    compiled once per process, and once for all processes with bytecode cache."""
+    bytecode_cache = None
+    if cache is not None:
+        cache.mkdir(parents=True, exist_ok=True)
+        logger.debug("Using templates bytecode cache directory %s", cache)
+        bytecode_cache = jinja2.FileSystemBytecodeCache(str(cache))
+    # Enable trim_blocks and lstrip_blocks in template as it is easier to
+    # add spaces (or disable them occasionnaly in templates) than removing
+    # them, and it is usually the expected behaviour with templates blocks.
+    # Also keep trailing newline in EOF to avoid breaking prompt with cat.
+    return jinja2.Environment(
+        loader=jinja2.FileSystemLoader(root) if root is not None else None,
+        bytecode_cache=bytecode_cache,
+        trim_blocks=True,
+        lstrip_blocks=True,
+        keep_trailing_newline=True,
+    )
+
 
 class Templater:
-    """Class to abstract backend templating library."""
+    """Class to abstract backend templating library. File templates are loaded
+    relative to the optional root directory, with compiled templates optionally
+    cached in the given directory."""
+
+    def __init__(self, root: Optional[Path] = None, cache: Optional[Path] = None):
+        self.root = root
+        self.cache = cache
+        self.env = _environment(root, cache)
 
-    def __init__(self):
-        # Enable trim_blocks and lstrip_blocks in template as it is easier to
-        # add spaces (or disable them occasionnaly in templates) than removing
-        # them, and it is usually the expected behaviour with templates blocks.
-        # Also keep trailing newline in EOF to avoid breaking prompt with cat.
-        self.env = jinja2.Environment(
-            trim_blocks=True, lstrip_blocks=True, keep_trailing_newline=True
-        )
+    def _template(self, path: Union[Path, str]) -> jinja2.Template:
+        path = Path(path)
+        # Templates outside root directory are loaded with the environment of
+        # their parent directory.
+        if self.root is not None and not path.is_absolute():
+            env, name = self.env, path.as_posix()
+        elif self.root is not None and path.is_relative_to(self.root):
+            env, name = self.env, path.relative_to(self.root).as_posix()
+        else:
+            env, name = _environment(path.parent, self.cache), path.name
+        try:
+            return env.get_template(name)
+        except jinja2.exceptions.TemplateNotFound as err:
+            raise RuntimeError(f"Unable to find template file {path}") from err
+        except jinja2.exceptions.TemplateSyntaxError as err:
+            raise RuntimeError(f"Unable to render template file {path}: {err}")
 
     def srender(self, str, **kwargs):
         """Render a string template."""
@@ -26,10 +72,11 @@ class Templater:
         except jinja2.exceptions.TemplateSyntaxError as err:
             raise RuntimeError(f"Unable to render template string {str}: {err}")
 
-    def frender(self, path, **kwargs):
-        """Render a file template."""
-        self.env.loader = jinja2.FileSystemLoader(path.parent)
-        try:
-            return self.env.get_template(path.name).render(kwargs)
-        except jinja2.exceptions.TemplateSyntaxError as err:
-            raise RuntimeError(f"Unable to render template file {path}: {err}")
+    def frender(self, path: Union[Path, str], **kwargs) -> str:
+        """Render a file template, absolute or relative to root directory."""
+        return self._template(path).render(kwargs)
+
+    def fstream(self, path: Union[Path, str], output: Path, **kwargs) -> None:
+        """Render a file template, absolute or relative to root directory, streamed
+        in output file."""
+        self._template(path).stream(kwargs).dump(str(output), encoding="utf-8")
@@ -0,0 +1,160 @@
+# Copyright (c) 2025 Rackslab
+#
+# This file is part of FireHPC.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Build timing profile of Ansible runs from ansible-runner events stream."""
+
+from __future__ import annotations
+from datetime import datetime
+from pathlib import Path
+import statistics
+import typing as t
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Events emitted once per task and host when the task is completed on the host
+TASK_HOST_EVENTS = [
+    "runner_on_ok",
+    "runner_on_failed",
+    "runner_on_skipped",
+    "runner_on_unreachable",
+]
+# Hosts whose total tasks duration exceeds the median by this factor are reported as
+# stragglers.
+STRAGGLER_FACTOR = 1.5
+
+
+def _event_duration(data: dict[str, t.Any]) -> float:
+    """Return duration of task on host in seconds from event data."""
+    if data.get("duration") is not None:
+        return float(data["duration"])
+    try:
+        return (
+            datetime.fromisoformat(data["end"]) - datetime.fromisoformat(data["start"])
+        ).total_seconds()
+    except (KeyError, TypeError, ValueError):
+        return 0.0
+
+
+class AnsibleTimings:
+    """Durations of Ansible tasks on every host, collected from ansible-runner events
+    of successive playbooks runs."""
+
+    def __init__(self):
+        self.playbook = None
+        # Tasks indexed by playbook and task UUID, in order of appearance
+        self.tasks = {}
+
+    def handler(self, playbook: str) -> t.Callable[[dict[str, t.Any]], bool]:
+        """Return ansible-runner event handler for the given playbook."""
+        self.playbook = playbook
+        return self.handle
+
+    def handle(self, event: dict[str, t.Any]) -> bool:
+        if event.get("event") in TASK_HOST_EVENTS:
+            data = event.get("event_data", {})
+            task = self.tasks.setdefault(
+                (self.playbook, data.get("task_uuid")),
+                {
+                    "playbook": self.playbook,
+                    "play": data.get("play", ""),
+                    "role": data.get("role") or None,
+                    "task": data.get("task", ""),
+                    "hosts": {},
+                },
+            )
+            task["hosts"][data.get("host", "")] = _event_duration(data)
+        # Keep event in ansible-runner artifacts
+        return True
+
+    def report(self, top: int = 10) -> dict[str, t.Any]:
+        """Return timing profile with the slowest tasks, the duration of roles and
+        hosts and the straggler hosts."""
+        tasks = []
+        roles = {}
+        hosts = {}
+        for task in self.tasks.values():
+            # Task wall time is the duration on its slowest host
+            slowest = max(task["hosts"], key=task["hosts"].get)
+            wall = task["hosts"][slowest]
+            tasks.append(
+                {
+                    "playbook": task["playbook"],
+                    "play": task["play"],
+                    "role": task["role"],
+                    "task": task["task"],
+                    "wall": wall,
+                    "slowest_host": slowest,
+                    "hosts": task["hosts"],
+                }
+            )
+            role = task["role"] or "(none)"
+            roles[role] = roles.get(role, 0) + wall
+            for host, duration in task["hosts"].items():
+                hosts[host] = hosts.get(host, 0) + duration
+        stragglers = []
+        if hosts:
+            median = statistics.median(hosts.values())
+            stragglers = sorted(
+                (
+                    host
+                    for host, duration in hosts.items()
+                    if duration > median * STRAGGLER_FACTOR
+                ),
+                key=hosts.get,
+                reverse=True,
+            )
+        return {
+            "total": sum(task["wall"] for task in tasks),
+            "slowest_tasks": sorted(tasks, key=lambda task: task["wall"], reverse=True)[
+                :top
+            ],
+            "roles": dict(
+                sorted(roles.items(), key=lambda item: item[1], reverse=True)
+            ),
+            "hosts": dict(
+                sorted(hosts.items(), key=lambda item: item[1], reverse=True)
+            ),
+            "stragglers": stragglers,
+        }
+
+    def save(self, path: Path) -> None:
+        logger.debug("Saving Ansible timing profile in file %s", path)
+        report = self.report()
+        report["tasks"] = list(self.tasks.values())
+        with open(path, "w+") as fh:
+            json.dump(report, fh, indent=2)
+
+    def summary(self, top: int = 5) -> None:
+        """Log short summary of timing profile."""
+        report = self.report(top)
+        if not report["slowest_tasks"]:
+            return
+        logger.info("Ansible tasks total duration: %.1fs", report["total"])
+        logger.info(
+            "Slowest roles: %s",
+            ", ".join(
+                f"{role} ({duration:.1f}s)"
+                for role, duration in list(report["roles"].items())[:top]
+            ),
+        )
+        for task in report["slowest_tasks"]:
+            logger.info(
+                "Slow task: %s%s %.1fs (slowest host %s)",
+                f"{task['role']} : " if task["role"] else "",
+                task["task"],
+                task["wall"],
+                task["slowest_host"],
+            )
+        if report["stragglers"]:
+            logger.info(
+                "Straggler hosts: %s",
+                ", ".join(
+                    f"{host} ({report['hosts'][host]:.1f}s)"
+                    for host in report["stragglers"][:top]
+                ),
+            )
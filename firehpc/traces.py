@@ -0,0 +1,261 @@
+# Copyright (c) 2025 Rackslab
+#
+# This file is part of FireHPC.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Read workload traces to replay jobs on emulated clusters.
+
+Two traces formats are supported:
+
+- Standard Workload Format (SWF) from the Parallel Workloads Archive, with 18
+  whitespace separated fields per job and comments lines starting with semicolon.
+- Output of `sacct --parsable` or `sacct --parsable2` with header line, where fields
+  are separated by pipes. The Submit and User fields are required, Partition,
+  ElapsedRaw (or Elapsed), NCPUS (or AllocCPUS, ReqCPUS), TimelimitRaw (or Timelimit)
+  and State fields are optional.
+
+Traces are read line by line so that memory usage does not depend on the size of the
+trace. Traces compressed with gzip, bzip2 or xz are decompressed on the fly.
+"""
+
+from __future__ import annotations
+from collections import namedtuple
+from datetime import datetime
+from pathlib import Path
+import bz2
+import gzip
+import lzma
+import typing as t
+import logging
+
+from .errors import FireHPCRuntimeError
+
+logger = logging.getLogger(__name__)
+
+TraceJob = namedtuple(
+    "TraceJob",
+    ["submit", "user", "partition", "size", "duration", "timelimit", "failed"],
+)
+
+# SWF fields indexes
+SWF_SUBMIT = 1
+SWF_RUN_TIME = 3
+SWF_ALLOCATED_PROCS = 4
+SWF_REQUESTED_PROCS = 7
+SWF_REQUESTED_TIME = 8
+SWF_STATUS = 10
+SWF_USER = 11
+SWF_PARTITION = 15
+SWF_NB_FIELDS = 18
+# SWF job status values
+SWF_STATUS_FAILED = 0
+
+OPENERS = {
+    ".gz": gzip.open,
+    ".bz2": bz2.open,
+    ".xz": lzma.open,
+}
+
+
+def _open(path: Path) -> t.TextIO:
+    opener = OPENERS.get(path.suffix, open)
+    try:
+        return opener(path, "rt")
+    except OSError as err:
+        raise FireHPCRuntimeError(f"Unable to open trace file {path}: {err}") from err
+
+
+def _swf_value(value: str) -> t.Optional[int]:
+    """Return SWF integer value or None if it is missing (ie. negative)."""
+    value = int(float(value))
+    if value < 0:
+        return None
+    return value
+
+
+def parse_swf_line(line: str) -> t.Optional[TraceJob]:
+    """Return job from SWF line or None if the line must be ignored."""
+    fields = line.split()
+    if len(fields) < SWF_NB_FIELDS:
+        return None
+    submit = _swf_value(fields[SWF_SUBMIT])
+    duration = _swf_value(fields[SWF_RUN_TIME])
+    # Jobs without submit time or run time cannot be replayed
+    if submit is None or duration is None:
+        return None
+    size = _swf_value(fields[SWF_REQUESTED_PROCS]) or _swf_value(
+        fields[SWF_ALLOCATED_PROCS]
+    )
+    partition = _swf_value(fields[SWF_PARTITION])
+    return TraceJob(
+        submit,
+        fields[SWF_USER],
+        str(partition) if partition is not None else None,
+        size or 1,
+        duration,
+        _swf_value(fields[SWF_REQUESTED_TIME]),
+        _swf_value(fields[SWF_STATUS]) == SWF_STATUS_FAILED,
+    )
+
+
+def _sacct_duration(value: str) -> t.Optional[int]:
+    """Convert sacct [DD-[HH:]]MM:SS duration in seconds, or None if the duration is
+    not defined."""
+    if not value or not value[0].isdigit():
+        # UNLIMITED, Partition_Limit, etc
+        return None
+    days = 0
+    if "-" in value:
+        _days, value = value.split("-", 1)
+        days = int(_days)
+    result = 0
+    for part in value.split(":"):
+        result = result * 60 + int(float(part))
+    return days * 86400 + result
+
+
+def _sacct_first(row: dict[str, str], *keys: str) -> t.Optional[str]:
+    """Return value of the first key defined with a non-empty value in row."""
+    for key in keys:
+        if row.get(key):
+            return row[key]
+    return None
+
+
+def parse_sacct_row(row: dict[str, str]) -> t.Optional[TraceJob]:
+    """Return job from sacct row or None if the row must be ignored."""
+    # Skip jobs steps
+    if "." in row.get("JobID", ""):
+        return None
+    try:
+        submit = datetime.fromisoformat(row["Submit"]).timestamp()
+    except (KeyError, ValueError):
+        return None
+    elapsed = _sacct_first(row, "ElapsedRaw")
+    if elapsed is not None:
+        duration = int(elapsed)
+    else:
+        duration = _sacct_duration(row.get("Elapsed", ""))
+    if duration is None:
+        return None
+    timelimit = _sacct_first(row, "TimelimitRaw")
+    if timelimit is not None and timelimit.isdigit():
+        # TimelimitRaw is expressed in minutes
+        timelimit = int(timelimit) * 60
+    else:
+        timelimit = _sacct_duration(row.get("Timelimit", ""))
+    size = _sacct_first(row, "NCPUS", "AllocCPUS", "ReqCPUS")
+    return TraceJob(
+        submit,
+        row.get("User", ""),
+        row.get("Partition") or None,
+        int(size) if size and size.isdigit() and int(size) else 1,
+        duration,
+        timelimit,
+        row.get("State", "").startswith("FAILED"),
+    )
+
+
+def read_trace(path: Path) -> t.Iterator[TraceJob]:
+    """Stream jobs from trace file, in SWF or sacct parsable format."""
+    logger.debug("Reading jobs trace file %s", path)
+    header = None
+    sacct = None
+    with _open(path) as fh:
+        for index, line in enumerate(fh, 1):
+            line = line.rstrip("\n")
+            if not line.strip():
+                continue
+            # Detect format with the first significant line
+            if sacct is None:
+                if line.startswith(";"):
+                    sacct = False
+                elif "|" in line:
+                    sacct = True
+                    header = line.rstrip("|").split("|")
+                    if "Submit" not in header:
+                        raise FireHPCRuntimeError(
+                            f"Submit field is missing in trace file {path} header"
+                        )
+                    continue
+                else:
+                    sacct = False
+            if not sacct and line.startswith(";"):
+                continue
+            try:
+                if sacct:
+                    job = parse_sacct_row(
+                        dict(zip(header, line.rstrip("|").split("|")))
+                    )
+                else:
+                    job = parse_swf_line(line)
+            except ValueError as err:
+                raise FireHPCRuntimeError(
+                    f"Unable to parse line {index} of trace file {path}: {err}"
+                ) from err
+            if job is None:
+                logger.debug("Ignoring line %d of trace file %s", index, path)
+                continue
+            yield job
+
+
+def processors_allocation(
+    procs: int, partition, linear: bool = False
+) -> tuple[str, int]:
+    """Return sbatch option with its value to allocate the number of processors of
+    trace job in the given partition. With select/linear, processors are converted
+    into a number of nodes with the average number of CPUs per node of the
+    partition. In partitions with GPUs, processors are converted into a number of
+    GPUs with the average number of CPUs per GPU. Otherwise, one task is allocated
+    per processor. Values are bounded by partition sizes."""
+
+    def convert(per_unit: int, limit: int) -> int:
+        # Round up the number of units required for all processors
+        return max(1, min(-(-procs // max(per_unit, 1)), limit))
+
+    if linear:
+        return "--nodes", convert(
+            partition.cpus // max(partition.nodes, 1), partition.nodes
+        )
+    if partition.gpus:
+        return "--gpus", convert(partition.cpus // partition.gpus, partition.gpus)
+    return "--ntasks", convert(1, partition.cpus)
+
+
+class TraceMapper:
+    """Map users and partitions of trace onto the users and partitions of the
+    emulated cluster. Trace users are assigned to cluster users in round-robin in
+    order of appearance. Trace partitions are mapped to the cluster partitions with
+    the same name, or assigned in round-robin to cluster partitions otherwise."""
+
+    def __init__(self, users: list, partitions: list):
+        if not len(users):
+            raise FireHPCRuntimeError("Unable to map trace users without cluster user")
+        if not len(partitions):
+            raise FireHPCRuntimeError(
+                "Unable to map trace partitions without cluster partition"
+            )
+        self.users = users
+        self.partitions = partitions
+        self._users = {}
+        self._partitions = {}
+        self._unmatched_partitions = 0
+
+    def user(self, name: str):
+        if name not in self._users:
+            self._users[name] = self.users[len(self._users) % len(self.users)]
+        return self._users[name]
+
+    def partition(self, name: t.Optional[str]):
+        if name not in self._partitions:
+            for partition in self.partitions:
+                if partition.name == name:
+                    self._partitions[name] = partition
+                    break
+            else:
+                self._partitions[name] = self.partitions[
+                    self._unmatched_partitions % len(self.partitions)
+                ]
+                self._unmatched_partitions += 1
+        return self._partitions[name]
@@ -0,0 +1,162 @@
+# Copyright (c) 2025 Rackslab
+#
+# This file is part of FireHPC.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Model synthetic workloads submitted by jobs loader."""
+
+from __future__ import annotations
+import dataclasses
+from pathlib import Path
+import random
+import typing as t
+
+from .errors import FireHPCRuntimeError
+
+# Minimal fraction of target rate during warm-up period, to avoid waiting
+# endlessly for the first arrival.
+WARMUP_MIN_FACTOR = 0.05
+
+
+@dataclasses.dataclass
+class Distribution:
+    """Discrete distribution of values with their weights in random selection."""
+
+    values: list[t.Any]
+    weights: list[int]
+
+    def pick(self) -> t.Any:
+        return random.choices(self.values, weights=self.weights)[0]
+
+    @classmethod
+    def parse(cls, specs: list[str], cast: t.Callable = int) -> Distribution:
+        """Parse distribution from a list of VALUE[:WEIGHT] strings. The weight is 1
+        when omitted. Values must be greater than or equal to 1, weights must be
+        positive or null with at least one non-null weight."""
+        values = []
+        weights = []
+        for spec in specs:
+            value, _, weight = spec.partition(":")
+            try:
+                values.append(cast(value))
+                weights.append(int(weight) if weight else 1)
+            except ValueError as err:
+                raise FireHPCRuntimeError(
+                    f"Invalid distribution value {spec}: {err}"
+                ) from err
+            if values[-1] < 1:
+                raise FireHPCRuntimeError(
+                    f"Invalid distribution value {spec}: value must be greater than "
+                    "or equal to 1"
+                )
+            if weights[-1] < 0:
+                raise FireHPCRuntimeError(
+                    f"Invalid distribution value {spec}: weight must be positive"
+                )
+        if not len(values):
+            raise FireHPCRuntimeError("Distribution must have at least one value")
+        if not sum(weights):
+            raise FireHPCRuntimeError(
+                "Distribution must have at least one non-null weight"
+            )
+        return cls(values, weights)
+
+
+@dataclasses.dataclass
+class WorkloadSettings:
+    """Settings of jobs workload generated by loader. When replay trace is defined,
+    jobs of the trace are submitted at their recorded times accelerated by speedup
+    factor. When rate is defined, jobs are submitted in open-loop at this target rate
+    (in jobs per minute) with at most inflight concurrent submissions. Otherwise, the
+    loader keeps filling the queue up to the active jobs limit."""
+
+    durations: t.Optional[Distribution] = None
+    sizes: t.Optional[Distribution] = None
+    rate: t.Optional[float] = None
+    poisson: bool = True
+    warmup: float = 0
+    inflight: int = 10
+    replay: t.Optional[Path] = None
+    speedup: float = 1
+
+    @property
+    def open_loop(self) -> bool:
+        return self.rate is not None
+
+
+class Dispatches:
+    """Count jobs submissions dispatched at scheduled times. Submissions dispatched
+    more than LATE_TOLERANCE seconds after their scheduled time are counted as late,
+    failed submissions are counted apart."""
+
+    # Tolerated delay in seconds between scheduled and dispatch times
+    LATE_TOLERANCE = 1
+
+    def __init__(self):
+        self.dispatched = 0
+        self.late = 0
+        self.failed = 0
+
+    def record(self, now: float, scheduled: t.Optional[float] = None) -> None:
+        """Record dispatch time of job submission. When scheduled time of submission
+        is given, late dispatch is counted."""
+        if scheduled is not None and now - scheduled > self.LATE_TOLERANCE:
+            self.late += 1
+        self.dispatched += 1
+
+    def record_failure(self) -> None:
+        """Record failed job submission."""
+        self.failed += 1
+
+
+class ArrivalProcess(Dispatches):
+    """Generate jobs arrival times to reach a target submission rate, with either
+    Poisson or constant inter-arrival times. During the optional warm-up period, the
+    rate increases linearly up to the target rate. The achieved rate is measured after
+    the warm-up period."""
+
+    def __init__(self, rate: float, poisson: bool = True, warmup: float = 0):
+        if rate <= 0:
+            raise FireHPCRuntimeError(f"Invalid jobs submission rate {rate}")
+        super().__init__()
+        self.rate = rate
+        self.poisson = poisson
+        self.warmup = warmup
+        self.start = None
+        self.next = None
+        self.submitted = 0
+
+    def begin(self, now: float) -> None:
+        self.start = now
+        self.next = now
+
+    def current_rate(self, elapsed: float) -> float:
+        """Return the target rate in jobs per minute after elapsed seconds."""
+        if elapsed < self.warmup:
+            return self.rate * max(elapsed / self.warmup, WARMUP_MIN_FACTOR)
+        return self.rate
+
+    def next_arrival(self) -> float:
+        """Return the time of next job arrival."""
+        rate = self.current_rate(self.next - self.start) / 60
+        if self.poisson:
+            self.next += random.expovariate(rate)
+        else:
+            self.next += 1 / rate
+        return self.next
+
+    def record(self, now: float, scheduled: t.Optional[float] = None) -> None:
+        """Record dispatch time of job arrival, ignored in achieved rate during
+        warm-up period."""
+        super().record(now, scheduled)
+        if now - self.start >= self.warmup:
+            self.submitted += 1
+
+    def achieved_rate(self, now: float) -> float:
+        """Return the achieved submission rate in jobs per minute after warm-up
+        period."""
+        measured = now - self.start - self.warmup
+        if measured <= 0:
+            return 0
+        return self.submitted / measured * 60
@@ -0,0 +1,181 @@
+# Copyright (c) 2025 Rackslab
+#
+# This file is part of FireHPC.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import os
+import shlex
+import subprocess
+
+from ansible.errors import AnsibleConnectionFailure, AnsibleFileNotFound
+from ansible.module_utils.common.text.converters import to_bytes, to_native
+from ansible.plugins.connection import ConnectionBase
+from ansible.utils.display import Display
+
+DOCUMENTATION = """
+    name: nspawn
+    short_description: Run tasks in local systemd-nspawn containers
+    description:
+      - Run commands and transfer files in containers registered in local machined
+        without SSH, by entering the namespaces of the container with nsenter or
+        by running transient units in the container with systemd-run.
+      - Modules are always piped on commands standard input.
+    author: Rackslab
+    options:
+      remote_addr:
+        description:
+          - Name of the container in machined.
+        default: inventory_hostname
+        vars:
+          - name: inventory_hostname
+          - name: ansible_host
+      method:
+        description:
+          - Method used to run commands in containers. C(nsenter) enters the
+            namespaces of the container leader process and requires root
+            privileges. C(systemd-run) runs transient units in the container and
+            can be authorized with polkit. C(auto) selects C(nsenter) when running
+            as root and C(systemd-run) otherwise.
+        default: auto
+        choices: [auto, nsenter, systemd-run]
+        vars:
+          - name: ansible_nspawn_method
+        env:
+          - name: FIREHPC_NSPAWN_METHOD
+"""
+
+display = Display()
+
+# Namespaces of the container leader process entered by nsenter
+NAMESPACES = ["mount", "uts", "ipc", "net", "pid", "cgroup"]
+# Minimal environment of commands run in containers, host environment is not
+# inherited.
+ENVIRONMENT = [
+    "PATH=/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin",
+    "HOME=/root",
+]
+
+
+class Connection(ConnectionBase):
+    """Local connection to systemd-nspawn containers"""
+
+    transport = "nspawn"
+    has_pipelining = True
+    # Modules are always piped on commands standard input, without temporary
+    # files copied in containers.
+    always_pipeline_modules = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.machine = None
+        self.method = None
+        self.leader = None
+        self.userns = False
+
+    def _connect(self):
+        if self._connected:
+            return self
+        self.machine = self.get_option("remote_addr")
+        self.method = self.get_option("method")
+        if self.method == "auto":
+            self.method = "nsenter" if os.geteuid() == 0 else "systemd-run"
+        if self.method == "nsenter":
+            # Retrieve container leader PID once per connection, it is then reused
+            # by all commands.
+            try:
+                self.leader = subprocess.run(
+                    [
+                        "machinectl",
+                        "show",
+                        "--property=Leader",
+                        "--value",
+                        self.machine,
+                    ],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout.strip()
+            except subprocess.CalledProcessError as err:
+                raise AnsibleConnectionFailure(
+                    f"Unable to find leader of container {self.machine}: "
+                    f"{err.stderr.strip()}"
+                ) from err
+            # Enter container user namespace only when it differs from the current
+            # one, nsenter fails to enter its own user namespace.
+            self.userns = os.readlink(f"/proc/{self.leader}/ns/user") != os.readlink(
+                "/proc/self/ns/user"
+            )
+        display.vvv(
+            f"ESTABLISH NSPAWN CONNECTION TO {self.machine} WITH {self.method}",
+            host=self.machine,
+        )
+        self._connected = True
+        return self
+
+    def _command(self, cmd):
+        """Return local command to run cmd in container."""
+        if self.method == "nsenter":
+            local_cmd = ["nsenter", f"--target={self.leader}"]
+            local_cmd += [f"--{namespace}" for namespace in NAMESPACES]
+            if self.userns:
+                local_cmd += ["--user", "--preserve-credentials"]
+            local_cmd += ["--root", "--wd", "--", "env", "-i"] + ENVIRONMENT
+        else:
+            local_cmd = [
+                "systemd-run",
+                f"--machine={self.machine}",
+                "--pipe",
+                "--wait",
+                "--quiet",
+                "--collect",
+                "--service-type=exec",
+            ]
+            local_cmd += [f"--setenv={variable}" for variable in ENVIRONMENT]
+            local_cmd += ["--"]
+        return local_cmd + cmd
+
+    def _run(self, cmd, stdin=subprocess.PIPE, in_data=None, stdout=subprocess.PIPE):
+        local_cmd = self._command(cmd)
+        display.vvv(f"EXEC {shlex.join(local_cmd)}", host=self.machine)
+        process = subprocess.Popen(
+            local_cmd, stdin=stdin, stdout=stdout, stderr=subprocess.PIPE
+        )
+        stdout, stderr = process.communicate(in_data)
+        return process.returncode, stdout, stderr
+
+    def exec_command(self, cmd, in_data=None, sudoable=False):
+        super().exec_command(cmd, in_data=in_data, sudoable=sudoable)
+        executable = self._play_context.executable or "/bin/sh"
+        return self._run([executable, "-c", cmd], in_data=in_data)
+
+    def put_file(self, in_path, out_path):
+        super().put_file(in_path, out_path)
+        display.vvv(f"PUT {in_path} TO {out_path}", host=self.machine)
+        if not os.path.exists(to_bytes(in_path, errors="surrogate_or_strict")):
+            raise AnsibleFileNotFound(f"file or module does not exist: {in_path}")
+        with open(to_bytes(in_path, errors="surrogate_or_strict"), "rb") as fh:
+            rc, _, stderr = self._run(
+                ["/bin/sh", "-c", f"cat > {shlex.quote(out_path)}"], stdin=fh
+            )
+        if rc:
+            raise AnsibleConnectionFailure(
+                f"Failed to transfer file {in_path} to {out_path} in container "
+                f"{self.machine}: {to_native(stderr)}"
+            )
+
+    def fetch_file(self, in_path, out_path):
+        super().fetch_file(in_path, out_path)
+        display.vvv(f"FETCH {in_path} TO {out_path}", host=self.machine)
+        with open(to_bytes(out_path, errors="surrogate_or_strict"), "wb") as fh:
+            rc, _, stderr = self._run(
+                ["/bin/sh", "-c", f"cat {shlex.quote(in_path)}"], stdout=fh
+            )
+        if rc:
+            raise AnsibleConnectionFailure(
+                f"Failed to fetch file {in_path} to {out_path} from container "
+                f"{self.machine}: {to_native(stderr)}"
+            )
+
+    def close(self):
+        self._connected = False
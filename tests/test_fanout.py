@@ -0,0 +1,84 @@
+# Copyright (c) 2025 Rackslab
+#
+# This file is part of FireHPC.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import unittest
+
+from ClusterShell.NodeSet import NodeSet
+
+from firehpc.fanout import (
+    EXIT_STATUS_UNREACHABLE,
+    NodeResult,
+    fanout,
+    gather,
+    statuses,
+)
+from firehpc.errors import FireHPCRuntimeError
+
+RESULTS = {
+    "cn1": NodeResult(0, b"ok\n", b""),
+    "cn2": NodeResult(0, b"ok\n", b""),
+    "cn3": NodeResult(1, b"ok\n", b"error\n"),
+    "cn10": NodeResult(0, b"other\n", b""),
+    "login": NodeResult(255, b"", b"unreachable\n"),
+}
+
+
+class FakeSSHClient:
+    """Run commands by returning predefined results indexed by destination host."""
+
+    def __init__(self, results: dict[str, NodeResult]):
+        self.results = results
+
+    def exec_status(self, args):
+        result = self.results.get(args[0])
+        if result is None:
+            raise FireHPCRuntimeError(f"Unable to connect to {args[0]}")
+        return tuple(result)
+
+
+class TestGather(unittest.TestCase):
+    def test_gather_stdout(self):
+        # Outputs are sorted by nodeset string
+        self.assertEqual(
+            gather(RESULTS, "stdout"),
+            [(NodeSet("cn10"), b"other\n"), (NodeSet("cn[1-3]"), b"ok\n")],
+        )
+
+    def test_gather_stderr(self):
+        # Empty outputs are ignored
+        self.assertEqual(
+            gather(RESULTS, "stderr"),
+            [(NodeSet("cn3"), b"error\n"), (NodeSet("login"), b"unreachable\n")],
+        )
+
+    def test_gather_empty(self):
+        self.assertEqual(gather({}, "stdout"), [])
+        self.assertEqual(gather({"cn1": NodeResult(0, b"", b"")}, "stdout"), [])
+
+
+class TestStatuses(unittest.TestCase):
+    def test_statuses(self):
+        result = statuses(RESULTS)
+        self.assertEqual(list(result.keys()), [0, 1, 255])
+        self.assertEqual(result[0], NodeSet("cn[1-2,10]"))
+        self.assertEqual(result[1], NodeSet("cn3"))
+        self.assertEqual(result[255], NodeSet("login"))
+
+    def test_statuses_empty(self):
+        self.assertEqual(statuses({}), {})
+
+
+class TestFanout(unittest.TestCase):
+    def test_fanout(self):
+        ssh = FakeSSHClient(
+            {"cn1.hpc": NodeResult(0, b"ok\n", b""), "cn2.hpc": NodeResult(2, b"", b"")}
+        )
+        results = fanout(ssh, "hpc", NodeSet("cn[1-3]"), ["hostname"], 2)
+        self.assertEqual(results["cn1"], NodeResult(0, b"ok\n", b""))
+        self.assertEqual(results["cn2"].status, 2)
+        # Errors are reported with ssh unreachable exit status
+        self.assertEqual(results["cn3"].status, EXIT_STATUS_UNREACHABLE)
+        self.assertEqual(results["cn3"].stderr, b"Unable to connect to cn3.hpc\n")
@@ -0,0 +1,154 @@
+# Copyright (c) 2025 Rackslab
+#
+# This file is part of FireHPC.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import unittest
+from pathlib import Path
+import functools
+import http.server
+import tempfile
+import threading
+import hashlib
+
+from firehpc.images import ImageCache, decompressor, parse_checksums
+from firehpc.errors import FireHPCRuntimeError
+
+
+class TestDecompressor(unittest.TestCase):
+    def test_decompressor(self):
+        self.assertEqual(
+            decompressor(Path("/tmp/image.raw.xz"), 4),
+            ["xz", "--decompress", "--stdout", "--threads=4", "/tmp/image.raw.xz"],
+        )
+        self.assertEqual(
+            decompressor(Path("/tmp/image.raw.zst"))[0],
+            "zstd",
+        )
+        self.assertIsNone(decompressor(Path("/tmp/image.raw")))
+
+
+class TestParseChecksums(unittest.TestCase):
+    def test_parse_checksums(self):
+        content = f"{'a' * 64}  image1.raw.xz\n{'B' * 64} *image2.raw.xz\ninvalid\n"
+        self.assertEqual(parse_checksums(content, "image1.raw.xz"), "a" * 64)
+        self.assertEqual(parse_checksums(content, "image2.raw.xz"), "b" * 64)
+        self.assertIsNone(parse_checksums(content, "image3.raw.xz"))
+
+
+class TestImageCache(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.image = self.tmp / "image.raw.xz"
+        self.image.write_bytes(b"image content")
+        self.digest = hashlib.sha256(b"image content").hexdigest()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_fetch_local(self):
+        cache = ImageCache(self.tmp / "cache")
+        for url in (str(self.image), f"file://{self.image}"):
+            image = cache.fetch(url)
+            self.assertEqual(image.path, self.image)
+            self.assertEqual(image.digest, self.digest)
+
+    def test_fetch_hit_miss(self):
+        url = f"file://{self.image}"
+        cache = ImageCache(self.tmp / "cache")
+        self.assertFalse(cache.fetch(url).hit)
+        self.assertTrue(cache.fetch(url).hit)
+        # Index is persistent across cache instances
+        cache = ImageCache(self.tmp / "cache")
+        self.assertTrue(cache.fetch(url).hit)
+        # Modified image is a cache miss
+        self.image.write_bytes(b"new image content")
+        image = cache.fetch(url)
+        self.assertFalse(image.hit)
+        self.assertEqual(image.digest, hashlib.sha256(b"new image content").hexdigest())
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_fetch_checksum(self):
+        cache = ImageCache(self.tmp / "cache")
+        self.assertEqual(cache.fetch(str(self.image), self.digest).digest, self.digest)
+        with self.assertRaisesRegex(FireHPCRuntimeError, "^Checksum mismatch"):
+            ImageCache(self.tmp / "other").fetch(str(self.image), "0" * 64)
+
+    def test_fetch_missing(self):
+        with self.assertRaisesRegex(FireHPCRuntimeError, "^Unable to access image"):
+            ImageCache(self.tmp / "cache").fetch(str(self.tmp / "missing.raw"))
+
+    def test_mirror(self):
+        mirror = self.tmp / "mirror"
+        mirror.mkdir()
+        (mirror / "image.raw.xz").write_bytes(b"mirror content")
+        cache = ImageCache(self.tmp / "cache", f"file://{mirror}/")
+        image = cache.fetch("https://example.org/images/image.raw.xz")
+        self.assertEqual(image.path, mirror / "image.raw.xz")
+
+    def test_imported(self):
+        cache = ImageCache(self.tmp / "cache")
+        self.assertIsNone(cache.imported("image"))
+        cache.mark_imported("image", self.digest)
+        self.assertEqual(ImageCache(self.tmp / "cache").imported("image"), self.digest)
+        cache.forget_imported("image")
+        self.assertIsNone(ImageCache(self.tmp / "cache").imported("image"))
+
+    def test_fetch_remote_unreachable(self):
+        # Cached image is used when source is not reachable, after verification of
+        # its checksum.
+        url = "http://127.0.0.1:1/image.raw.xz"
+        cache = ImageCache(self.tmp / "cache")
+        cache.index["sources"][url] = {
+            "metadata": {},
+            "digest": self.digest,
+            "path": str(self.image),
+        }
+        image = cache.fetch(url, self.digest)
+        self.assertTrue(image.hit)
+        self.assertEqual(image.path, self.image)
+        with self.assertRaisesRegex(FireHPCRuntimeError, "^Checksum mismatch"):
+            cache.fetch(url, "0" * 64)
+
+    def test_fetch_remote_without_checksum(self):
+        cache = ImageCache(self.tmp / "cache")
+        self.assertTrue(cache.remote("https://example.org/image.raw.xz"))
+        self.assertFalse(cache.remote(str(self.image)))
+        with self.assertRaisesRegex(
+            FireHPCRuntimeError, "^Unable to cache image .* without verified checksum$"
+        ):
+            cache.fetch("https://example.org/image.raw.xz")
+
+    def test_signed_checksum_unreachable(self):
+        self.assertIsNone(
+            ImageCache(self.tmp / "cache").signed_checksum(
+                "http://127.0.0.1:1/image.raw.xz"
+            )
+        )
+
+    def test_fetch_remote(self):
+        server = http.server.ThreadingHTTPServer(
+            ("127.0.0.1", 0),
+            functools.partial(
+                http.server.SimpleHTTPRequestHandler, directory=str(self.tmp)
+            ),
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f"http://127.0.0.1:{server.server_port}/image.raw.xz"
+        cache = ImageCache(self.tmp / "cache")
+        image = cache.fetch(url, self.digest)
+        self.assertFalse(image.hit)
+        self.assertEqual(image.path.name, f"{self.digest}.raw.xz")
+        self.assertEqual(image.path.read_bytes(), b"image content")
+        self.assertTrue(cache.fetch(url, self.digest).hit)
+        # Temporary download files are removed
+        self.assertEqual(
+            [path.name for path in cache.blobs.iterdir()], [image.path.name]
+        )
+        with self.assertRaisesRegex(FireHPCRuntimeError, "^Checksum mismatch"):
+            ImageCache(self.tmp / "other").fetch(url, "0" * 64)
+        self.assertEqual(list((self.tmp / "other" / "sha256").iterdir()), [])
@@ -0,0 +1,102 @@
+# Copyright (c) 2025 Rackslab
+#
+# This file is part of FireHPC.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import unittest
+import tempfile
+from pathlib import Path
+
+from firehpc.incremental import ConfDigests, playbook_tags
+from firehpc.errors import FireHPCRuntimeError
+
+SITE = """
+- hosts: all
+  roles:
+    - role: common
+      tags: [ common ]
+- hosts: admin
+  roles:
+    - role: slurm
+      tags: [ slurm ]
+"""
+
+SLURM_META = """
+dependencies:
+  - role: mariadb
+    tags: [ mariadb, dependencies ]
+"""
+
+GROUPS = {"admin": ["admin.hpc"], "compute": ["cn1.hpc", "cn2.hpc"]}
+
+
+class TestConfDigests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.ansible = Path(self.tmp.name) / "ansible"
+        self.conf = Path(self.tmp.name) / "conf"
+        self.write(self.ansible / "site.yml", SITE)
+        self.write(self.ansible / "group_vars" / "all.yml", "foo: bar\n")
+        for role in ["common", "slurm", "mariadb"]:
+            self.write(self.ansible / "roles" / role / "tasks" / "main.yml", "---\n")
+        self.write(self.ansible / "roles" / "slurm" / "meta" / "main.yml", SLURM_META)
+        self.write(self.conf / "hosts", "all:\n")
+        self.write(self.conf / "custom.yml", "fhpc_cluster: hpc\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, content):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+    def compute(self, variables=None):
+        return ConfDigests.compute(
+            self.ansible, "site", self.conf, GROUPS, variables or {"fhpc_nodes": []}
+        )
+
+    def test_playbook_tags(self):
+        self.assertEqual(
+            playbook_tags(self.ansible / "site.yml", self.ansible / "roles"),
+            {"common": ["common"], "slurm": ["slurm", "mariadb"]},
+        )
+
+    def test_no_previous(self):
+        self.assertIsNone(self.compute().changes(None))
+
+    def test_unchanged(self):
+        self.assertEqual(self.compute().changes(self.compute()), ([], []))
+
+    def test_common_changed(self):
+        previous = self.compute()
+        self.assertIsNone(self.compute({"fhpc_nodes": ["cn1"]}).changes(previous))
+        previous = self.compute()
+        self.write(self.conf / "group_vars" / "all.yml", "foo: baz\n")
+        self.assertIsNone(self.compute().changes(previous))
+
+    def test_role_changed(self):
+        previous = self.compute()
+        self.write(self.ansible / "roles" / "mariadb" / "tasks" / "main.yml", "- a\n")
+        self.assertEqual(self.compute().changes(previous), (["slurm"], []))
+
+    def test_hosts_changed(self):
+        previous = self.compute()
+        self.write(self.conf / "group_vars" / "compute", "foo: baz\n")
+        self.write(self.conf / "host_vars" / "admin.hpc.yml", "foo: baz\n")
+        self.assertEqual(
+            sorted(self.compute().changes(previous)[1]),
+            ["admin.hpc", "cn1.hpc", "cn2.hpc"],
+        )
+
+    def test_save_load(self):
+        digests = self.compute()
+        path = Path(self.tmp.name) / "digests.json"
+        self.assertIsNone(ConfDigests.load(path))
+        digests.save(path)
+        self.assertEqual(ConfDigests.load(path), digests)
+        path.write_text("fail")
+        with self.assertRaisesRegex(
+            FireHPCRuntimeError, "^Unable to load configuration digests from file .*$"
+        ):
+            ConfDigests.load(path)
@@ -0,0 +1,218 @@
+# Copyright (c) 2025 Rackslab
+#
+# This file is part of FireHPC.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import unittest
+from collections import namedtuple
+from pathlib import Path
+import logging
+import os
+import time
+
+from ClusterShell.NodeSet import NodeSet
+
+from firehpc.nodes import ClusterNodes, fold, inventory_patterns, nodes_diff
+from firehpc.templates import Templater
+
+logger = logging.getLogger(__name__)
+
+CPU = namedtuple("CPU", ["sockets", "cores"])
+RAM = namedtuple("RAM", ["dimm", "size"])
+GPU = namedtuple("GPU", ["model"])
+NodeType = namedtuple("NodeType", ["id", "cpu", "ram"])
+GPUNodeType = namedtuple("GPUNodeType", ["id", "cpu", "ram", "gpu"])
+Node = namedtuple("Node", ["name", "tags", "type"])
+
+SERVER = NodeType("server", CPU(1, 8), RAM(2, 16 * 1024**3))
+COMPUTE = NodeType("compute", CPU(2, 64), RAM(8, 32 * 1024**3))
+GPU_COMPUTE = GPUNodeType(
+    "gpu", CPU(2, 32), RAM(8, 64 * 1024**3), [GPU("h100"), GPU("h100")]
+)
+
+SLURM_CONF_TEMPLATE = (
+    Path(__file__).parent.parent / "conf/roles/slurm/templates/slurm.conf.j2"
+)
+
+
+def cluster_nodes(nb_compute, nb_gpu=0):
+    nodes = [Node("admin", ["admin"], SERVER), Node("login", ["login"], SERVER)]
+    nodes += [
+        Node(f"cn{index:05d}", ["compute"], COMPUTE)
+        for index in range(1, nb_compute + 1)
+    ]
+    nodes += [
+        Node(f"gpu{index:03d}", ["compute", "gpu"], GPU_COMPUTE)
+        for index in range(1, nb_gpu + 1)
+    ]
+    return nodes
+
+
+def render_slurm_conf(generic):
+    return Templater().frender(
+        SLURM_CONF_TEMPLATE,
+        slurm_cluster="hpc",
+        slurm_server="admin",
+        slurm_with_munge=True,
+        slurm_emulator=True,
+        slurm_params={},
+        slurm_compute_nodes=generic["compute"],
+        slurm_partitions=[
+            {
+                "name": "normal",
+                # Nodesets of node types are folded with nodeset_fold filter in
+                # Slurm role defaults.
+                "nodes": str(
+                    NodeSet.fromlist(
+                        [node_type["nodeset"] for node_type in generic["compute"]]
+                    )
+                ),
+                "default": True,
+                "params": {},
+            }
+        ],
+    )
+
+
+class TestFold(unittest.TestCase):
+    def test_fold(self):
+        self.assertEqual(fold(["cn1", "cn2", "cn3", "cn5"]), "cn[1-3,5]")
+        self.assertEqual(fold(["cn001", "cn002", "cn010"]), "cn[001-002,010]")
+        self.assertEqual(fold(["admin"]), "admin")
+        self.assertEqual(fold(["cn3"]), "cn3")
+        self.assertEqual(fold([]), "")
+
+    def test_fold_unordered_duplicates(self):
+        self.assertEqual(fold(["cn3", "cn1", "cn2", "cn1"]), "cn[1-3]")
+
+    def test_fold_padding(self):
+        # Numbers without leading zero with the same number of digits as padded
+        # numbers are merged in the same range.
+        self.assertEqual(fold(["cn09", "cn10", "cn11"]), "cn[09-11]")
+        self.assertEqual(fold(["cn9", "cn10", "cn11"]), "cn[9-11]")
+
+    def test_fold_nodeset(self):
+        names = ["cn01", "cn02", "cn10", "cn100", "cn5", "r1n3", "r1n4", "admin"]
+        self.assertEqual(NodeSet(fold(names)), NodeSet.fromlist(names))
+
+    def test_inventory_patterns(self):
+        self.assertEqual(
+            inventory_patterns(["cn001", "cn002", "cn003", "cn005", "admin"], ".hpc"),
+            ["cn[001:003].hpc", "cn005.hpc", "admin.hpc"],
+        )
+
+
+class TestNodesDiff(unittest.TestCase):
+    def test_diff(self):
+        self.assertEqual(
+            nodes_diff(["admin", "cn1", "cn2", "cn4"], ["cn3", "admin", "cn1", "cn2"]),
+            (["cn4"], ["cn3"]),
+        )
+
+    def test_diff_unchanged(self):
+        self.assertEqual(nodes_diff(["admin", "cn1"], ["cn1", "admin"]), ([], []))
+
+    def test_diff_order(self):
+        # Added nodes are in order of nodes, removed nodes in order of existing nodes
+        self.assertEqual(
+            nodes_diff(["cn5", "cn4", "admin"], ["admin", "cn2", "cn1"]),
+            (["cn5", "cn4"], ["cn2", "cn1"]),
+        )
+
+    def test_diff_empty(self):
+        self.assertEqual(nodes_diff([], ["admin"]), ([], ["admin"]))
+        self.assertEqual(nodes_diff(["admin"], []), (["admin"], []))
+
+
+class TestClusterNodes(unittest.TestCase):
+    def test_group(self):
+        nodes = ClusterNodes.group(cluster_nodes(4, 2))
+        self.assertEqual(nodes.count, 8)
+        self.assertEqual(nodes.groups["admin"], ["admin"])
+        self.assertEqual(len(nodes.groups["compute"]), 6)
+        self.assertEqual(list(nodes.types["compute"].keys()), ["compute", "gpu"])
+
+    def test_generic(self):
+        generic = ClusterNodes.group(cluster_nodes(4, 2)).generic()
+        self.assertEqual(
+            generic["compute"][1],
+            {
+                "type": "gpu",
+                "sockets": 2,
+                "cores": 32,
+                "memory": 8 * 64 * 1024,
+                "gpus": {"h100": 2},
+                "nodeset": "gpu[001-002]",
+                "nodes": ["gpu001", "gpu002"],
+            },
+        )
+        self.assertEqual(generic["login"][0]["nodeset"], "login")
+        self.assertNotIn(
+            "nodes", ClusterNodes.group(cluster_nodes(4)).generic(False)["compute"][0]
+        )
+
+    def test_inventory(self):
+        self.assertEqual(
+            ClusterNodes.group(cluster_nodes(4)).inventory(
+                ".hpc", ["admin", "compute"]
+            ),
+            {"admin": ["admin.hpc"], "compute": ["cn[00001:00004].hpc"]},
+        )
+
+    def test_render_slurm_conf(self):
+        content = render_slurm_conf(
+            ClusterNodes.group(cluster_nodes(4, 2)).generic(False)
+        )
+        self.assertIn("NodeName=cn[00001-00004] Sockets=2 CoresPerSocket=64", content)
+        self.assertIn(
+            "PartitionName=normal Nodes=cn[00001-00004],gpu[001-002]", content
+        )
+
+
+@unittest.skipUnless(
+    os.environ.get("FIREHPC_BENCHMARKS"), "FIREHPC_BENCHMARKS is not defined"
+)
+class TestClusterNodesBenchmark(unittest.TestCase):
+    """Check nodes grouping and slurm.conf rendering scale linearly with the number
+    of nodes."""
+
+    SIZES = [5000, 10000, 20000, 50000]
+    # Tolerated ratio between time per node with the largest and the smallest
+    # numbers of nodes.
+    TOLERANCE = 2
+
+    def _measure(self, func):
+        results = {}
+        for size in self.SIZES:
+            nodes = cluster_nodes(size, size // 10)
+            start = time.perf_counter()
+            func(nodes)
+            results[size] = (time.perf_counter() - start) / len(nodes)
+            logger.info(
+                "%s %d nodes: %.2fµs/node",
+                func.__name__,
+                len(nodes),
+                results[size] * 1e6,
+            )
+        return results
+
+    def test_generate(self):
+        def generate(nodes):
+            cluster = ClusterNodes.group(nodes)
+            cluster.generic(False)
+            cluster.inventory(".hpc", ["admin", "login", "compute"])
+
+        results = self._measure(generate)
+        self.assertLess(
+            results[self.SIZES[-1]], results[self.SIZES[0]] * self.TOLERANCE
+        )
+
+    def test_render(self):
+        def render(nodes):
+            render_slurm_conf(ClusterNodes.group(nodes).generic(False))
+
+        results = self._measure(render)
+        self.assertLess(
+            results[self.SIZES[-1]], results[self.SIZES[0]] * self.TOLERANCE
+        )
@@ -0,0 +1,82 @@
+# Copyright (c) 2025 Rackslab
+#
+# This file is part of FireHPC.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import unittest
+import tempfile
+import threading
+import json
+from pathlib import Path
+
+from firehpc.profiler import Profiler
+
+
+class TestProfiler(unittest.TestCase):
+    def test_disabled(self):
+        profiler = Profiler()
+        with profiler.span("foo"):
+            pass
+        self.assertEqual(profiler.spans, [])
+
+    def test_spans(self):
+        profiler = Profiler()
+        profiler.enable("1.2.0")
+        with profiler.span("deploy"):
+            with profiler.span("clone", node="admin"):
+                pass
+        dump = profiler.dump()
+        self.assertEqual(dump["version"], "1.2.0")
+        # Spans are sorted by start time
+        self.assertEqual([span["name"] for span in dump["spans"]], ["deploy", "clone"])
+        self.assertEqual(dump["spans"][1]["args"], {"node": "admin"})
+        self.assertGreaterEqual(
+            dump["spans"][0]["duration"], dump["spans"][1]["duration"]
+        )
+
+    def test_span_exception(self):
+        profiler = Profiler()
+        profiler.enable()
+        with self.assertRaises(ValueError):
+            with profiler.span("fail"):
+                raise ValueError("fail")
+        self.assertEqual(len(profiler.spans), 1)
+
+    def test_trace(self):
+        profiler = Profiler()
+        profiler.enable()
+
+        def clone():
+            with profiler.span("clone"):
+                pass
+
+        with profiler.span("deploy"):
+            thread = threading.Thread(target=clone, name="worker")
+            thread.start()
+            thread.join()
+        events = profiler.trace()["traceEvents"]
+        complete = [event for event in events if event["ph"] == "X"]
+        metadata = {
+            event["args"]["name"]: event["tid"]
+            for event in events
+            if event["ph"] == "M"
+        }
+        self.assertEqual(len(complete), 2)
+        self.assertEqual(set(metadata), {"MainThread", "worker"})
+        self.assertIn("cpu", complete[0]["args"])
+        for event in complete:
+            self.assertIsInstance(event["ts"], int)
+            self.assertIsInstance(event["dur"], int)
+
+    def test_save(self):
+        profiler = Profiler()
+        profiler.enable()
+        with profiler.span("deploy"):
+            pass
+        with tempfile.TemporaryDirectory() as tmp:
+            profiler.save(Path(tmp) / "deploy")
+            with open(Path(tmp) / "deploy.json") as fh:
+                self.assertEqual(len(json.load(fh)["spans"]), 1)
+            with open(Path(tmp) / "deploy.trace.json") as fh:
+                self.assertIn("traceEvents", json.load(fh))
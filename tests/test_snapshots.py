@@ -0,0 +1,99 @@
+# Copyright (c) 2025 Rackslab
+#
+# This file is part of FireHPC.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import unittest
+from datetime import datetime
+from pathlib import Path
+import tempfile
+
+from firehpc.snapshots import (
+    Snapshot,
+    node_role,
+    golden_key,
+    golden_sources,
+    nodes_goldens,
+)
+from firehpc.errors import FireHPCRuntimeError
+
+NODES = [
+    ("admin", ["admin"], "server"),
+    ("login", ["login"], "server"),
+    ("cn1", ["compute"], "cpu"),
+    ("cn2", ["compute", "gpu"], "gpu"),
+    ("cn3", ["compute"], "cpu"),
+]
+
+
+class TestSnapshotsRoles(unittest.TestCase):
+    def test_node_role(self):
+        self.assertEqual(node_role(["compute", "gpu"]), "compute")
+        self.assertEqual(node_role(["login", "admin"]), "admin")
+        self.assertIsNone(node_role(["gpu"]))
+
+    def test_golden_key(self):
+        self.assertEqual(golden_key(["compute", "gpu"], "gpu"), "compute-gpu")
+        self.assertIsNone(golden_key(["gpu"], "gpu"))
+
+    def test_golden_sources(self):
+        # Nodes with the same role and different node types have distinct golden
+        # images.
+        self.assertEqual(
+            golden_sources(NODES),
+            {
+                "admin-server": "admin",
+                "login-server": "login",
+                "compute-cpu": "cn1",
+                "compute-gpu": "cn2",
+            },
+        )
+        self.assertEqual(golden_sources([("cn1", ["gpu"], "gpu")]), {})
+
+    def test_nodes_goldens(self):
+        self.assertEqual(
+            nodes_goldens(NODES),
+            {
+                "admin-server": ["admin"],
+                "login-server": ["login"],
+                "compute-cpu": ["cn1", "cn3"],
+                "compute-gpu": ["cn2"],
+            },
+        )
+
+    def test_nodes_goldens_missing(self):
+        with self.assertRaisesRegex(
+            FireHPCRuntimeError, "^Unable to determine role of node cn1"
+        ):
+            nodes_goldens([("cn1", ["gpu"], "gpu")])
+
+
+class TestSnapshot(unittest.TestCase):
+    def test_save_load(self):
+        snapshot = Snapshot(
+            "hpc",
+            "john",
+            "rocky9",
+            datetime(2025, 1, 1, 12, 0, 0),
+            {"admin-server": "firehpc-golden_admin-server_hpc_john"},
+            {"admin-server": "admin"},
+        )
+        with tempfile.NamedTemporaryFile() as fh:
+            snapshot.save(Path(fh.name))
+            self.assertEqual(Snapshot.load(Path(fh.name)), snapshot)
+
+    def test_load_not_found(self):
+        with self.assertRaisesRegex(
+            FireHPCRuntimeError, "^Unable to find snapshot manifest file"
+        ):
+            Snapshot.load(Path("/dev/non-existing"))
+
+    def test_load_invalid(self):
+        with tempfile.NamedTemporaryFile("w+") as fh:
+            fh.write("cluster: hpc\n")
+            fh.flush()
+            with self.assertRaisesRegex(
+                FireHPCRuntimeError, "^Unable to load snapshot manifest file"
+            ):
+                Snapshot.load(Path(fh.name))
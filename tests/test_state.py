@@ -10,7 +10,7 @@ import tempfile
 
 import yaml
 
-from firehpc.state import UserState, ClusterState
+from firehpc.state import UserState, ClusterState, SnapshotState
 from firehpc.settings import ClusterSettings, ClusterRacksDBSettings
 from firehpc.errors import FireHPCRuntimeError
 
@@ -27,6 +27,13 @@ class TestUserState(unittest.TestCase):
             self.assertTrue(state.path.exists())
             self.assertTrue(state.clusters.exists())
 
+    def test_properties(self):
+        state = UserState(Path("/tmp"))
+        self.assertEqual(str(state.clusters), "/tmp/clusters")
+        self.assertEqual(str(state.images), "/tmp/images")
+        self.assertEqual(str(state.snapshots), "/tmp/snapshots")
+        self.assertEqual(str(state.templates), "/tmp/cache/templates")
+
 
 class TestClusterState(unittest.TestCase):
     def test_properties(self):
@@ -35,6 +42,10 @@ class TestClusterState(unittest.TestCase):
         self.assertEqual(str(state.conf), "/tmp/clusters/foo/conf")
         self.assertEqual(str(state.settings), "/tmp/clusters/foo/settings.yml")
         self.assertEqual(str(state.extravars), "/tmp/clusters/foo/conf/custom.yml")
+        self.assertEqual(str(state.digests), "/tmp/clusters/foo/digests.json")
+        self.assertEqual(str(state.facts), "/tmp/clusters/foo/facts")
+        self.assertEqual(str(state.timings), "/tmp/clusters/foo/timings.json")
+        self.assertEqual(str(state.ssh_control), "/tmp/clusters/foo/ssh/control")
 
     def test_create(self):
         with tempfile.TemporaryDirectory() as _tmp:
@@ -83,6 +94,20 @@ class TestClusterState(unittest.TestCase):
             state.conf_clean()
             self.assertFalse(state.conf.exists())
 
+    def test_forget_facts(self):
+        with tempfile.TemporaryDirectory() as _tmp:
+            tmp = Path(_tmp)
+            tmp.rmdir()
+            state = ClusterState(UserState(tmp), "foo")
+            state.create()
+            state.facts.mkdir()
+            for host in ["cn1.foo", "cn2.foo"]:
+                (state.facts / host).write_text("{}")
+            # Hosts without cached facts are ignored
+            state.forget_facts(["cn1.foo", "cn3.foo"])
+            self.assertFalse((state.facts / "cn1.foo").exists())
+            self.assertTrue((state.facts / "cn2.foo").exists())
+
     def test_save(self):
         settings = ClusterSettings(
             os="debian12",
@@ -145,3 +170,38 @@ class TestClusterState(unittest.TestCase):
                 "^Unable to load cluster settings: '.*'$",
             ):
                 state.load()
+
+
+class TestSnapshotState(unittest.TestCase):
+    def test_properties(self):
+        state = SnapshotState(UserState(Path("/tmp")), "foo")
+        self.assertEqual(str(state.path), "/tmp/snapshots/foo")
+        self.assertEqual(str(state.state), "/tmp/snapshots/foo/state")
+        self.assertEqual(str(state.manifest), "/tmp/snapshots/foo/snapshot.yml")
+
+    def test_save_restore(self):
+        with tempfile.TemporaryDirectory() as _tmp:
+            user_state = UserState(Path(_tmp))
+            cluster_state = ClusterState(user_state, "foo")
+            cluster_state.create()
+            cluster_state.conf_create()
+            cluster_state.extravars.write_text("fhpc_cluster: foo\n")
+            cluster_state.ssh_control.mkdir(parents=True)
+            (cluster_state.ssh_control / "socket").touch()
+            (cluster_state.path / "ssh" / "id_rsa").touch()
+            cluster_state.facts.mkdir()
+            snapshot_state = SnapshotState(user_state, "foo")
+            snapshot_state.save(cluster_state)
+            self.assertTrue((snapshot_state.state / "conf" / "custom.yml").exists())
+            self.assertTrue((snapshot_state.state / "ssh" / "id_rsa").exists())
+            self.assertFalse((snapshot_state.state / "ssh" / "control").exists())
+            self.assertFalse((snapshot_state.state / "facts").exists())
+            cluster_state.clean()
+            snapshot_state.restore(cluster_state)
+            self.assertEqual(cluster_state.extravars.read_text(), "fhpc_cluster: foo\n")
+            snapshot_state.clean()
+            self.assertFalse(snapshot_state.path.exists())
+            with self.assertRaisesRegex(
+                FireHPCRuntimeError, "^Unable to find cluster state in snapshot"
+            ):
+                snapshot_state.restore(cluster_state)
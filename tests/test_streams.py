@@ -0,0 +1,76 @@
+# Copyright (c) 2025 Rackslab
+#
+# This file is part of FireHPC.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import unittest
+import json
+
+from firehpc.streams import lines, json_items
+
+NODES = {
+    "meta": {"plugin": {"type": "openapi/slurmctld"}, "nodes": 1},
+    "nodes": [
+        {"name": "cn1", "gres": "gpu:2", "partitions": ["normal"], "cpus": 128},
+        {"name": "cn2", "gres": "", "partitions": ["normal", "debug"], "cpus": 64},
+    ],
+    "last_update": {"number": 1735725600},
+    "errors": [],
+}
+
+
+def chunked(text, size):
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+class TestLines(unittest.TestCase):
+    def test_lines(self):
+        text = "SelectType = select/cons_tres\nSLURM_CONF = /etc/slurm/slurm.conf\n"
+        for size in (1, 3, 7, len(text)):
+            self.assertEqual(
+                list(lines(chunked(text, size))),
+                [
+                    "SelectType = select/cons_tres",
+                    "SLURM_CONF = /etc/slurm/slurm.conf",
+                ],
+            )
+
+    def test_lines_unterminated(self):
+        self.assertEqual(list(lines(["foo\nba", "r"])), ["foo", "bar"])
+
+    def test_lines_empty(self):
+        self.assertEqual(list(lines([])), [])
+
+
+class TestJSONItems(unittest.TestCase):
+    def test_items(self):
+        for text in (json.dumps(NODES), json.dumps(NODES, indent=2)):
+            for size in (1, 5, 64, len(text)):
+                self.assertEqual(
+                    list(json_items(chunked(text, size), "nodes")), NODES["nodes"]
+                )
+
+    def test_alternative_keys(self):
+        text = json.dumps({"QOS": [{"name": "normal"}, {"name": "high"}]})
+        self.assertEqual(
+            [qos["name"] for qos in json_items(chunked(text, 4), "qos", "QOS")],
+            ["normal", "high"],
+        )
+
+    def test_empty_array(self):
+        self.assertEqual(list(json_items(['{"nodes": [ ]}'], "nodes")), [])
+
+    def test_missing_key(self):
+        with self.assertRaisesRegex(
+            json.JSONDecodeError, "^Unable to find key partitions: .*$"
+        ):
+            list(json_items(chunked(json.dumps(NODES), 8), "partitions"))
+
+    def test_invalid(self):
+        with self.assertRaises(json.JSONDecodeError):
+            list(json_items(["error: invalid"], "nodes"))
+        with self.assertRaises(json.JSONDecodeError):
+            list(json_items(['{"nodes": [{"name": "cn1"}, {"na'], "nodes"))
+        with self.assertRaises(json.JSONDecodeError):
+            list(json_items([], "nodes"))
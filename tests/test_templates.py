@@ -0,0 +1,78 @@
+# Copyright (c) 2025 Rackslab
+#
+# This file is part of FireHPC.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import unittest
+from pathlib import Path
+import os
+import tempfile
+
+from firehpc.templates import Templater
+
+
+class TestTemplater(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.root = self.tmp / "templates"
+        self.root.mkdir()
+        (self.root / "hosts.j2").write_text(
+            "{% for node in nodes %}\n{{ node }}.{{ cluster }}\n{% endfor %}\n"
+        )
+        self.cache = self.tmp / "cache"
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_shared_environment(self):
+        self.assertIs(
+            Templater(self.root, self.cache).env, Templater(self.root, self.cache).env
+        )
+        self.assertIsNot(Templater(self.root).env, Templater(self.root, self.cache).env)
+
+    def test_frender(self):
+        templater = Templater(self.root, self.cache)
+        expected = "cn1.hpc\ncn2.hpc\n"
+        self.assertEqual(
+            templater.frender("hosts.j2", nodes=["cn1", "cn2"], cluster="hpc"),
+            expected,
+        )
+        self.assertEqual(
+            templater.frender(
+                self.root / "hosts.j2", nodes=["cn1", "cn2"], cluster="hpc"
+            ),
+            expected,
+        )
+        # Template outside root directory
+        other = self.tmp / "other.j2"
+        other.write_text("{{ cluster }}\n")
+        self.assertEqual(templater.frender(other, cluster="hpc"), "hpc\n")
+        # Template without root directory
+        self.assertEqual(Templater().frender(other, cluster="hpc"), "hpc\n")
+
+    def test_frender_reload(self):
+        templater = Templater(self.root)
+        self.assertEqual(templater.frender("hosts.j2", nodes=[], cluster="hpc"), "")
+        (self.root / "hosts.j2").write_text("modified\n")
+        # Ensure modification time differs on filesystems with coarse timestamps
+        mtime = (self.root / "hosts.j2").stat().st_mtime + 10
+        os.utime(self.root / "hosts.j2", (mtime, mtime))
+        self.assertEqual(templater.frender("hosts.j2"), "modified\n")
+
+    def test_fstream(self):
+        output = self.tmp / "hosts"
+        Templater(self.root, self.cache).fstream(
+            "hosts.j2", output, nodes=["cn1"], cluster="hpc"
+        )
+        self.assertEqual(output.read_text(), "cn1.hpc\n")
+        # Compiled template is saved in bytecode cache
+        self.assertEqual(len(list(self.cache.iterdir())), 1)
+
+    def test_not_found(self):
+        with self.assertRaisesRegex(RuntimeError, "^Unable to find template file"):
+            Templater(self.root).frender("missing.j2")
+
+    def test_srender(self):
+        self.assertEqual(Templater().srender("{{ foo }}", foo="bar"), "bar")
@@ -0,0 +1,80 @@
+# Copyright (c) 2025 Rackslab
+#
+# This file is part of FireHPC.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import unittest
+import tempfile
+import json
+from pathlib import Path
+
+from firehpc.timings import AnsibleTimings
+
+
+def event(uuid, host, duration, role="slurm", task="Install packages"):
+    return {
+        "event": "runner_on_ok",
+        "event_data": {
+            "task_uuid": uuid,
+            "play": "all",
+            "role": role,
+            "task": task,
+            "host": host,
+            "duration": duration,
+        },
+    }
+
+
+class TestAnsibleTimings(unittest.TestCase):
+    def setUp(self):
+        self.timings = AnsibleTimings()
+        handler = self.timings.handler("site")
+        for host, duration in [("admin", 2), ("cn1", 3), ("cn2", 12)]:
+            self.assertTrue(handler(event("1", host, duration)))
+        for host in ["admin", "cn1", "cn2"]:
+            handler(event("2", host, 1, role="", task="Gather facts"))
+        handler({"event": "playbook_on_start", "event_data": {}})
+        # duration computed from start and end when missing
+        handler(
+            {
+                "event": "runner_on_skipped",
+                "event_data": {
+                    "task_uuid": "3",
+                    "role": "mpi",
+                    "task": "Install MPI",
+                    "host": "cn1",
+                    "start": "2025-01-01T10:00:00.000000",
+                    "end": "2025-01-01T10:00:04.500000",
+                },
+            }
+        )
+
+    def test_report(self):
+        report = self.timings.report()
+        self.assertEqual(report["total"], 12 + 1 + 4.5)
+        self.assertEqual(
+            [task["task"] for task in report["slowest_tasks"]],
+            ["Install packages", "Install MPI", "Gather facts"],
+        )
+        self.assertEqual(report["slowest_tasks"][0]["slowest_host"], "cn2")
+        self.assertEqual(report["roles"], {"slurm": 12, "mpi": 4.5, "(none)": 1})
+        self.assertEqual(report["hosts"], {"cn2": 13, "cn1": 8.5, "admin": 3})
+        self.assertEqual(report["stragglers"], ["cn2"])
+
+    def test_report_top(self):
+        self.assertEqual(len(self.timings.report(top=1)["slowest_tasks"]), 1)
+
+    def test_empty(self):
+        report = AnsibleTimings().report()
+        self.assertEqual(report["slowest_tasks"], [])
+        self.assertEqual(report["stragglers"], [])
+
+    def test_save(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "timings.json"
+            self.timings.save(path)
+            with open(path) as fh:
+                content = json.load(fh)
+        self.assertEqual(len(content["tasks"]), 3)
+        self.assertEqual(content["stragglers"], ["cn2"])
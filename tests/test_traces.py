@@ -0,0 +1,211 @@
+# Copyright (c) 2025 Rackslab
+#
+# This file is part of FireHPC.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import unittest
+from collections import namedtuple
+from datetime import datetime
+from pathlib import Path
+import gzip
+import tempfile
+
+from firehpc.traces import (
+    TraceJob,
+    TraceMapper,
+    processors_allocation,
+    read_trace,
+    parse_swf_line,
+    parse_sacct_row,
+)
+from firehpc.errors import FireHPCRuntimeError
+
+SWF_TRACE = """\
+; Version: 2.2
+; Computer: Fake
+;
+    1      0     10    360    4  -1  -1    4   600  -1  1  3  1  -1  1  1  -1  -1
+    2     30     -1    120   -1  -1  -1    8    -1  -1  0  5  1  -1  1  2  -1  -1
+    3     -1     -1    120    2  -1  -1    2    -1  -1  1  5  1  -1  1  2  -1  -1
+"""
+
+SACCT_TRACE = """\
+JobID|User|Partition|Submit|ElapsedRaw|NCPUS|Timelimit|State|
+10|john|normal|2025-01-01T10:00:00|360|4|00:10:00|COMPLETED|
+10.batch||||360|4||COMPLETED|
+11|jane|debug|2025-01-01T10:00:30|120|1|1-00:00:00|FAILED|
+12|jane||2025-01-01T10:01:00|60|2|UNLIMITED|CANCELLED by 0|
+"""
+
+Partition = namedtuple("Partition", ["name"])
+SizedPartition = namedtuple("SizedPartition", ["name", "nodes", "cpus", "gpus"])
+
+
+class TestTraceParsers(unittest.TestCase):
+    def test_parse_swf_line(self):
+        job = parse_swf_line(
+            "1 0 10 360 4 -1 -1 4 600 -1 1 3 1 -1 1 1 -1 -1",
+        )
+        self.assertEqual(job, TraceJob(0, "3", "1", 4, 360, 600, False))
+
+    def test_parse_swf_line_short(self):
+        self.assertIsNone(parse_swf_line("1 0 10"))
+
+    def test_parse_sacct_row_step(self):
+        self.assertIsNone(parse_sacct_row({"JobID": "10.batch"}))
+
+    def test_parse_sacct_row_elapsed(self):
+        job = parse_sacct_row(
+            {
+                "JobID": "10",
+                "User": "john",
+                "Submit": "2025-01-01T10:00:00",
+                "Elapsed": "1-01:00:10",
+                "TimelimitRaw": "60",
+            }
+        )
+        self.assertEqual(job.duration, 86400 + 3600 + 10)
+        self.assertEqual(job.timelimit, 3600)
+        self.assertIsNone(job.partition)
+        self.assertEqual(job.size, 1)
+        self.assertFalse(job.failed)
+
+
+class TestReadTrace(unittest.TestCase):
+    def write(self, tmp, name, content):
+        path = Path(tmp) / name
+        if path.suffix == ".gz":
+            with gzip.open(path, "wt") as fh:
+                fh.write(content)
+        else:
+            with open(path, "w") as fh:
+                fh.write(content)
+        return path
+
+    def test_swf(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            jobs = list(read_trace(self.write(tmp, "trace.swf", SWF_TRACE)))
+        self.assertEqual(
+            jobs,
+            [
+                TraceJob(0, "3", "1", 4, 360, 600, False),
+                TraceJob(30, "5", "2", 8, 120, None, True),
+            ],
+        )
+
+    def test_swf_gzip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            jobs = list(read_trace(self.write(tmp, "trace.swf.gz", SWF_TRACE)))
+        self.assertEqual(len(jobs), 2)
+
+    def test_swf_invalid(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = self.write(tmp, "trace.swf", SWF_TRACE + "4 fail" + " 0" * 16)
+            with self.assertRaisesRegex(
+                FireHPCRuntimeError, "^Unable to parse line 7 of trace file .*$"
+            ):
+                list(read_trace(path))
+
+    def test_sacct(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            jobs = list(read_trace(self.write(tmp, "trace.txt", SACCT_TRACE)))
+        self.assertEqual(
+            jobs,
+            [
+                TraceJob(
+                    datetime(2025, 1, 1, 10, 0, 0).timestamp(),
+                    "john",
+                    "normal",
+                    4,
+                    360,
+                    600,
+                    False,
+                ),
+                TraceJob(
+                    datetime(2025, 1, 1, 10, 0, 30).timestamp(),
+                    "jane",
+                    "debug",
+                    1,
+                    120,
+                    86400,
+                    True,
+                ),
+                TraceJob(
+                    datetime(2025, 1, 1, 10, 1, 0).timestamp(),
+                    "jane",
+                    None,
+                    2,
+                    60,
+                    None,
+                    False,
+                ),
+            ],
+        )
+
+    def test_sacct_missing_submit(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = self.write(tmp, "trace.txt", "JobID|User|\n1|john|\n")
+            with self.assertRaisesRegex(
+                FireHPCRuntimeError, "^Submit field is missing in trace file .*$"
+            ):
+                list(read_trace(path))
+
+    def test_missing_file(self):
+        with self.assertRaisesRegex(
+            FireHPCRuntimeError, "^Unable to open trace file /fail/trace.swf: .*$"
+        ):
+            list(read_trace(Path("/fail/trace.swf")))
+
+
+class TestTraceMapper(unittest.TestCase):
+    def test_users(self):
+        mapper = TraceMapper(["u1", "u2"], [Partition("normal")])
+        self.assertEqual(mapper.user("john"), "u1")
+        self.assertEqual(mapper.user("jane"), "u2")
+        self.assertEqual(mapper.user("joe"), "u1")
+        self.assertEqual(mapper.user("john"), "u1")
+        self.assertEqual(mapper.user("jane"), "u2")
+
+    def test_partitions(self):
+        partitions = [Partition("normal"), Partition("debug")]
+        mapper = TraceMapper(["u1"], partitions)
+        self.assertEqual(mapper.partition("debug"), partitions[1])
+        self.assertEqual(mapper.partition("1"), partitions[0])
+        self.assertEqual(mapper.partition(None), partitions[1])
+        self.assertEqual(mapper.partition("1"), partitions[0])
+
+    def test_empty(self):
+        with self.assertRaisesRegex(
+            FireHPCRuntimeError, "^Unable to map trace users without cluster user$"
+        ):
+            TraceMapper([], [Partition("normal")])
+        with self.assertRaisesRegex(
+            FireHPCRuntimeError,
+            "^Unable to map trace partitions without cluster partition$",
+        ):
+            TraceMapper(["u1"], [])
+
+
+class TestProcessorsAllocation(unittest.TestCase):
+    def test_tasks(self):
+        partition = SizedPartition("normal", 4, 256, 0)
+        self.assertEqual(processors_allocation(64, partition), ("--ntasks", 64))
+        self.assertEqual(processors_allocation(1024, partition), ("--ntasks", 256))
+
+    def test_nodes(self):
+        # 64 CPUs per node
+        partition = SizedPartition("normal", 4, 256, 0)
+        self.assertEqual(processors_allocation(64, partition, True), ("--nodes", 1))
+        self.assertEqual(processors_allocation(65, partition, True), ("--nodes", 2))
+        self.assertEqual(processors_allocation(1, partition, True), ("--nodes", 1))
+        self.assertEqual(processors_allocation(1024, partition, True), ("--nodes", 4))
+
+    def test_gpus(self):
+        # 16 CPUs per GPU
+        partition = SizedPartition("gpu", 2, 128, 8)
+        self.assertEqual(processors_allocation(64, partition), ("--gpus", 4))
+        self.assertEqual(processors_allocation(1, partition), ("--gpus", 1))
+        self.assertEqual(processors_allocation(1024, partition), ("--gpus", 8))
+        # Nodes are allocated with select/linear, even in partitions with GPUs
+        self.assertEqual(processors_allocation(64, partition, True), ("--nodes", 1))
@@ -0,0 +1,148 @@
+# Copyright (c) 2025 Rackslab
+#
+# This file is part of FireHPC.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import unittest
+
+from firehpc.workload import (
+    Distribution,
+    WorkloadSettings,
+    ArrivalProcess,
+    Dispatches,
+)
+from firehpc.errors import FireHPCRuntimeError
+
+
+class TestDistribution(unittest.TestCase):
+    def test_parse(self):
+        distribution = Distribution.parse(["360:50", "540:5", "1200"])
+        self.assertEqual(distribution.values, [360, 540, 1200])
+        self.assertEqual(distribution.weights, [50, 5, 1])
+
+    def test_parse_invalid(self):
+        with self.assertRaisesRegex(
+            FireHPCRuntimeError, "^Invalid distribution value fail:2: .*$"
+        ):
+            Distribution.parse(["fail:2"])
+        with self.assertRaisesRegex(
+            FireHPCRuntimeError, "^Invalid distribution value 10:fail: .*$"
+        ):
+            Distribution.parse(["10:fail"])
+
+    def test_parse_empty(self):
+        with self.assertRaisesRegex(
+            FireHPCRuntimeError, "^Distribution must have at least one value$"
+        ):
+            Distribution.parse([])
+
+    def test_parse_invalid_value(self):
+        with self.assertRaisesRegex(
+            FireHPCRuntimeError,
+            "^Invalid distribution value 0:2: value must be greater than or equal "
+            "to 1$",
+        ):
+            Distribution.parse(["0:2"])
+        with self.assertRaisesRegex(
+            FireHPCRuntimeError, "^Invalid distribution value -1: .*$"
+        ):
+            Distribution.parse(["-1"])
+
+    def test_parse_invalid_weight(self):
+        with self.assertRaisesRegex(
+            FireHPCRuntimeError,
+            "^Invalid distribution value 10:-1: weight must be positive$",
+        ):
+            Distribution.parse(["10:-1", "20:2"])
+
+    def test_parse_null_weights(self):
+        with self.assertRaisesRegex(
+            FireHPCRuntimeError,
+            "^Distribution must have at least one non-null weight$",
+        ):
+            Distribution.parse(["10:0", "20:0"])
+
+    def test_pick(self):
+        distribution = Distribution.parse(["1:0", "2:1"])
+        for _ in range(10):
+            self.assertEqual(distribution.pick(), 2)
+
+
+class TestWorkloadSettings(unittest.TestCase):
+    def test_open_loop(self):
+        self.assertFalse(WorkloadSettings().open_loop)
+        self.assertTrue(WorkloadSettings(rate=10).open_loop)
+
+
+class TestArrivalProcess(unittest.TestCase):
+    def test_invalid_rate(self):
+        with self.assertRaisesRegex(
+            FireHPCRuntimeError, "^Invalid jobs submission rate 0$"
+        ):
+            ArrivalProcess(0)
+
+    def test_constant(self):
+        arrivals = ArrivalProcess(60, poisson=False)
+        arrivals.begin(100)
+        self.assertAlmostEqual(arrivals.next_arrival(), 101)
+        self.assertAlmostEqual(arrivals.next_arrival(), 102)
+
+    def test_poisson(self):
+        arrivals = ArrivalProcess(600)
+        arrivals.begin(0)
+        for _ in range(1000):
+            last = arrivals.next_arrival()
+        # 1000 arrivals at 10 jobs per second are expected in about 100 seconds.
+        self.assertGreater(last, 80)
+        self.assertLess(last, 120)
+
+    def test_warmup(self):
+        arrivals = ArrivalProcess(60, poisson=False, warmup=10)
+        self.assertAlmostEqual(arrivals.current_rate(0), 3)
+        self.assertAlmostEqual(arrivals.current_rate(5), 30)
+        self.assertAlmostEqual(arrivals.current_rate(10), 60)
+        self.assertAlmostEqual(arrivals.current_rate(20), 60)
+
+    def test_achieved_rate(self):
+        arrivals = ArrivalProcess(60, warmup=10)
+        arrivals.begin(0)
+        self.assertEqual(arrivals.achieved_rate(5), 0)
+        # submissions during warm-up are ignored
+        arrivals.record(5)
+        self.assertEqual(arrivals.submitted, 0)
+        for now in range(10, 40):
+            arrivals.record(now)
+        self.assertAlmostEqual(arrivals.achieved_rate(40), 60)
+
+    def test_late(self):
+        arrivals = ArrivalProcess(60, poisson=False)
+        arrivals.begin(0)
+        arrivals.record(1.5, arrivals.next_arrival())
+        self.assertEqual(arrivals.late, 0)
+        arrivals.record(5, arrivals.next_arrival())
+        self.assertEqual(arrivals.late, 1)
+        self.assertEqual(arrivals.submitted, 2)
+
+    def test_failure(self):
+        arrivals = ArrivalProcess(60)
+        arrivals.record_failure()
+        self.assertEqual(arrivals.failed, 1)
+
+
+class TestDispatches(unittest.TestCase):
+    def test_record(self):
+        dispatches = Dispatches()
+        dispatches.record(10)
+        # dispatch within tolerance is not late
+        dispatches.record(10.5, 10)
+        self.assertEqual(dispatches.late, 0)
+        dispatches.record(15, 10)
+        self.assertEqual(dispatches.late, 1)
+        self.assertEqual(dispatches.dispatched, 3)
+
+    def test_failure(self):
+        dispatches = Dispatches()
+        dispatches.record_failure()
+        dispatches.record_failure()
+        self.assertEqual(dispatches.failed, 2)